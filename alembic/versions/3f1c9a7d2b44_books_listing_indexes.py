@@ -0,0 +1,38 @@
+"""books listing indexes
+
+Revision ID: 3f1c9a7d2b44
+Revises: 6978902dc1a6
+Create Date: 2026-10-18 09:12:40.512318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a7d2b44'
+down_revision: Union[str, Sequence[str], None] = '6978902dc1a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_genre_id', 'books', ['genre', 'id'], unique=False)
+    op.create_index('ix_books_genre_year_id', 'books', ['genre', 'publication_year', 'id'], unique=False)
+    op.create_index('ix_books_author_id_id', 'books', ['author_id', 'id'], unique=False)
+    op.create_index('ix_books_author_id_year_id', 'books', ['author_id', 'publication_year', 'id'], unique=False)
+    op.create_index('ix_books_user_id_id', 'books', ['user_id', 'id'], unique=False)
+    op.create_index('ix_books_year_id', 'books', ['publication_year', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_year_id', table_name='books')
+    op.drop_index('ix_books_user_id_id', table_name='books')
+    op.drop_index('ix_books_author_id_year_id', table_name='books')
+    op.drop_index('ix_books_author_id_id', table_name='books')
+    op.drop_index('ix_books_genre_year_id', table_name='books')
+    op.drop_index('ix_books_genre_id', table_name='books')
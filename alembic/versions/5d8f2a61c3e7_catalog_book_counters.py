@@ -0,0 +1,82 @@
+"""catalog book counters
+
+Revision ID: 5d8f2a61c3e7
+Revises: c47a1e93d5f0
+Create Date: 2026-10-18 17:22:09.418305
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8f2a61c3e7'
+down_revision: Union[str, Sequence[str], None] = 'c47a1e93d5f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (таблиця, ключ, стовпець books, вираз ключа через {row} = new/old/books)
+COUNTERS = (
+    ("author_book_counts", "author_id", "author_id", "{row}.author_id"),
+    ("genre_book_counts", "genre", "genre", "{row}.genre"),
+    ("decade_book_counts", "decade", "publication_year", "{row}.publication_year / 10 * 10"),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'author_book_counts',
+        sa.Column('author_id', sa.Integer(), nullable=False),
+        sa.Column('book_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('author_id'),
+    )
+    op.create_index('ix_author_book_counts_count', 'author_book_counts', ['book_count', 'author_id'], unique=False)
+    op.create_table(
+        'genre_book_counts',
+        sa.Column('genre', sa.String(), nullable=False),
+        sa.Column('book_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('genre'),
+    )
+    op.create_table(
+        'decade_book_counts',
+        sa.Column('decade', sa.Integer(), nullable=False),
+        sa.Column('book_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('decade'),
+    )
+
+    for table, key, column, expression in COUNTERS:
+        new, old, current = (expression.format(row=row) for row in ("new", "old", "books"))
+        op.execute(f"""
+            INSERT INTO {table}({key}, book_count)
+            SELECT {current}, COUNT(*) FROM books WHERE {current} IS NOT NULL GROUP BY {current}
+        """)
+
+        # Книги з NULL у стовпці не рахуються; рядки, що дійшли до нуля, видаляються
+        increment = f"""
+            INSERT INTO {table}({key}, book_count) SELECT {new}, 1 WHERE {new} IS NOT NULL
+            ON CONFLICT({key}) DO UPDATE SET book_count = book_count + 1;
+        """
+        decrement = f"""
+            UPDATE {table} SET book_count = book_count - 1 WHERE {key} = {old};
+            DELETE FROM {table} WHERE {key} = {old} AND book_count <= 0;
+        """
+        op.execute(f"CREATE TRIGGER {table}_ai AFTER INSERT ON books BEGIN {increment} END")
+        op.execute(f"CREATE TRIGGER {table}_ad AFTER DELETE ON books BEGIN {decrement} END")
+        op.execute(f"""
+            CREATE TRIGGER {table}_au AFTER UPDATE OF {column} ON books
+            WHEN {old} IS NOT {new} BEGIN {decrement} {increment} END
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, *_ in reversed(COUNTERS):
+        for suffix in ("au", "ad", "ai"):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_{suffix}")
+    op.drop_table('decade_book_counts')
+    op.drop_table('genre_book_counts')
+    op.drop_index('ix_author_book_counts_count', table_name='author_book_counts')
+    op.drop_table('author_book_counts')
@@ -20,6 +20,21 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
+    # Таблиці могли вже бути: authors і books без user_id — з eb9b1c2f9cfb, усі три — у базі,
+    # створеній до Alembic. Створюється лише те, чого бракує
+    inspector = sa.inspect(op.get_bind())
+    if inspector.has_table('books'):
+        _create_users(inspector)
+        if 'user_id' not in {column['name'] for column in inspector.get_columns('books')}:
+            # SQLite не додає NOT NULL-стовпець з FK через ALTER — batch перебудовує таблицю
+            with op.batch_alter_table('books') as batch_op:
+                batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=False))
+                batch_op.create_foreign_key('fk_books_user_id_users', 'users', ['user_id'], ['id'])
+        for table in ('authors', 'books'):
+            if not any(index['name'] == f'ix_{table}_id' for index in inspector.get_indexes(table)):
+                op.create_index(op.f(f'ix_{table}_id'), table, ['id'], unique=False)
+        return
+
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table('authors',
     sa.Column('id', sa.Integer(), nullable=False),
@@ -28,13 +43,7 @@ def upgrade() -> None:
     sa.PrimaryKeyConstraint('id')
     )
     op.create_index(op.f('ix_authors_id'), 'authors', ['id'], unique=False)
-    op.create_table('users',
-    sa.Column('id', sa.Integer(), nullable=False),
-    sa.Column('username', sa.String(), nullable=False),
-    sa.Column('password', sa.String(), nullable=False),
-    sa.PrimaryKeyConstraint('id')
-    )
-    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    _create_users(inspector)
     op.create_table('books',
     sa.Column('id', sa.Integer(), nullable=False),
     sa.Column('title', sa.String(), nullable=False),
@@ -51,13 +60,22 @@ def upgrade() -> None:
     # ### end Alembic commands ###
 
 
+def _create_users(inspector) -> None:
+    if inspector.has_table('users'):
+        return
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
-    op.drop_index(op.f('ix_books_id'), table_name='books')
-    op.drop_table('books')
+    # Назад до схеми eb9b1c2f9cfb: authors і books лишаються, їх видаляє її downgrade
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.drop_column('user_id')
     op.drop_index(op.f('ix_users_id'), table_name='users')
     op.drop_table('users')
-    op.drop_index(op.f('ix_authors_id'), table_name='authors')
-    op.drop_table('authors')
-    # ### end Alembic commands ###
@@ -0,0 +1,73 @@
+"""books fts5 search
+
+Revision ID: 8b2e4d0c6a19
+Revises: 3f1c9a7d2b44
+Create Date: 2026-10-18 11:47:03.284915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4d0c6a19'
+down_revision: Union[str, Sequence[str], None] = '3f1c9a7d2b44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # rowid індексу = books.id; author_name денормалізовано з authors.full_name
+    op.execute("""
+        CREATE VIRTUAL TABLE books_fts USING fts5(
+            title, description, author_name,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    # Вбудований стовпець rank рахує bm25 з вагами: назва > автор > опис
+    op.execute("INSERT INTO books_fts(books_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')")
+
+    op.execute("""
+        INSERT INTO books_fts(rowid, title, description, author_name)
+        SELECT books.id, books.title, books.description, authors.full_name
+        FROM books LEFT JOIN authors ON authors.id = books.author_id
+    """)
+
+    op.execute("""
+        CREATE TRIGGER books_fts_ai AFTER INSERT ON books BEGIN
+            INSERT INTO books_fts(rowid, title, description, author_name)
+            VALUES (new.id, new.title, new.description,
+                    (SELECT full_name FROM authors WHERE id = new.author_id));
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER books_fts_ad AFTER DELETE ON books BEGIN
+            DELETE FROM books_fts WHERE rowid = old.id;
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER books_fts_au AFTER UPDATE OF id, title, description, author_id ON books BEGIN
+            DELETE FROM books_fts WHERE rowid = old.id;
+            INSERT INTO books_fts(rowid, title, description, author_name)
+            VALUES (new.id, new.title, new.description,
+                    (SELECT full_name FROM authors WHERE id = new.author_id));
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER authors_fts_au AFTER UPDATE OF full_name ON authors BEGIN
+            UPDATE books_fts SET author_name = new.full_name
+            WHERE rowid IN (SELECT id FROM books WHERE author_id = new.id);
+        END
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS authors_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS books_fts_ai")
+    op.execute("DROP TABLE IF EXISTS books_fts")
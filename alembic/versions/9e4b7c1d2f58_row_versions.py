@@ -0,0 +1,37 @@
+"""row versions
+
+Revision ID: 9e4b7c1d2f58
+Revises: 5d8f2a61c3e7
+Create Date: 2026-10-18 19:03:51.227640
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4b7c1d2f58'
+down_revision: Union[str, Sequence[str], None] = '5d8f2a61c3e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('authors', 'users', 'books')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ADD COLUMN у SQLite не перебудовує таблицю, тож тригери FTS і лічильників лишаються.
+    # Неконстантний DEFAULT (CURRENT_TIMESTAMP) ADD COLUMN не дозволяє — заповнюємо окремо.
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, 'updated_at')
+        op.drop_column(table, 'version')
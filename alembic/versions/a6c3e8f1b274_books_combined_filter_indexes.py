@@ -0,0 +1,36 @@
+"""books combined filter indexes
+
+Revision ID: a6c3e8f1b274
+Revises: 9e4b7c1d2f58
+Create Date: 2026-10-18 21:40:12.284613
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6c3e8f1b274'
+down_revision: Union[str, Sequence[str], None] = '9e4b7c1d2f58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_author_id_genre_id', 'books', ['author_id', 'genre', 'id'], unique=False)
+    op.create_index('ix_books_author_id_genre_year_id', 'books', ['author_id', 'genre', 'publication_year', 'id'], unique=False)
+    op.create_index('ix_books_user_id_year_id', 'books', ['user_id', 'publication_year', 'id'], unique=False)
+    op.create_index('ix_books_user_id_genre_id', 'books', ['user_id', 'genre', 'id'], unique=False)
+    op.create_index('ix_books_user_id_genre_year_id', 'books', ['user_id', 'genre', 'publication_year', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_user_id_genre_year_id', table_name='books')
+    op.drop_index('ix_books_user_id_genre_id', table_name='books')
+    op.drop_index('ix_books_user_id_year_id', table_name='books')
+    op.drop_index('ix_books_author_id_genre_year_id', table_name='books')
+    op.drop_index('ix_books_author_id_genre_id', table_name='books')
@@ -0,0 +1,29 @@
+"""users username unique index
+
+Revision ID: c47a1e93d5f0
+Revises: 8b2e4d0c6a19
+Create Date: 2026-10-18 15:06:21.740356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c47a1e93d5f0'
+down_revision: Union[str, Sequence[str], None] = '8b2e4d0c6a19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Якщо в таблиці вже є дублікати username, їх треба прибрати до міграції
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_users_username'), table_name='users')
@@ -20,6 +20,10 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
+    # Бази, створені до Alembic (зокрема library.db у репозиторії), уже мають таблиці й не мають
+    # alembic_version: тоді обидві початкові міграції лише доводять схему до 6978902dc1a6
+    if sa.inspect(op.get_bind()).has_table('authors'):
+        return
     # ### commands auto generated by Alembic - please adjust! ###
     op.create_table(
         'authors',
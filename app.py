@@ -1,31 +1,85 @@
-from fastapi import FastAPI, Depends, HTTPException, File, UploadFile, status, APIRouter
+from fastapi import FastAPI, Depends, HTTPException, Request, status, APIRouter, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from base import get_db, Base, engine
-from redis import Redis, from_url
-from typing import Optional
+from sqlalchemy import and_, select, text, tuple_, update
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm.exc import StaleDataError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+import base
+from base import get_async_read_db, get_db, get_read_db
+from redis import RedisError
+from contextlib import asynccontextmanager, suppress
+from typing import Literal
 
 from security_token import ACCESS_TOKEN_EXPIRE_MINUTES, Token, get_current_user, create_access_token
-from passlib.context import CryptContext
-from security_token import get_current_user
+from password_hashing import (
+    PasswordPoolOverloaded,
+    get_password_hash,
+    run_in_password_pool,
+    verify_and_update_async,
+)
+from security_token import get_current_user, get_user_by_username, invalidate_cached_user, invalidate_cached_user_keys
 from datetime import timedelta
 
 from dotenv import load_dotenv
 
-from models.models import Book, Author, User
+from models.models import Book, Author, User, AuthorBookCount, GenreBookCount, DecadeBookCount, utcnow
 from pydantic_models import (
     BookCreateUpdate,
     BookResponse,
+    BookPage,
+    BookSearchPage,
+    BookBulkResult,
     AuthorCreate,
     AuthorResponse,
+    AuthorBatch,
     UserCreate,
-    UserResponse
+    UserResponse,
+    UserBatch,
+    AuthorBookCountResponse,
+    GenreBookCountResponse,
+    DecadeBookCountResponse,
 )
 
-import shutil
-import os
+import asyncio
+import base64
+import csv
+import html
+import io
+import json
+import weakref
 
 from middleware.headers import SecurityHeadersMiddleware
+from middleware.security import CSRF_SESSION_COOKIE, csrf_protection, new_session_id
+from db_queries import async_queries_functions as async_queries
+from db_queries.db_queries_functions import bulk_insert_books
+from cache import AsyncEntityCache, EntityCache, CACHE_TTL_SECONDS
+from file_storage import receive_pdf, find_blob, upload_metadata, validator_headers, is_not_modified
+from async_routes import async_book_router, async_author_router, async_user_router
+import metrics
+from metrics import InstrumentedRoute
+from batch import parse_ids, ordered_batch
+from fast_json import fast_response
+from versioning import (
+    author_meta,
+    book_meta,
+    book_version_meta,
+    has_validators,
+    not_modified_response,
+    precondition_failed,
+    version_conflict,
+)
+import query_diagnostics
+from resilient_redis import (
+    AsyncResilientRedis,
+    ResilientRedis,
+    async_pooled_client,
+    listen_invalidations,
+    pooled_client,
+)
+from settings import Settings
 # =========================
 #  КОНФІГУРАЦІЯ .env
 # =========================
@@ -43,36 +97,59 @@ from security_token import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 # =========================
 #  ХЕШУВАННЯ
 # =========================
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+# pwd_context, BCRYPT_ROUNDS і пул потоків для bcrypt — у password_hashing.py
 
 
 # =========================
-#  Створення таблиць
+#  РЕСУРСИ (LIFESPAN)
 # =========================
-Base.metadata.create_all(bind=engine)
+# Схему створює Alembic (alembic upgrade head); з Settings.create_schema застосунок сам виконує
+# його при старті (base.upgrade_schema).
+# Клієнти Redis створюються в lifespan без ping: пул відкриває з'єднання при першій команді,
+# тож воркер стартує й без Redis. Обгортки resilient_redis мають таймаути й запобіжник:
+# коли Redis недоступний, кеш працює з локального LRU і сам повертається до Redis.
+# Перед Redis стоїть L1 у пам'яті воркера; його тримає в актуальному стані фонове завдання
+# listen_invalidations (pub/sub), тож гарячі ключі читаються без обміну з Redis.
+# Усе це — ресурси конкретного застосунку в app.state (див. create_app), а не глобальні змінні модуля.
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    state = app.state
+    settings: Settings = state.settings
+    if settings.create_schema:
+        await run_in_threadpool(base.upgrade_schema, state.database.engine)
+    if settings.redis_url:
+        state.async_redis_client = AsyncResilientRedis(metrics.instrument_redis(async_pooled_client(settings.redis_url)))
+        state.async_entity_cache.client = state.async_redis_client
+        if settings.db_mode == "sync":
+            state.redis_client = ResilientRedis(metrics.instrument_redis(pooled_client(settings.redis_url)))
+            state.entity_cache.client = state.redis_client
+        clients = [client for client in (state.redis_client, state.async_redis_client) if client is not None]
+        # Кеш користувачів security_token теж слухає канал: зміни користувача з інших воркерів
+        invalidation_listener = asyncio.create_task(listen_invalidations(
+            state.async_redis_client.redis, clients, listeners=(invalidate_cached_user_keys,)
+        ))
+    try:
+        yield
+    finally:
+        if state.async_redis_client is not None:
+            invalidation_listener.cancel()
+            with suppress(asyncio.CancelledError):
+                await invalidation_listener
+            state.async_entity_cache.client = None
+            await state.async_redis_client.aclose()
+            state.async_redis_client = None
+        if state.redis_client is not None:
+            state.entity_cache.client = None
+            state.redis_client.close()
+            state.redis_client = None
+        await state.database.dispose()
+
+
+# Маршрути, що не залежать від DB_MODE; підключається першим, щоб /books/search і
+# /books/export стояли перед /books/{book_id}
+common_router = APIRouter(route_class=InstrumentedRoute)
 
-app = FastAPI()
-app.add_middleware(SecurityHeadersMiddleware)
-redis_client : Optional[Redis] = None
 
-@app.on_event("startup")
-async def startup():
-    global redis_client
-    redis_client =  from_url("redis://localhost:6379/0")
-    redis_client.ping()
-@app.on_event("shutdown")
-async def shutdown():
-   
-    redis_client.close()
 # =========================
 #  CRUD ФУНКЦІЇ ДЛЯ АВТОРІВ
 # =========================
@@ -88,7 +165,16 @@ def get_author(db: Session, author_id: int):
     return db.query(Author).filter(Author.id == author_id).first()
 
 
-def update_author(db: Session, author_id: int, new_data: AuthorCreate):
+def get_author_versions(db: Session, author_id: int):
+    """Лише id/version/updated_at — для умовних запитів без завантаження автора."""
+    return db.execute(select(Author.id, Author.version, Author.updated_at).where(Author.id == author_id)).first()
+
+
+def get_authors(db: Session, author_ids: list[int]):
+    return db.query(Author).filter(Author.id.in_(author_ids)).all()
+
+
+def update_author(db: Session, cache: EntityCache, author_id: int, new_data: AuthorCreate):
     author = get_author(db, author_id)
     if not author:
         return None
@@ -96,15 +182,17 @@ def update_author(db: Session, author_id: int, new_data: AuthorCreate):
         setattr(author, key, value)
     db.commit()
     db.refresh(author)
+    cache.invalidate_author(db, author_id)
     return author
 
 
-def delete_author(db: Session, author_id: int):
+def delete_author(db: Session, cache: EntityCache, author_id: int):
     author = get_author(db, author_id)
     if not author:
         return False
     db.delete(author)
     db.commit()
+    cache.invalidate_author(db, author_id)
     return True
 
 
@@ -112,45 +200,74 @@ def delete_author(db: Session, author_id: int):
 #  CRUD ФУНКЦІЇ ДЛЯ КОРИСТУВАЧІВ
 # =========================
 def create_user(db: Session, user: UserCreate):
-    db_user = User(**user.dict())
+    db_user = User(username=user.username, password=run_in_password_pool(get_password_hash, user.password))
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
     return db_user
 
 
-def get_user_by_username(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
-
-
 def get_user(db: Session, user_id: int):
     return db.query(User).filter(User.id == user_id).first()
 
 
-def update_user(db: Session, user_id: int, new_data: UserCreate):
+def get_users(db: Session, user_ids: list[int]):
+    return db.query(User).filter(User.id.in_(user_ids)).all()
+
+
+def update_user(db: Session, cache: EntityCache, user_id: int, new_data: UserCreate):
     user = get_user(db, user_id)
     if not user:
         return None
-    for key, value in new_data.dict().items():
-        setattr(user, key, value)
+    user.username = new_data.username
+    user.password = run_in_password_pool(get_password_hash, new_data.password)
     db.commit()
     db.refresh(user)
+    cache.invalidate("user", user_id)
+    invalidate_cached_user(user_id)
     return user
 
 
-def delete_user(db: Session, user_id: int):
+def delete_user(db: Session, cache: EntityCache, user_id: int):
     user = get_user(db, user_id)
     if not user:
         return False
     db.delete(user)
     db.commit()
+    cache.invalidate("user", user_id)
+    invalidate_cached_user(user_id)
     return True
 
 
 # =========================
 #  CRUD ФУНКЦІЇ ДЛЯ КНИГ
 # =========================
-@app.post("/books", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
+# BookResponse вбудовує автора, тож кожен запит книг явно підвантажує Book.author:
+# одна книга або книги одного автора — joinedload (один запит),
+# сторінки зі списком — selectinload (вузький keyset-запит + один IN-запит на всіх авторів сторінки).
+def get_book_with_author(db: Session, book_id: int):
+    return db.query(Book).options(joinedload(Book.author)).filter(Book.id == book_id).first()
+
+
+def get_book_versions(db: Session, book_id: int):
+    """Версії книги й автора, вбудованого в BookResponse (див. versioning.book_version_meta)."""
+    return db.execute(
+        select(Book.id, Book.version, Book.updated_at,
+               Author.version.label("author_version"), Author.updated_at.label("author_updated_at"))
+        .join(Author, Author.id == Book.author_id)
+        .where(Book.id == book_id)
+    ).first()
+
+
+def get_books_with_author(db: Session, book_ids: list[int]):
+    return db.query(Book).options(joinedload(Book.author)).filter(Book.id.in_(book_ids)).all()
+
+
+# Синхронний CRUD; при DB_MODE=async замість нього підключається async_routes.async_book_router
+book_router = APIRouter(prefix="/books", tags=["Books"], route_class=InstrumentedRoute)
+
+
+@book_router.post("", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
 def create_book(book_in: BookCreateUpdate, db: Session = Depends(get_db)):
     # Перевірка автора
     author = db.query(Author).filter(Author.id == book_in.author_id).first()
@@ -172,23 +289,343 @@ def create_book(book_in: BookCreateUpdate, db: Session = Depends(get_db)):
     )
     db.add(db_book)
     db.commit()
-    db.refresh(db_book)
-    return db_book
+    return get_book_with_author(db, db_book.id)
+
+
+@common_router.post("/books/bulk", response_model=BookBulkResult)
+def create_books_bulk(books: list[BookCreateUpdate], db: Session = Depends(get_db)):
+    """Імпорт списку книг. Некоректні рядки повертаються в errors, решта вставляється."""
+    return bulk_insert_books(db, books)
+
+
+BookSort = Literal["id", "-id", "publication_year", "-publication_year"]
+
+
+def encode_cursor(sort_value, book_id: int) -> str:
+    """Курсор — останній рядок сторінки: (значення ключа сортування, id)."""
+    raw = json.dumps([sort_value, book_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, book_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Некоректний курсор")
+    if not isinstance(book_id, int):
+        raise HTTPException(400, "Некоректний курсор")
+    return sort_value, book_id
+
+
+def filter_books(query, genre: str | None = None, author_id: int | None = None,
+                 user_id: int | None = None, year_from: int | None = None, year_to: int | None = None):
+    if genre is not None:
+        query = query.filter(Book.genre == genre)
+    if author_id is not None:
+        query = query.filter(Book.author_id == author_id)
+    if user_id is not None:
+        query = query.filter(Book.user_id == user_id)
+    if year_from is not None:
+        query = query.filter(Book.publication_year >= year_from)
+    if year_to is not None:
+        query = query.filter(Book.publication_year <= year_to)
+    return query
+
+
+def _cursor_segments(sort: BookSort, sort_value, last_id: int | None) -> list:
+    """
+    Умови keyset-пагінації — по одній на кожен відрізок індексу, який читається пошуком
+    (SEARCH ... USING INDEX), а не скануванням. Порядок завжди доповнюється id, тому він
+    стабільний навіть для однакових років; порівняння рядків (year, id) > (?, ?) SQLite
+    розгортає в пошук по ix_books_year_id, а OR-умови — ні.
+    SQLite ставить NULL першими при ASC і останніми при DESC, тому відрізок з NULL-роками —
+    окремий запит, а не гілка OR. Без курсора — один запит без умов.
+    """
+    if last_id is None:
+        return [None]
+    if sort == "id":
+        return [Book.id > last_id]
+    if sort == "-id":
+        return [Book.id < last_id]
+
+    year = Book.publication_year
+    if sort == "publication_year":
+        if sort_value is None:
+            return [and_(year.is_(None), Book.id > last_id), year.isnot(None)]
+        return [tuple_(year, Book.id) > (sort_value, last_id)]
+
+    if sort_value is None:
+        return [and_(year.is_(None), Book.id < last_id)]
+    return [tuple_(year, Book.id) < (sort_value, last_id), year.is_(None)]
+
+
+def list_books(db: Session, sort: BookSort = "id", cursor: str | None = None, limit: int = 20, query=None, **filters):
+    # Діапазон років з порядком за id не покриває жоден індекс: (рік, id) впорядкований за роком,
+    # тож SQLite сортував би всі книги діапазону і сторінка росла б разом з ним
+    if sort in ("id", "-id") and (filters.get("year_from") is not None or filters.get("year_to") is not None):
+        raise HTTPException(400, "year_from і year_to — лише з sort=publication_year або -publication_year")
+    if query is None:
+        query = db.query(Book).options(selectinload(Book.author))
+    query = filter_books(query, **filters)
+
+    sort_value = last_id = None
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_value is not None and not isinstance(sort_value, int):
+            raise HTTPException(400, "Некоректний курсор")
+
+    if sort == "id":
+        query = query.order_by(Book.id.asc())
+    elif sort == "-id":
+        query = query.order_by(Book.id.desc())
+    elif sort == "publication_year":
+        query = query.order_by(Book.publication_year.asc(), Book.id.asc())
+    else:
+        query = query.order_by(Book.publication_year.desc(), Book.id.desc())
+
+    # Беремо на один рядок більше, щоб дізнатися, чи є наступна сторінка без COUNT(*);
+    # наступний відрізок читається, лише якщо попередній не заповнив сторінку
+    rows = []
+    for condition in _cursor_segments(sort, sort_value, last_id):
+        segment = query if condition is None else query.filter(condition)
+        rows += segment.limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+    items = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        sort_value = last.id if sort in ("id", "-id") else last.publication_year
+        next_cursor = encode_cursor(sort_value, last.id)
+    return items, next_cursor
+
+
+@book_router.get("", response_model=BookPage)
+def list_books_endpoint(
+    request: Request,
+    genre: str | None = None,
+    author_id: int | None = None,
+    user_id: int | None = None,
+    year_from: int | None = None,
+    year_to: int | None = None,
+    sort: BookSort = "id",
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    ids: str | None = Query(None, description="1,2,3 — книги за id у цьому порядку; фільтри й курсор ігноруються"),
+    db: Session = Depends(get_read_db),
+):
+    if ids is not None:
+        book_ids = parse_ids(ids)
+        found = request.app.state.entity_cache.get_or_load_many(
+            "book", book_ids, BookResponse, lambda missing: get_books_with_author(db, missing)
+        )
+        return fast_response(request, BookPage, ordered_batch(book_ids, found))
 
+    items, next_cursor = list_books(
+        db, sort=sort, cursor=cursor, limit=limit,
+        genre=genre, author_id=author_id, user_id=user_id, year_from=year_from, year_to=year_to,
+    )
+    return fast_response(request, BookPage, {"items": items, "next_cursor": next_cursor})
+
+
+# DB_MODE=async: пакет ?ids= — через async_entity_cache, як /authors і /users в async_routes;
+# сторінки — той самий list_books через AsyncSession.run_sync, без другої (синхронної) сесії
+@async_book_router.get("", response_model=BookPage)
+async def list_books_async_endpoint(
+    request: Request,
+    genre: str | None = None,
+    author_id: int | None = None,
+    user_id: int | None = None,
+    year_from: int | None = None,
+    year_to: int | None = None,
+    sort: BookSort = "id",
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    ids: str | None = Query(None, description="1,2,3 — книги за id у цьому порядку; фільтри й курсор ігноруються"),
+    async_db: AsyncSession = Depends(get_async_read_db),
+):
+    if ids is not None:
+        book_ids = parse_ids(ids)
+        found = await request.app.state.async_entity_cache.get_or_load_many(
+            "book", book_ids, BookResponse, lambda missing: async_queries.get_books(async_db, missing)
+        )
+        return fast_response(request, BookPage, ordered_batch(book_ids, found))
 
-@app.get("/books/{book_id}", response_model=BookResponse)
-def get_book(book_id: int, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+    items, next_cursor = await async_db.run_sync(
+        list_books, sort=sort, cursor=cursor, limit=limit,
+        genre=genre, author_id=author_id, user_id=user_id, year_from=year_from, year_to=year_to,
+    )
+    return fast_response(request, BookPage, {"items": items, "next_cursor": next_cursor})
+
+
+# =========================
+#  ПОВНОТЕКСТОВИЙ ПОШУК (FTS5)
+# =========================
+SEARCH_MAX_OFFSET = 1000
+
+# FTS5 вставляє маркери в сирий текст колонок; <mark> з'являється лише після html.escape,
+# тож розмітка з назви чи опису книги не потрапляє у відповідь як HTML
+MARK_OPEN, MARK_CLOSE = "\ue000", "\ue001"
+
+BOOK_SEARCH_SQL = text("""
+    SELECT rowid AS id, rank,
+           highlight(books_fts, 0, :mark_open, :mark_close) AS title_highlight,
+           snippet(books_fts, 1, :mark_open, :mark_close, '…', 16) AS snippet
+    FROM books_fts
+    WHERE books_fts MATCH :match
+    ORDER BY rank
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def fts_match_expression(q: str) -> str:
+    """Кожне слово запиту береться в лапки, тож синтаксис FTS5 з вводу користувача не інтерпретується."""
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def highlight_html(fragment: str | None) -> str:
+    """Екранує фрагмент FTS і лише потім перетворює маркери на <mark>."""
+    escaped = html.escape(fragment or "")
+    return escaped.replace(MARK_OPEN, "<mark>").replace(MARK_CLOSE, "</mark>")
+
+
+def search_books(db: Session, q: str, limit: int = 20, offset: int = 0):
+    match = fts_match_expression(q)
+    if not match:
+        return [], None
+
+    try:
+        hits = db.execute(BOOK_SEARCH_SQL, {
+            "match": match, "limit": limit + 1, "offset": offset, "mark_open": MARK_OPEN, "mark_close": MARK_CLOSE,
+        }).all()
+    except OperationalError:
+        raise HTTPException(503, "Пошуковий індекс не створено, виконайте alembic upgrade head")
+
+    next_offset = offset + limit if len(hits) > limit else None
+    hits = hits[:limit]
+
+    books = {
+        book.id: book
+        for book in db.query(Book).options(selectinload(Book.author)).filter(Book.id.in_([hit.id for hit in hits]))
+    }
+    items = [
+        {"book": books[hit.id], "rank": hit.rank,
+         "title_highlight": highlight_html(hit.title_highlight), "snippet": highlight_html(hit.snippet)}
+        for hit in hits
+        if hit.id in books
+    ]
+    return items, next_offset
+
+
+@common_router.get("/books/search", response_model=BookSearchPage)
+def search_books_endpoint(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=SEARCH_MAX_OFFSET),
+    db: Session = Depends(get_read_db),
+):
+    """Пошук за назвою, описом та ім'ям автора з ранжуванням BM25."""
+    items, next_offset = search_books(db, q, limit, offset)
+    return fast_response(request, BookSearchPage, {"items": items, "next_offset": next_offset})
+
+
+# =========================
+#  ЕКСПОРТ (NDJSON / CSV)
+# =========================
+EXPORT_BATCH_SIZE = 1000
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def stream_export(database: base.Database, statement, columns: list[str], fmt: ExportFormat):
+    """
+    Генератор рядків експорту. Сесія відкривається всередині генератора і живе, поки
+    йде відповідь; рядки читаються пачками по EXPORT_BATCH_SIZE (yield_per),
+    тому пам'ять не залежить від розміру таблиці.
+    """
+    with database.ReadSessionLocal() as session:
+        result = session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == "csv" else None
+        if writer:
+            writer.writerow(columns)
+
+        for partition in result.partitions():
+            if writer:
+                writer.writerows(partition)
+            else:
+                for row in partition:
+                    buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue().encode()
+
+
+def export_response(request: Request, statement, columns: list[str], fmt: ExportFormat, name: str):
+    return StreamingResponse(
+        stream_export(request.app.state.database, statement, columns, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+BOOK_EXPORT_COLUMNS = ["id", "title", "publication_year", "genre", "description", "author_id", "user_id"]
+
+
+@common_router.get("/books/export")
+def export_books(
+    request: Request,
+    format: ExportFormat = "ndjson",
+    genre: str | None = None,
+    author_id: int | None = None,
+    user_id: int | None = None,
+    year_from: int | None = None,
+    year_to: int | None = None,
+    since_id: int | None = None,
+):
+    statement = select(*[getattr(Book, column) for column in BOOK_EXPORT_COLUMNS])
+    statement = filter_books(
+        statement, genre=genre, author_id=author_id, user_id=user_id, year_from=year_from, year_to=year_to,
+    )
+    if since_id is not None:
+        statement = statement.where(Book.id > since_id)
+    return export_response(request, statement.order_by(Book.id), BOOK_EXPORT_COLUMNS, format, "books")
+
+
+@book_router.get("/{book_id}", response_model=BookResponse)
+def get_book(book_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    # Умовний GET вирішується запитом лише по версіях — без книги, кешу й серіалізації
+    if has_validators(request.headers):
+        versions = get_book_versions(db, book_id)
+        if not versions:
+            raise HTTPException(404, "Книгу не знайдено")
+        meta = book_version_meta(versions)
+        if is_not_modified(request.headers, meta):
+            return not_modified_response(meta)
+
+    book = request.app.state.entity_cache.get_or_load(
+        "book", book_id, BookResponse, lambda: get_book_with_author(db, book_id)
+    )
     if not book:
         raise HTTPException(404, "Книгу не знайдено")
-    return book
+    response.headers.update(validator_headers(book_meta(book)))
+    return fast_response(request, BookResponse, book, response)
 
 
-@app.put("/books/{book_id}", response_model=BookResponse)
-def update_book(book_id: int, new_data: BookCreateUpdate, db: Session = Depends(get_db)):
-    book = db.query(Book).filter(Book.id == book_id).first()
+@book_router.put("/{book_id}", response_model=BookResponse)
+def update_book(book_id: int, new_data: BookCreateUpdate, request: Request, response: Response,
+                db: Session = Depends(get_db)):
+    book = get_book_with_author(db, book_id)
     if not book:
         raise HTTPException(404, "Книгу не знайдено")
+    if precondition_failed(request.headers, book_meta(book)):
+        raise HTTPException(412, "Книгу змінено після отримання ETag")
 
     # Перевірка автора та користувача
     author = db.query(Author).filter(Author.id == new_data.author_id).first()
@@ -202,50 +639,119 @@ def update_book(book_id: int, new_data: BookCreateUpdate, db: Session = Depends(
     for key, value in new_data.dict().items():
         setattr(book, key, value)
 
-    db.commit()
-    db.refresh(book)
+    try:
+        db.commit()
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict(request.headers)
+    request.app.state.entity_cache.invalidate("book", book_id)
+    book = get_book_with_author(db, book_id)
+    response.headers.update(validator_headers(book_meta(book)))
     return book
 
 
-@app.delete("/books/{book_id}")
-def delete_book(book_id: int, db: Session = Depends(get_db)):
+@book_router.delete("/{book_id}")
+def delete_book(book_id: int, request: Request, db: Session = Depends(get_db)):
     book = db.query(Book).filter(Book.id == book_id).first()
     if not book:
         raise HTTPException(404, "Книга не знайдена")
     db.delete(book)
     db.commit()
+    request.app.state.entity_cache.invalidate("book", book_id)
     return {"message": f"Книга з ID {book_id} успішно видалена"}
 
 
 # =========================
 #  ROUTER ДЛЯ АВТОРІВ
 # =========================
-author_router = APIRouter(prefix="/authors", tags=["Authors"])
+author_router = APIRouter(prefix="/authors", tags=["Authors"], route_class=InstrumentedRoute)
 
 @author_router.post("/", response_model=AuthorResponse, status_code=201)
 def create_author_endpoint(author: AuthorCreate, db: Session = Depends(get_db)):
     return create_author(db, author)
 
 
+AUTHOR_EXPORT_COLUMNS = ["id", "full_name", "country"]
+
+
+@common_router.get("/authors/{author_id}/books", response_model=BookPage, tags=["Authors"])
+def get_author_books(
+    author_id: int,
+    request: Request,
+    sort: BookSort = "id",
+    cursor: str | None = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+):
+    """Сторінка книг автора одним запитом: книги разом з автором через JOIN."""
+    query = db.query(Book).options(joinedload(Book.author))
+    items, next_cursor = list_books(db, sort=sort, cursor=cursor, limit=limit, query=query, author_id=author_id)
+    # Порожня сторінка — єдиний випадок, коли потрібен окремий запит, щоб відрізнити 404
+    if not items and not cursor and not get_author(db, author_id):
+        raise HTTPException(404, "Author not found")
+    return fast_response(request, BookPage, {"items": items, "next_cursor": next_cursor})
+
+
+@common_router.get("/authors/export", tags=["Authors"])
+def export_authors(request: Request, format: ExportFormat = "ndjson", country: str | None = None,
+                   since_id: int | None = None):
+    statement = select(*[getattr(Author, column) for column in AUTHOR_EXPORT_COLUMNS])
+    if country is not None:
+        statement = statement.where(Author.country == country)
+    if since_id is not None:
+        statement = statement.where(Author.id > since_id)
+    return export_response(request, statement.order_by(Author.id), AUTHOR_EXPORT_COLUMNS, format, "authors")
+
+
+@author_router.get("", response_model=AuthorBatch)
+def get_authors_endpoint(request: Request, ids: str = Query(..., description="1,2,3"),
+                         db: Session = Depends(get_read_db)):
+    author_ids = parse_ids(ids)
+    found = request.app.state.entity_cache.get_or_load_many(
+        "author", author_ids, AuthorResponse, lambda missing: get_authors(db, missing)
+    )
+    return fast_response(request, AuthorBatch, ordered_batch(author_ids, found))
+
+
 @author_router.get("/{author_id}", response_model=AuthorResponse)
-def get_author_endpoint(author_id: int, db: Session = Depends(get_db)):
-    author = get_author(db, author_id)
+def get_author_endpoint(author_id: int, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    if has_validators(request.headers):
+        versions = get_author_versions(db, author_id)
+        if not versions:
+            raise HTTPException(404, "Author not found")
+        meta = author_meta(versions)
+        if is_not_modified(request.headers, meta):
+            return not_modified_response(meta)
+
+    author = request.app.state.entity_cache.get_or_load(
+        "author", author_id, AuthorResponse, lambda: get_author(db, author_id)
+    )
     if not author:
         raise HTTPException(404, "Author not found")
-    return author
+    response.headers.update(validator_headers(author_meta(author)))
+    return fast_response(request, AuthorResponse, author, response)
 
 
 @author_router.put("/{author_id}", response_model=AuthorResponse)
-def update_author_endpoint(author_id: int, new_data: AuthorCreate, db: Session = Depends(get_db)):
-    updated = update_author(db, author_id, new_data)
-    if not updated:
+def update_author_endpoint(author_id: int, new_data: AuthorCreate, request: Request, response: Response,
+                           db: Session = Depends(get_db)):
+    author = get_author(db, author_id)
+    if not author:
         raise HTTPException(404, "Author not found")
+    if precondition_failed(request.headers, author_meta(author)):
+        raise HTTPException(412, "Автора змінено після отримання ETag")
+    try:
+        updated = update_author(db, request.app.state.entity_cache, author_id, new_data)
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict(request.headers)
+    response.headers.update(validator_headers(author_meta(updated)))
     return updated
 
 
 @author_router.delete("/{author_id}")
-def delete_author_endpoint(author_id: int, db: Session = Depends(get_db)):
-    if not delete_author(db, author_id):
+def delete_author_endpoint(author_id: int, request: Request, db: Session = Depends(get_db)):
+    if not delete_author(db, request.app.state.entity_cache, author_id):
         raise HTTPException(404, "Author not found")
     return {"message": "Author deleted successfully"}
 
@@ -253,7 +759,7 @@ def delete_author_endpoint(author_id: int, db: Session = Depends(get_db)):
 # =========================
 #  ROUTER ДЛЯ КОРИСТУВАЧІВ
 # =========================
-user_router = APIRouter(prefix="/users", tags=["Users"])
+user_router = APIRouter(prefix="/users", tags=["Users"], route_class=InstrumentedRoute)
 
 
 @user_router.post("/", response_model=UserResponse, status_code=201)
@@ -266,7 +772,7 @@ def create_user_endpoint(user: UserCreate, db: Session = Depends(get_db)):
     return create_user(db, user)
 
 
-@user_router.get("/me/", response_model=UserResponse)  # НОВЫЙ ЭНДПОИНТ
+@common_router.get("/users/me/", response_model=UserResponse, tags=["Users"])  # НОВЫЙ ЭНДПОИНТ
 def read_users_me(current_user: User = Depends(get_current_user)):
     """Возвращает данные текущего аутентифицированного пользователя."""
     return current_user
@@ -277,38 +783,125 @@ def create_user_endpoint(user: UserCreate, db: Session = Depends(get_db)):
     return create_user(db, user)
 
 
+@user_router.get("", response_model=UserBatch)
+def get_users_endpoint(request: Request, ids: str = Query(..., description="1,2,3"),
+                       db: Session = Depends(get_read_db)):
+    user_ids = parse_ids(ids)
+    found = request.app.state.entity_cache.get_or_load_many(
+        "user", user_ids, UserResponse, lambda missing: get_users(db, missing)
+    )
+    return fast_response(request, UserBatch, ordered_batch(user_ids, found))
+
+
 @user_router.get("/{user_id}", response_model=UserResponse)
-def get_user_endpoint(user_id: int, db: Session = Depends(get_db)):
-    user = get_user(db, user_id)
+def get_user_endpoint(user_id: int, request: Request, db: Session = Depends(get_read_db)):
+    user = request.app.state.entity_cache.get_or_load("user", user_id, UserResponse, lambda: get_user(db, user_id))
     if not user:
         raise HTTPException(404, "User not found")
     return user
 
 
 @user_router.put("/{user_id}", response_model=UserResponse)
-def update_user_endpoint(user_id: int, new_data: UserCreate, db: Session = Depends(get_db)):
-    updated = update_user(db, user_id, new_data)
+def update_user_endpoint(user_id: int, new_data: UserCreate, request: Request, db: Session = Depends(get_db)):
+    try:
+        updated = update_user(db, request.app.state.entity_cache, user_id, new_data)
+    except StaleDataError:
+        db.rollback()
+        raise version_conflict(request.headers)
     if not updated:
         raise HTTPException(404, "User not found")
     return updated
 
 
 @user_router.delete("/{user_id}")
-def delete_user_endpoint(user_id: int, db: Session = Depends(get_db)):
-    if not delete_user(db, user_id):
+def delete_user_endpoint(user_id: int, request: Request, db: Session = Depends(get_db)):
+    if not delete_user(db, request.app.state.entity_cache, user_id):
         raise HTTPException(404, "User not found")
     return {"message": "User deleted successfully"}
 
 
+# =========================
+#  ROUTER ДЛЯ СТАТИСТИКИ
+# =========================
+# Читає таблиці-лічильники (models.BOOK_COUNTERS), а не GROUP BY по books:
+# вартість не залежить від розміру каталогу
+stats_router = APIRouter(prefix="/stats", tags=["Stats"], route_class=InstrumentedRoute)
+
+
+@stats_router.get("/genres", response_model=list[GenreBookCountResponse])
+def genre_stats(db: Session = Depends(get_read_db)):
+    rows = db.execute(select(GenreBookCount.genre, GenreBookCount.book_count)
+                      .order_by(GenreBookCount.book_count.desc(), GenreBookCount.genre))
+    return [{"genre": genre, "book_count": count} for genre, count in rows]
+
+
+@stats_router.get("/decades", response_model=list[DecadeBookCountResponse])
+def decade_stats(db: Session = Depends(get_read_db)):
+    rows = db.execute(select(DecadeBookCount.decade, DecadeBookCount.book_count).order_by(DecadeBookCount.decade))
+    return [{"decade": decade, "book_count": count} for decade, count in rows]
+
+
+@stats_router.get("/authors", response_model=list[AuthorBookCountResponse])
+def top_author_stats(limit: int = Query(20, ge=1, le=100), db: Session = Depends(get_read_db)):
+    """Автори з найбільшою кількістю книг (індекс ix_author_book_counts_count)."""
+    rows = db.execute(
+        select(AuthorBookCount.author_id, Author.full_name, AuthorBookCount.book_count)
+        .outerjoin(Author, Author.id == AuthorBookCount.author_id)
+        .order_by(AuthorBookCount.book_count.desc(), AuthorBookCount.author_id.desc())
+        .limit(limit)
+    )
+    return [{"author_id": author_id, "full_name": name, "book_count": count} for author_id, name, count in rows]
+
+
+@stats_router.get("/authors/{author_id}", response_model=AuthorBookCountResponse)
+def author_stats(author_id: int, db: Session = Depends(get_read_db)):
+    row = db.execute(
+        select(Author.full_name, AuthorBookCount.book_count)
+        .outerjoin(AuthorBookCount, AuthorBookCount.author_id == Author.id)
+        .where(Author.id == author_id)
+    ).first()
+    if row is None:
+        raise HTTPException(404, "Author not found")
+    return {"author_id": author_id, "full_name": row.full_name, "book_count": row.book_count or 0}
+
+
 # =========================
 #  ROUTER ДЛЯ АУТЕНТИФІКАЦІЇ
 # =========================
-auth_router = APIRouter(prefix="/auth", tags=["Authentication"])
+auth_router = APIRouter(prefix="/auth", tags=["Authentication"], route_class=InstrumentedRoute)
+
+
+def load_login_user(db: Session, username: str) -> tuple | None:
+    """
+    (id, username, хеш пароля, version) користувача або None. Транзакція завершується одразу,
+    щоб не тримати з'єднання з пулу БД, поки працює bcrypt.
+    """
+    user = get_user_by_username(db, username)
+    login_user = user and (user.id, user.username, user.password, user.version)
+    db.rollback()
+    return login_user
+
+
+def rehash_password(db: Session, user_id: int, version: int, new_hash: str) -> bool:
+    """
+    Записує новий хеш, лише якщо користувача не змінили після читання (version та сама).
+    Повертає False, якщо рядок уже інший — тоді пароль не чіпаємо.
+    """
+    result = db.execute(
+        update(User)
+        .where(User.id == user_id, User.version == version)
+        .values(password=new_hash, version=version + 1, updated_at=utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount == 1
 
 
 @auth_router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = get_user_by_username(db, form_data.username)
+async def login_for_access_token(request: Request, form_data: OAuth2PasswordRequestForm = Depends(),
+                                 db: Session = Depends(get_db)):
+    # Sync Session — у пулі потоків, як і rehash_password: запит до БД не блокує event loop
+    user = await run_in_threadpool(load_login_user, db, form_data.username)
 
     if not user:
         raise HTTPException(
@@ -317,21 +910,49 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
 
-    if not verify_password(form_data.password, user.hashed_password):
+    user_id, username, stored_password, version = user
+
+    # bcrypt виконується в пулі password_hashing, event loop не блокується
+    password_ok, new_hash = await verify_and_update_async(form_data.password, stored_password)
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неправильное имя пользователя или пароль",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    # Змінився BCRYPT_ROUNDS або пароль ще не був захешований — перехешовуємо при вході.
+    # Умовний UPDATE за version, прочитаною до bcrypt: якщо пароль змінили, поки працював
+    # bcrypt, рядок не оновиться, і старий пароль не перезапише новий. Вхід дійсний в обох випадках
+    if new_hash and await run_in_threadpool(rehash_password, db, user_id, version, new_hash):
+        state = request.app.state
+        if state.settings.db_mode == "async":
+            await state.async_entity_cache.invalidate("user", user_id)
+        else:
+            await run_in_threadpool(state.entity_cache.invalidate, "user", user_id)
+        invalidate_cached_user(user_id)
+
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username},  # 'sub' - это Subject (тема), обычно ID или username
+        data={"sub": username},  # 'sub' - это Subject (тема), обычно ID или username
         expires_delta=access_token_expires
     )
 
     return {"access_token": access_token, "token_type": "bearer"}
 
+
+@auth_router.get("/csrf-token")
+def issue_csrf_token(request: Request, response: Response):
+    """
+    Видає CSRF-токен для заголовка X-CSRF-Token. Токен прив'язаний до cookie сесії;
+    якщо її ще немає — створюємо. Один токен можна використовувати до CSRF_MAX_AGE_SECONDS.
+    """
+    session_id = request.cookies.get(CSRF_SESSION_COOKIE)
+    if not session_id:
+        session_id = new_session_id()
+        response.set_cookie(CSRF_SESSION_COOKIE, session_id, httponly=True, samesite="strict")
+    return {"csrf_token": csrf_protection.generate_token(session_id)}
+
 # =========================
 #  FILE UPLOAD
 # =========================
@@ -339,55 +960,206 @@ MAX_FILE_SIZE = 5 * 1024 * 1024  # 5 MB
 ALLOWED_CONTENT_TYPES = ["application/pdf"]
 
 
-@app.post("/uploadfile/")
-async def upload_pdf(file: UploadFile = File(...)):
-    if file.content_type not in ALLOWED_CONTENT_TYPES:
-        raise HTTPException(
-            400, f"Неприпустимий тип файлу. Дозволені: {', '.join(ALLOWED_CONTENT_TYPES)}"
-        )
+UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    },
+}
+
+
+@common_router.post("/uploadfile/", openapi_extra=UPLOAD_OPENAPI)
+async def upload_pdf(request: Request):
+    """
+    Тіло читається потоком: розмір перевіряється по ходу, SHA-256 рахується під час запису,
+    а файл зберігається за хешем. Якщо клієнт передав X-Content-SHA256, хеш тіла мусить
+    з ним збігтися.
+
+    Пробний запит — X-Content-SHA256, ?filename=<ім'я> і порожнє тіло (Content-Length: 0):
+    якщо такий вміст уже є, файл вважається завантаженим без передачі тіла, інакше 404
+    і клієнт надсилає файл звичайним запитом.
+    """
+    known_hash = request.headers.get("x-content-sha256", "").lower()
+    if known_hash and request.headers.get("content-length") == "0":
+        filename = request.query_params.get("filename")
+        if not filename:
+            raise HTTPException(400, "Для пробного запиту потрібен параметр filename")
+        known_size = find_blob(known_hash)
+        if known_size is None:
+            raise HTTPException(404, "Файл з таким SHA-256 не знайдено")
+        metrics.uploads_total.inc(("skipped",))
+        return {"filename": filename, "file_id": known_hash, "size": known_size,
+                "url": f"/uploads/{known_hash}.pdf", "duplicate": True}
+
+    stored = await receive_pdf(request, MAX_FILE_SIZE, ALLOWED_CONTENT_TYPES, expected_sha256=known_hash)
+    metrics.upload_bytes_total.inc(amount=stored.size)
+    metrics.uploads_total.inc(("duplicate" if stored.duplicate else "stored",))
+    return {"filename": stored.filename, "file_id": stored.sha256, "size": stored.size,
+            "url": f"/uploads/{stored.name}", "duplicate": stored.duplicate}
+
+
+@common_router.api_route("/uploads/{filename}", methods=["GET", "HEAD"])
+async def get_uploaded_file(filename: str, request: Request):
+    """
+    Віддає сам файл. Метадані (шлях, розмір, ETag) кешуються в L1 воркера й Redis, тому умовний
+    запит з If-None-Match / If-Modified-Since отримує 304 без звернення до диска.
+    Range і If-Range обробляє FileResponse; сервер з розширенням http.response.pathsend
+    віддає файл без копіювання через Python.
+    """
+    key = f"file-meta://{filename}"
+    state = request.app.state
+    redis_client = state.async_redis_client
+    # Без REDIS_URL або при недоступному Redis метадані читаються з диска
+    try:
+        cached = await redis_client.get(key) if redis_client is not None else None
+    except RedisError:
+        cached = None
+
+    if cached:
+        state.async_entity_cache.stats["file-meta"]["hits"] += 1
+        meta = json.loads(cached)
+    else:
+        state.async_entity_cache.stats["file-meta"]["misses"] += 1
+        raw = await run_in_threadpool(upload_metadata, filename)
+        if raw is None:
+            raise HTTPException(404, "File not found")
+        if redis_client is not None:
+            try:
+                await redis_client.set(key, raw, ex=CACHE_TTL_SECONDS)
+            except RedisError:
+                pass
+        meta = json.loads(raw)
+
+    headers = validator_headers(meta)
+    if is_not_modified(request.headers, meta):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return FileResponse(
+        meta["path"],
+        media_type="application/pdf",
+        headers=headers,
+        filename=filename,
+        content_disposition_type="inline",
+    )
 
-    file.file.seek(0, os.SEEK_END)
-    size = file.file.tell()
-    file.file.seek(0)
 
-    if size > MAX_FILE_SIZE:
-        raise HTTPException(
-            413,
-            f"Файл занадто великий. Максимальний розмір: {MAX_FILE_SIZE // 1024 // 1024} MB",
-        )
+async def password_pool_overloaded_handler(request: Request, exc: PasswordPoolOverloaded):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Сервер перевантажений, спробуйте пізніше"},
+        headers={"Retry-After": "1"},
+    )
+
 
-    os.makedirs("uploads", exist_ok=True)
-    filepath = f"uploads/{file.filename}"
+@common_router.get("/cache/stats")
+def get_cache_stats(request: Request):
+    """
+    Лічильники влучань/промахів entity-кешу, щоб підбирати його розмір і TTL.
+    Сумуються по обох кешах: метадані /uploads рахуються в async-кеші в будь-якому DB_MODE.
+    """
+    state = request.app.state
+    totals = {}
+    for cache in (state.entity_cache, state.async_entity_cache):
+        for kind, counters in cache.stats.items():
+            total = totals.setdefault(kind, {"hits": 0, "misses": 0})
+            total["hits"] += counters["hits"]
+            total["misses"] += counters["misses"]
+    return {
+        kind: {**counters, "hit_ratio": counters["hits"] / ((counters["hits"] + counters["misses"]) or 1)}
+        for kind, counters in totals.items()
+    }
 
-    with open(filepath, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
-    return {"filename": file.filename, "size": size}
+@common_router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Метрики у текстовому форматі Prometheus."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
 
 
-@app.get("/uploads/{filename}")
-def get_uploaded_file(filename: str):
+# =========================
+#  МЕТРИКИ
+# =========================
+# Реєстр метрик один на процес, а кеші й клієнти Redis — у кожного застосунку свої
+# (зазвичай застосунок один); create_app додає сюди слабке посилання на кожен
+_apps: list[weakref.ref] = []
 
-    key = f"file://{filename}"
-    cached = redis_client.get(key)
 
-    if cached:
-        return {"filename": filename, "path": cached.decode("utf-8")}
-    
-    path = f"uploads/{filename}"
-    if not os.path.exists(path):
-        raise HTTPException(404, "File not found")
+def live_apps() -> list[FastAPI]:
+    return [app for app in (ref() for ref in _apps) if app is not None]
+
+
+def app_redis_clients() -> dict:
+    """Обгортки resilient_redis застосунків процесу; в імені клієнта другого й далі — номер."""
+    clients = {}
+    for number, app in enumerate(live_apps(), 1):
+        suffix = "" if number == 1 else f"-{number}"
+        for name, client in (("sync", app.state.redis_client), ("async", app.state.async_redis_client)):
+            # Голі клієнти redis-py (без запобіжника) у цих метриках не показуються
+            if isinstance(client, (ResilientRedis, AsyncResilientRedis)):
+                clients[name + suffix] = client
+    return clients
+
 
-    redis_client.set(key, path)
-    return {"filename": filename, "path": path}
+metrics.registry.collectors.append(metrics.cache_stats_collector(
+    lambda: [cache for app in live_apps() for cache in (app.state.entity_cache, app.state.async_entity_cache)]))
+metrics.registry.collectors.append(metrics.redis_client_collector(app_redis_clients))
 
 
 # =========================
-#  INCLUDE ROUTERS
+#  ФАБРИКА ЗАСТОСУНКУ
 # =========================
-app.include_router(auth_router)
-app.include_router(author_router)
-app.include_router(user_router)
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """
+    Збирає застосунок без звернень до БД і Redis: engine створюються при першому запиті
+    (base.Database), клієнти Redis — у lifespan. Для uvicorn --factory: app:create_app.
+    Engine, кеші й клієнти Redis належать застосунку (app.state), тож кілька застосунків
+    з різними Settings в одному процесі не підміняють ресурси один одного.
+    """
+    settings = settings or Settings.from_env()
+    database = base.Database(settings.database_url, settings.async_database_url, settings.db_profile)
+    # Лічильники SQL через методи діалекту кожного engine (для async — його sync_engine)
+    database.add_engine_hook(metrics.instrument_engine)
+    # Повільні запити з EXPLAIN QUERY PLAN і N+1 — лише за SQL_DIAGNOSTICS=1
+    if settings.sql_diagnostics:
+        query_diagnostics.configure_logging(settings.sql_diagnostics_log)
+        database.add_engine_hook(query_diagnostics.instrument_engine)
+        # N+1 і маршрут у подіях бачать лише запити з обліком SQL (metrics.current_request),
+        # тож під час діагностики облік — для кожного запиту, а не для вибірки
+        metrics.SQL_SAMPLE_EVERY = 1
+
+    app = FastAPI(lifespan=lifespan)
+    app.state.settings = settings
+    app.state.database = database
+    app.state.entity_cache = EntityCache()
+    app.state.async_entity_cache = AsyncEntityCache()
+    # Створюються в lifespan, якщо заданий redis_url
+    app.state.redis_client = None
+    app.state.async_redis_client = None
+    _apps[:] = [ref for ref in _apps if ref() is not None] + [weakref.ref(app)]
+    # Кожен маршрут отримує гістограму часу й лічильник запитів у процесі (metrics.InstrumentedRoute)
+    app.router.route_class = metrics.InstrumentedRoute
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_exception_handler(PasswordPoolOverloaded, password_pool_overloaded_handler)
+
+    app.include_router(common_router)
+    app.include_router(auth_router)
+    app.include_router(stats_router)
+    if settings.db_mode == "async":
+        app.include_router(async_book_router)
+        app.include_router(async_author_router)
+        app.include_router(async_user_router)
+    else:
+        app.include_router(book_router)
+        app.include_router(author_router)
+        app.include_router(user_router)
+    return app
+
+
+app = create_app()
 
 
 # =========================
@@ -0,0 +1,229 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.exc import StaleDataError
+
+from base import get_async_db, get_async_read_db
+from batch import parse_ids, ordered_batch
+from db_queries import async_queries_functions as queries
+from fast_json import fast_response
+from file_storage import is_not_modified, validator_headers
+from metrics import InstrumentedRoute
+from models.models import Author, User
+from password_hashing import hash_password_async
+from security_token import invalidate_cached_user
+from versioning import (
+    author_meta,
+    book_meta,
+    book_version_meta,
+    has_validators,
+    not_modified_response,
+    precondition_failed,
+    version_conflict,
+)
+from pydantic_models import (
+    BookCreateUpdate,
+    BookResponse,
+    AuthorCreate,
+    AuthorResponse,
+    AuthorBatch,
+    UserCreate,
+    UserResponse,
+    UserBatch,
+)
+
+# =========================
+#  ASYNC CRUD (DB_MODE=async)
+# Ті самі шляхи й відповіді, що й sync-роутери в app.py, але без пулу потоків.
+# =========================
+
+
+async def check_book_refs(db: AsyncSession, data: BookCreateUpdate):
+    if not await db.get(Author, data.author_id):
+        raise HTTPException(404, "Автор не знайдений")
+    if not await db.get(User, data.user_id):
+        raise HTTPException(404, "Користувач не знайдений")
+
+
+# =========================
+#  КНИГИ
+# =========================
+async_book_router = APIRouter(prefix="/books", tags=["Books"], route_class=InstrumentedRoute)
+
+
+@async_book_router.post("", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
+async def create_book(book_in: BookCreateUpdate, db: AsyncSession = Depends(get_async_db)):
+    await check_book_refs(db, book_in)
+    return await queries.create_book(db, book_in)
+
+
+@async_book_router.get("/{book_id}", response_model=BookResponse)
+async def get_book(book_id: int, request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)):
+    if has_validators(request.headers):
+        versions = await queries.get_book_versions(db, book_id)
+        if not versions:
+            raise HTTPException(404, "Книгу не знайдено")
+        meta = book_version_meta(versions)
+        if is_not_modified(request.headers, meta):
+            return not_modified_response(meta)
+
+    book = await request.app.state.async_entity_cache.get_or_load(
+        "book", book_id, BookResponse, lambda: queries.get_book(db, book_id)
+    )
+    if not book:
+        raise HTTPException(404, "Книгу не знайдено")
+    response.headers.update(validator_headers(book_meta(book)))
+    return fast_response(request, BookResponse, book, response)
+
+
+@async_book_router.put("/{book_id}", response_model=BookResponse)
+async def update_book(book_id: int, new_data: BookCreateUpdate, request: Request, response: Response,
+                      db: AsyncSession = Depends(get_async_db)):
+    book = await queries.get_book(db, book_id)
+    if not book:
+        raise HTTPException(404, "Книгу не знайдено")
+    if precondition_failed(request.headers, book_meta(book)):
+        raise HTTPException(412, "Книгу змінено після отримання ETag")
+    await check_book_refs(db, new_data)
+
+    try:
+        book = await queries.update_book(db, book, new_data)
+    except StaleDataError:
+        await db.rollback()
+        raise version_conflict(request.headers)
+    await request.app.state.async_entity_cache.invalidate("book", book_id)
+    response.headers.update(validator_headers(book_meta(book)))
+    return book
+
+
+@async_book_router.delete("/{book_id}")
+async def delete_book(book_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    if not await queries.delete_book(db, book_id):
+        raise HTTPException(404, "Книга не знайдена")
+    await request.app.state.async_entity_cache.invalidate("book", book_id)
+    return {"message": f"Книга з ID {book_id} успішно видалена"}
+
+
+# =========================
+#  АВТОРИ
+# =========================
+async_author_router = APIRouter(prefix="/authors", tags=["Authors"], route_class=InstrumentedRoute)
+
+
+@async_author_router.post("/", response_model=AuthorResponse, status_code=201)
+async def create_author_endpoint(author: AuthorCreate, db: AsyncSession = Depends(get_async_db)):
+    return await queries.create_author(db, author)
+
+
+@async_author_router.get("", response_model=AuthorBatch)
+async def get_authors_endpoint(request: Request, ids: str = Query(..., description="1,2,3"),
+                               db: AsyncSession = Depends(get_async_read_db)):
+    author_ids = parse_ids(ids)
+    found = await request.app.state.async_entity_cache.get_or_load_many(
+        "author", author_ids, AuthorResponse, lambda missing: queries.get_authors(db, missing)
+    )
+    return fast_response(request, AuthorBatch, ordered_batch(author_ids, found))
+
+
+@async_author_router.get("/{author_id}", response_model=AuthorResponse)
+async def get_author_endpoint(author_id: int, request: Request, response: Response,
+                              db: AsyncSession = Depends(get_async_read_db)):
+    if has_validators(request.headers):
+        versions = await queries.get_author_versions(db, author_id)
+        if not versions:
+            raise HTTPException(404, "Author not found")
+        meta = author_meta(versions)
+        if is_not_modified(request.headers, meta):
+            return not_modified_response(meta)
+
+    author = await request.app.state.async_entity_cache.get_or_load(
+        "author", author_id, AuthorResponse, lambda: queries.get_author(db, author_id)
+    )
+    if not author:
+        raise HTTPException(404, "Author not found")
+    response.headers.update(validator_headers(author_meta(author)))
+    return fast_response(request, AuthorResponse, author, response)
+
+
+@async_author_router.put("/{author_id}", response_model=AuthorResponse)
+async def update_author_endpoint(author_id: int, new_data: AuthorCreate, request: Request, response: Response,
+                                 db: AsyncSession = Depends(get_async_db)):
+    author = await queries.get_author(db, author_id)
+    if not author:
+        raise HTTPException(404, "Author not found")
+    if precondition_failed(request.headers, author_meta(author)):
+        raise HTTPException(412, "Автора змінено після отримання ETag")
+    try:
+        updated = await queries.update_author(db, author_id, new_data)
+    except StaleDataError:
+        await db.rollback()
+        raise version_conflict(request.headers)
+    await request.app.state.async_entity_cache.invalidate_author(db, author_id)
+    response.headers.update(validator_headers(author_meta(updated)))
+    return updated
+
+
+@async_author_router.delete("/{author_id}")
+async def delete_author_endpoint(author_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    if not await queries.delete_author(db, author_id):
+        raise HTTPException(404, "Author not found")
+    await request.app.state.async_entity_cache.invalidate_author(db, author_id)
+    return {"message": "Author deleted successfully"}
+
+
+# =========================
+#  КОРИСТУВАЧІ
+# =========================
+async_user_router = APIRouter(prefix="/users", tags=["Users"], route_class=InstrumentedRoute)
+
+
+@async_user_router.post("/", response_model=UserResponse, status_code=201)
+async def create_user_endpoint(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    if await queries.get_user_by_username(db, user.username):
+        raise HTTPException(status.HTTP_400_BAD_REQUEST, "Пользователь с таким именем уже существует")
+    user = user.copy(update={"password": await hash_password_async(user.password)})
+    return await queries.create_user(db, user)
+
+
+@async_user_router.get("", response_model=UserBatch)
+async def get_users_endpoint(request: Request, ids: str = Query(..., description="1,2,3"),
+                             db: AsyncSession = Depends(get_async_read_db)):
+    user_ids = parse_ids(ids)
+    found = await request.app.state.async_entity_cache.get_or_load_many(
+        "user", user_ids, UserResponse, lambda missing: queries.get_users(db, missing)
+    )
+    return fast_response(request, UserBatch, ordered_batch(user_ids, found))
+
+
+@async_user_router.get("/{user_id}", response_model=UserResponse)
+async def get_user_endpoint(user_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    user = await request.app.state.async_entity_cache.get_or_load(
+        "user", user_id, UserResponse, lambda: queries.get_user(db, user_id)
+    )
+    if not user:
+        raise HTTPException(404, "User not found")
+    return user
+
+
+@async_user_router.put("/{user_id}", response_model=UserResponse)
+async def update_user_endpoint(user_id: int, new_data: UserCreate, request: Request,
+                               db: AsyncSession = Depends(get_async_db)):
+    new_data = new_data.copy(update={"password": await hash_password_async(new_data.password)})
+    try:
+        updated = await queries.update_user(db, user_id, new_data)
+    except StaleDataError:
+        await db.rollback()
+        raise version_conflict(request.headers)
+    if not updated:
+        raise HTTPException(404, "User not found")
+    await request.app.state.async_entity_cache.invalidate("user", user_id)
+    invalidate_cached_user(user_id)
+    return updated
+
+
+@async_user_router.delete("/{user_id}")
+async def delete_user_endpoint(user_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    if not await queries.delete_user(db, user_id):
+        raise HTTPException(404, "User not found")
+    await request.app.state.async_entity_cache.invalidate("user", user_id)
+    invalidate_cached_user(user_id)
+    return {"message": "User deleted successfully"}
@@ -1,17 +1,235 @@
-from sqlalchemy import create_engine
+import os
+import threading
+
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///library.db" 
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///library.db")
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL", SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+# "sync" — ендпоінти в пулі потоків через SessionLocal, "async" — AsyncSession на event loop
+DB_MODE = os.getenv("DB_MODE", "sync")
+if DB_MODE not in ("sync", "async"):
+    raise ValueError("DB_MODE має бути 'sync' або 'async'")
+
+# =========================
+#  ПРОФІЛІ SQLITE
+# =========================
+# default — налаштування SQLite за замовчуванням (rollback journal, fsync на кожен commit).
+# production — WAL: читачі не блокуються записом, fsync лише на checkpoint.
+SQLITE_PROFILES = {
+    "default": {
+        "pragmas": {},
+        "pool_size": 5,
+        "read_pool_size": None,  # None — читання йде через той самий engine
+    },
+    "production": {
+        "pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,
+            "cache_size": -64 * 1024,  # від'ємне значення — у KiB
+            "busy_timeout": 5000,
+            "temp_store": "MEMORY",
+        },
+        "pool_size": 5,
+        "read_pool_size": 20,
+    },
+}
+
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+if DB_PROFILE not in SQLITE_PROFILES:
+    raise ValueError(f"DB_PROFILE має бути одним з: {', '.join(SQLITE_PROFILES)}")
+
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+
+def sqlite_pragmas_listener(pragmas: dict):
+    """Повертає обробник події connect, що виконує PRAGMA на кожному новому з'єднанні пулу."""
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+    return set_pragmas
+
+
+def make_engine(url: str, pragmas: dict, pool_size: int, is_async: bool = False):
+    options = {}
+    if url.startswith("sqlite") and ":memory:" not in url:
+        options = {"pool_size": pool_size, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+    new_engine = create_async_engine(url, **options) if is_async else create_engine(url, **options)
+
+    if pragmas and url.startswith("sqlite"):
+        sync_engine = new_engine.sync_engine if is_async else new_engine
+        event.listen(sync_engine, "connect", sqlite_pragmas_listener(pragmas))
+    return new_engine
+
+
+# =========================
+#  ЛІНИВІ ENGINE
+# =========================
+class Database:
+    """
+    Engine і фабрики сесій однієї БД. Кожен створюється при першому зверненні,
+    тож імпорт модулів і create_app не відкривають з'єднань і не імпортують драйвери
+    (aiosqlite потрібен лише в DB_MODE=async).
+    Окремий пул тільки для читання (GET-ендпоінти) є в профілях з read_pool_size: у WAL-режимі
+    читачі працюють паралельно з записом, а query_only гарантує, що через нього нічого не запишуть.
+    """
+
+    def __init__(self, url: str = SQLALCHEMY_DATABASE_URL, async_url: str = ASYNC_DATABASE_URL,
+                 profile_name: str = DB_PROFILE):
+        self.url = url
+        self.async_url = async_url
+        self.profile_name = profile_name
+        self.profile = SQLITE_PROFILES[profile_name]
+        self.pool_size = int(os.getenv("DB_POOL_SIZE", self.profile["pool_size"]))
+        read_pool_size = self.profile["read_pool_size"]
+        self.read_pool_size = read_pool_size and int(os.getenv("DB_READ_POOL_SIZE", read_pool_size))
+        self.engine_hooks = []
+        self._engines = []
+        self._resources = {}
+        # RLock: фабрика read_engine звертається до engine
+        self._lock = threading.RLock()
+
+    def _lazy(self, name: str, factory):
+        value = self._resources.get(name)
+        if value is None:
+            with self._lock:
+                value = self._resources.get(name)
+                if value is None:
+                    value = self._resources[name] = factory()
+        return value
+
+    def _new_engine(self, url: str, read_only: bool, is_async: bool):
+        pragmas = {**self.profile["pragmas"], "query_only": "ON"} if read_only else self.profile["pragmas"]
+        new_engine = make_engine(url, pragmas, self.read_pool_size if read_only else self.pool_size, is_async)
+        sync_engine = new_engine.sync_engine if is_async else new_engine
+        self._engines.append(new_engine)
+        for hook in self.engine_hooks:
+            hook(sync_engine)
+        return new_engine
+
+    def add_engine_hook(self, hook):
+        """hook(sync_engine) викликається для кожного engine — вже створених і майбутніх."""
+        if hook in self.engine_hooks:
+            return
+        self.engine_hooks.append(hook)
+        for created in list(self._engines):
+            hook(getattr(created, "sync_engine", created))
+
+    @property
+    def engine(self):
+        return self._lazy("engine", lambda: self._new_engine(self.url, False, False))
+
+    @property
+    def read_engine(self):
+        if not self.read_pool_size:
+            return self.engine
+        return self._lazy("read_engine", lambda: self._new_engine(self.url, True, False))
+
+    @property
+    def async_engine(self):
+        return self._lazy("async_engine", lambda: self._new_engine(self.async_url, False, True))
+
+    @property
+    def async_read_engine(self):
+        if not self.read_pool_size:
+            return self.async_engine
+        return self._lazy("async_read_engine", lambda: self._new_engine(self.async_url, True, True))
+
+    @property
+    def SessionLocal(self):
+        return self._lazy("SessionLocal", lambda: sessionmaker(autocommit=False, autoflush=False, bind=self.engine))
+
+    @property
+    def ReadSessionLocal(self):
+        return self._lazy(
+            "ReadSessionLocal", lambda: sessionmaker(autocommit=False, autoflush=False, bind=self.read_engine)
+        )
+
+    @property
+    def AsyncSessionLocal(self):
+        return self._lazy("AsyncSessionLocal", lambda: async_sessionmaker(
+            self.async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        ))
+
+    @property
+    def AsyncReadSessionLocal(self):
+        return self._lazy("AsyncReadSessionLocal", lambda: async_sessionmaker(
+            self.async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+        ))
+
+    async def dispose(self):
+        """Закриває пули створених engine (lifespan shutdown)."""
+        for created in self._engines:
+            if isinstance(created, AsyncEngine):
+                await created.dispose()
+            else:
+                created.dispose()
+
+
+def upgrade_schema(engine):
+    """
+    alembic upgrade head на з'єднанні engine — для Settings.create_schema. На відміну від
+    create_all створює й те, чого немає в моделях: books_fts з тригерами, тригери лічильників.
+    """
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
+
+
+# БД за замовчуванням для скриптів, бенчмарків і db_queries_functions; create_app створює
+# власну Database на кожен застосунок (app.state.database), і залежності нижче беруть її звідти
+database = Database()
+
+LAZY_ATTRIBUTES = {
+    "engine", "read_engine", "async_engine", "async_read_engine",
+    "SessionLocal", "ReadSessionLocal", "AsyncSessionLocal", "AsyncReadSessionLocal",
+}
+
+
+def __getattr__(name: str):
+    # base.engine, base.SessionLocal тощо — атрибути database, створюються при першому зверненні
+    if name in LAZY_ATTRIBUTES:
+        return getattr(database, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-def get_db():
-    db = SessionLocal()
+def get_db(request: Request):
+    db = request.app.state.database.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db(request: Request):
+    db = request.app.state.database.ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db(request: Request):
+    async with request.app.state.database.AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db(request: Request):
+    async with request.app.state.database.AsyncReadSessionLocal() as db:
+        yield db
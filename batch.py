@@ -0,0 +1,32 @@
+import os
+
+from fastapi import HTTPException
+
+# =========================
+#  ПАКЕТНЕ ЧИТАННЯ (?ids=1,2,3)
+# =========================
+# Один IN-запит (і один MGET у кеші) замість запиту на кожен id.
+# Ліміт тримає IN у межах обмеження SQLite на кількість параметрів.
+MAX_BATCH_IDS = int(os.getenv("MAX_BATCH_IDS", 100))
+
+
+def parse_ids(ids: str) -> list[int]:
+    """"3,1,2" -> [3, 1, 2]: порядок запиту зберігається, повтори відкидаються."""
+    try:
+        parsed = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(400, "ids має бути списком цілих чисел через кому")
+    parsed = list(dict.fromkeys(parsed))
+    if not parsed:
+        raise HTTPException(400, "Порожній список ids")
+    if len(parsed) > MAX_BATCH_IDS:
+        raise HTTPException(400, f"Не більше {MAX_BATCH_IDS} ids за запит")
+    return parsed
+
+
+def ordered_batch(ids: list[int], found: dict) -> dict:
+    """Знайдені сутності в порядку ids і список відсутніх id."""
+    return {
+        "items": [found[entity_id] for entity_id in ids if entity_id in found],
+        "missing": [entity_id for entity_id in ids if entity_id not in found],
+    }
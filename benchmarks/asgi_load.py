@@ -0,0 +1,363 @@
+"""
+Навантажувальний бенчмарк усіх маршрутів застосунку через ASGI (без мережі).
+
+    python benchmarks/asgi_load.py --books 100000 --requests 300 --concurrency 8
+    python benchmarks/asgi_load.py --books 100000 --compare benchmarks/results/old.json
+
+Для кожного розміру набору даних (1k / 100k / 1M книг) база генерується seed_data.py один раз
+і кешується в тимчасовому каталозі; кожен запуск працює з її копією, тож запити,
+що змінюють дані, не впливають на наступні запуски. Redis замінюється fakeredis,
+CSRF і JWT проходять по-справжньому.
+
+Результат — пропускна здатність і p50/p95/p99 на маршрут — друкується таблицею
+і зберігається в JSON (benchmarks/results/asgi_load-<книг>-<коміт>.json), щоб
+порівнювати коміти між собою через --compare.
+
+Потрібні додатково: httpx, fakeredis (pip install -r requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, ROOT)
+
+PASSWORD = "bench"
+
+FTS_MIGRATION = os.path.join(ROOT, "alembic", "versions", "8b2e4d0c6a19_books_fts5_search.py")
+
+
+# =========================
+#  НАБІР ДАНИХ
+# =========================
+def dataset_size(books: int) -> dict:
+    return {"books": books, "authors": max(10, books // 20), "users": max(10, books // 1000)}
+
+
+def apply_fts_migration(engine):
+    """Повнотекстовий індекс створюється лише міграцією, create_all його не знає."""
+    from alembic.migration import MigrationContext
+    from alembic.operations import Operations
+
+    spec = importlib.util.spec_from_file_location("fts_migration", FTS_MIGRATION)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with engine.begin() as conn, Operations.context(MigrationContext.configure(conn)):
+        migration.upgrade()
+
+
+def prepare_database(books: int, workdir: str):
+    """Копіює в workdir/bench.db базу з books книгами, за потреби спершу генерує її."""
+    from sqlalchemy import create_engine
+
+    import models.models  # noqa: F401 — реєструє таблиці в Base.metadata
+    from base import Base
+    from seed_data import generate
+
+    pristine = os.path.join(tempfile.gettempdir(), f"asgi_load-{books}.db")
+    if not os.path.exists(pristine):
+        print(f"Генерація набору даних: {books} книг -> {pristine}")
+        started = time.perf_counter()
+        building = pristine + ".building"
+        if os.path.exists(building):
+            os.remove(building)
+        engine = create_engine(f"sqlite:///{building}")
+        Base.metadata.create_all(bind=engine)
+        apply_fts_migration(engine)
+        size = dataset_size(books)
+        generate(engine, size["users"], size["authors"], books, password=PASSWORD, log=lambda message: None)
+        engine.dispose()
+        os.replace(building, pristine)
+        print(f"  готово за {time.perf_counter() - started:.1f} с")
+
+    shutil.copyfile(pristine, os.path.join(workdir, "bench.db"))
+
+
+def attach_redis(app, redis_client, async_redis_client):
+    """Як lifespan застосунку, але з готовими клієнтами (fakeredis) і без слухача інвалідацій."""
+    state = app.state
+    state.redis_client, state.async_redis_client = redis_client, async_redis_client
+    state.entity_cache.client, state.async_entity_cache.client = redis_client, async_redis_client
+
+
+# =========================
+#  СЦЕНАРІЇ
+# =========================
+@dataclass
+class Scenario:
+    name: str
+    call: object  # async (client, i) -> httpx.Response
+    expected: tuple = (200,)
+
+
+def make_pdf(i: int) -> bytes:
+    return b"%PDF-1.4\n" + f"benchmark document {i}\n".encode() * 200 + b"%%EOF\n"
+
+
+def build_scenarios(size: dict, requests: int, run_id: str, rng: random.Random) -> list[Scenario]:
+    """
+    Порядок важливий: create-сценарії наповнюють списки id, які потім
+    використовують PUT і DELETE того ж ресурсу (кожен запит — свій id).
+    """
+    from seed_data import GENRES, WORDS
+
+    created = {"books": [], "authors": [], "users": [], "files": []}
+    state = {}
+
+    def book_payload():
+        return {"title": f"Bench {rng.choice(WORDS)}", "publication_year": rng.randint(1800, 2025),
+                "genre": rng.choice(GENRES), "description": "benchmark",
+                "author_id": rng.randint(1, size["authors"]), "user_id": rng.randint(1, size["users"])}
+
+    def remember(kind, key="id"):
+        async def wrapper(response):
+            if response.status_code in (200, 201):
+                created[kind].append(response.json()[key])
+            return response
+        return wrapper
+
+    async def create_book(client, i):
+        return await remember("books")(await client.post("/books", json=book_payload()))
+
+    async def create_author(client, i):
+        return await remember("authors")(await client.post("/authors/", json={"full_name": f"Bench {run_id} {i}"}))
+
+    async def create_user(client, i):
+        response = await client.post("/users/", json={"username": f"bench-{run_id}-{i}", "password": PASSWORD})
+        # UserResponse не містить id; нові рядки отримують rowid одразу після згенерованих
+        if response.status_code == 201:
+            created["users"].append(size["users"] + len(created["users"]) + 1)
+        return response
+
+    async def upload(client, i):
+        files = {"file": (f"doc-{i}.pdf", make_pdf(i) + run_id.encode(), "application/pdf")}
+        return await remember("files", "url")(await client.post("/uploadfile/", files=files))
+
+    def created_id(kind, i):
+        ids = created[kind]
+        return ids[i % len(ids)] if ids else 0
+
+    async def login(client, i):
+        return await client.post("/auth/token", data={"username": "admin", "password": PASSWORD})
+
+    async def users_me(client, i):
+        if "token" not in state:
+            state["token"] = (await login(client, i)).json()["access_token"]
+        return await client.get("/users/me/", headers={"Authorization": f"Bearer {state['token']}"})
+
+    async def conditional_get(client, i):
+        url = created["files"][i % len(created["files"])]
+        if url not in state:
+            state[url] = (await client.head(url)).headers["etag"]
+        return await client.get(url, headers={"If-None-Match": state[url]})
+
+    random_book = lambda: rng.randint(1, size["books"])
+    random_author = lambda: rng.randint(1, size["authors"])
+    random_user = lambda: rng.randint(1, size["users"])
+    # Пакетне читання: 50 випадкових id, як список книг на сторінці фронтенду
+    random_ids = lambda pick: ",".join(str(pick()) for _ in range(50))
+    bulk = lambda: [book_payload() for _ in range(20)]
+
+    return [
+        Scenario("GET /auth/csrf-token", lambda c, i: c.get("/auth/csrf-token")),
+        Scenario("POST /auth/token", login),
+        Scenario("GET /users/me/", users_me),
+        Scenario("POST /books", create_book, (201,)),
+        Scenario("GET /books/{id}", lambda c, i: c.get(f"/books/{random_book()}")),
+        Scenario("GET /books?ids", lambda c, i: c.get("/books", params={"ids": random_ids(random_book)})),
+        Scenario("PUT /books/{id}", lambda c, i: c.put(f"/books/{created_id('books', i)}", json=book_payload())),
+        Scenario("POST /books/bulk", lambda c, i: c.post("/books/bulk", json=bulk())),
+        Scenario("GET /books", lambda c, i: c.get("/books", params={"limit": 20})),
+        Scenario("GET /books?genre&sort", lambda c, i: c.get(
+            "/books", params={"genre": rng.choice(GENRES), "sort": "-publication_year", "limit": 20})),
+        Scenario("GET /books/search", lambda c, i: c.get(
+            "/books/search", params={"q": " ".join(rng.sample(WORDS, 2))})),
+        Scenario("GET /books/export", lambda c, i: c.get(
+            "/books/export", params={"author_id": random_author(), "format": rng.choice(["csv", "ndjson"])})),
+        Scenario("DELETE /books/{id}", lambda c, i: c.delete(f"/books/{created_id('books', i)}")),
+        Scenario("POST /authors/", create_author, (201,)),
+        Scenario("GET /authors/{id}", lambda c, i: c.get(f"/authors/{random_author()}")),
+        Scenario("GET /authors?ids", lambda c, i: c.get("/authors", params={"ids": random_ids(random_author)})),
+        Scenario("GET /authors/{id}/books", lambda c, i: c.get(f"/authors/{random_author()}/books")),
+        Scenario("GET /authors/export", lambda c, i: c.get(
+            "/authors/export", params={"since_id": max(0, size["authors"] - 100)})),
+        Scenario("PUT /authors/{id}", lambda c, i: c.put(
+            f"/authors/{created_id('authors', i)}", json={"full_name": f"Renamed {i}"})),
+        Scenario("DELETE /authors/{id}", lambda c, i: c.delete(f"/authors/{created_id('authors', i)}")),
+        Scenario("POST /users/", create_user, (201,)),
+        Scenario("GET /users/{id}", lambda c, i: c.get(f"/users/{random_user()}")),
+        Scenario("GET /users?ids", lambda c, i: c.get("/users", params={"ids": random_ids(random_user)})),
+        Scenario("PUT /users/{id}", lambda c, i: c.put(
+            f"/users/{created_id('users', i)}", json={"username": f"renamed-{run_id}-{i}", "password": "x"})),
+        Scenario("DELETE /users/{id}", lambda c, i: c.delete(f"/users/{created_id('users', i)}")),
+        Scenario("POST /uploadfile/", upload),
+        Scenario("GET /uploads/{filename}", lambda c, i: c.get(created["files"][i % len(created["files"])])),
+        Scenario("GET /uploads/{filename} Range", lambda c, i: c.get(
+            created["files"][i % len(created["files"])], headers={"Range": "bytes=0-1023"}), (206,)),
+        Scenario("GET /uploads/{filename} 304", conditional_get, (304,)),
+        Scenario("HEAD /uploads/{filename}", lambda c, i: c.head(created["files"][i % len(created["files"])])),
+        Scenario("GET /cache/stats", lambda c, i: c.get("/cache/stats")),
+        Scenario("GET /stats/genres", lambda c, i: c.get("/stats/genres")),
+        Scenario("GET /stats/decades", lambda c, i: c.get("/stats/decades")),
+        Scenario("GET /stats/authors", lambda c, i: c.get("/stats/authors", params={"limit": 20})),
+        Scenario("GET /stats/authors/{id}", lambda c, i: c.get(f"/stats/authors/{random_author()}")),
+    ]
+
+
+# =========================
+#  ВИМІРЮВАННЯ
+# =========================
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+async def run_scenario(client, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies = []
+    errors = {}
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            started = time.perf_counter()
+            response = await scenario.call(client, i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code not in scenario.expected:
+                errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def run(args) -> dict:
+    import fakeredis
+    import httpx
+
+    import app as app_module
+    import metrics
+    from resilient_redis import AsyncResilientRedis, ResilientRedis
+
+    # Ті самі обгортки, що створює lifespan, але над fakeredis замість пулу з'єднань
+    server = fakeredis.FakeServer()
+    attach_redis(app_module.app, ResilientRedis(metrics.instrument_redis(fakeredis.FakeRedis(server=server))),
+                 AsyncResilientRedis(metrics.instrument_redis(fakeredis.FakeAsyncRedis(server=server))))
+
+    size = dataset_size(args.books)
+    run_id = f"{int(time.time())}"
+    scenarios = build_scenarios(size, args.requests, run_id, random.Random(args.seed))
+    if args.only:
+        scenarios = [s for s in scenarios if any(part in s.name for part in args.only)]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        client.headers["X-CSRF-Token"] = (await client.get("/auth/csrf-token")).json()["csrf_token"]
+        for scenario in scenarios:
+            results[scenario.name] = await run_scenario(client, scenario, args.requests, args.concurrency)
+            row = results[scenario.name]
+            print(f"{scenario.name:<34} {row['rps']:>9.1f} {row['p50_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+                  f"{row['p99_ms']:>9.2f}  {row['errors'] or ''}")
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "dataset": size,
+            "requests_per_route": args.requests,
+            "concurrency": args.concurrency,
+            "db_mode": os.environ.get("DB_MODE", "sync"),
+            "db_profile": os.environ.get("DB_PROFILE", "default"),
+            "bcrypt_rounds": int(os.environ["BCRYPT_ROUNDS"]),
+        },
+        "routes": results,
+    }
+
+
+def print_comparison(baseline: dict, current: dict):
+    print(f"\nПорівняння з {baseline['meta']['commit']} ({baseline['meta']['timestamp']}):")
+    print(f"{'route':<34} {'rps':>9} {'p95':>9}")
+    for name, row in current["routes"].items():
+        old = baseline["routes"].get(name)
+        if not old:
+            continue
+        rps_change = (row["rps"] / old["rps"] - 1) * 100 if old["rps"] else 0
+        p95_change = (row["p95_ms"] / old["p95_ms"] - 1) * 100 if old["p95_ms"] else 0
+        print(f"{name:<34} {rps_change:>+8.1f}% {p95_change:>+8.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1000, help="розмір набору даних: 1000, 100000, 1000000")
+    parser.add_argument("--requests", type=int, default=200, help="запитів на кожен маршрут")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="*", help="запускати лише маршрути, що містять ці підрядки")
+    parser.add_argument("--output", help="шлях до JSON з результатами")
+    parser.add_argument("--compare", help="JSON попереднього запуску для порівняння")
+    args = parser.parse_args()
+
+    # Вартість bcrypt за замовчуванням знижена, інакше /auth/token і /users/ домінують у часі запуску
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    workdir = tempfile.mkdtemp(prefix="asgi_load-")
+    import warnings
+    warnings.simplefilter("ignore")
+
+    # DATABASE_URL має бути встановлений до першого імпорту base
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    prepare_database(args.books, workdir)
+    # Завантажені файли пишуться у відносний каталог uploads/ — тримаємо їх у тимчасовому
+    os.chdir(workdir)
+
+    print(f"{'route':<34} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    report = asyncio.run(run(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"asgi_load-{args.books}-{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\nРезультати: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), report)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
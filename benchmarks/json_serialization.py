@@ -0,0 +1,175 @@
+"""
+Вартість серіалізації відповідей: FAST_JSON=0 (response_model) проти FAST_JSON=1 (fast_json.fast_response).
+
+    python benchmarks/json_serialization.py [--books 1000] [--requests 300] [--rounds 5] [--limit 100]
+
+Два розділи:
+  1. Лише серіалізація сторінки з --limit книг (ORM-об'єкти -> байти JSON): шлях FastAPI з
+     response_model, швидкий шлях і jsonable_encoder + json.dumps — так кодують маршрути без
+     response_model і версії FastAPI без серіалізації напряму в байти.
+  2. Увесь застосунок через ASGI на базі з asgi_load.py: процесорний час на відповідь
+     (time.process_time, разом з пулом потоків) для великих списків і однієї книги.
+Режими чергуються в межах раунду, береться найкращий раунд.
+
+Потрібні додатково: fakeredis (pip install -r requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from asgi_load import attach_redis, prepare_database  # noqa: E402 — той самий кешований набір даних
+
+
+def best_cpu(function, repeat: int, rounds: int) -> float:
+    """Мікросекунди процесорного часу на виклик, найкращий з rounds."""
+    function()
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.process_time()
+        for _ in range(repeat):
+            function()
+        best = min(best, (time.process_time() - started) / repeat)
+    return best * 1e6
+
+
+# =========================
+#  1. ЛИШЕ СЕРІАЛІЗАЦІЯ
+# =========================
+def serializer_section(limit: int, repeat: int, rounds: int):
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+    from sqlalchemy.orm import joinedload
+
+    from base import ReadSessionLocal
+    from fast_json import ModelJSONResponse
+    from models.models import Book
+    from pydantic_models import BookPage
+
+    with ReadSessionLocal() as session:
+        books = session.query(Book).options(joinedload(Book.author)).order_by(Book.id).limit(limit).all()
+        content = {"items": books, "next_cursor": "cursor"}
+        adapter = TypeAdapter(BookPage)
+
+        cases = {
+            "response_model (validate + dump_json)":
+                lambda: adapter.dump_json(adapter.validate_python(content, from_attributes=True)),
+            "fast_response (model_validate + to_json)":
+                lambda: ModelJSONResponse(BookPage.model_validate(content, from_attributes=True)).body,
+            "jsonable_encoder + json.dumps":
+                lambda: json.dumps(jsonable_encoder(BookPage.model_validate(content, from_attributes=True)),
+                                   ensure_ascii=False).encode(),
+        }
+        print(f"Серіалізація сторінки з {len(books)} книг")
+        for name, function in cases.items():
+            print(f"  {name:<44} {best_cpu(function, repeat, rounds):>9.0f} мкс")
+
+
+# =========================
+#  2. ЗАСТОСУНОК ЧЕРЕЗ ASGI
+# =========================
+def make_scope(path: str, query: dict | None = None):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": urlencode(query or {}).encode(),
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+
+async def call(app, scope) -> tuple[int, int]:
+    status, size = None, 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            size += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, size
+
+
+async def measure(app, scope, requests: int) -> tuple[float, float]:
+    """(процесорних секунд на відповідь, секунд на відповідь)."""
+    started_cpu, started = time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        await call(app, scope)
+    return (time.process_time() - started_cpu) / requests, (time.perf_counter() - started) / requests
+
+
+async def app_section(limit: int, requests: int, rounds: int):
+    import fakeredis
+
+    from dataclasses import replace
+
+    from app import create_app
+    from resilient_redis import AsyncResilientRedis, ResilientRedis
+    from settings import Settings
+
+    # Settings.fast_json — параметр застосунку: два застосунки над одним fakeredis
+    server = fakeredis.FakeServer()
+    modes = {}
+    for name, enabled in {"FAST_JSON=0": False, "FAST_JSON=1": True}.items():
+        modes[name] = create_app(replace(Settings.from_env(), fast_json=enabled))
+        attach_redis(modes[name], ResilientRedis(fakeredis.FakeRedis(server=server)),
+                     AsyncResilientRedis(fakeredis.FakeAsyncRedis(server=server)))
+
+    ids = ",".join(str(book_id) for book_id in range(1, limit + 1))
+    cases = {
+        f"GET /books?limit={limit}": make_scope("/books", {"limit": limit}),
+        f"GET /books?ids=({limit})": make_scope("/books", {"ids": ids}),
+        f"GET /authors/1/books?limit={limit}": make_scope("/authors/1/books", {"limit": limit}),
+        f"GET /books/search?limit={limit}": make_scope("/books/search", {"q": "місто", "limit": limit}),
+        "GET /books/1": make_scope("/books/1"),
+    }
+
+    print(f"\n{'route':<34} {'байт':>7}" + "".join(f"{name + ' мкс CPU':>20}" for name in modes)
+          + f"{'зміна CPU':>11}{'req/s (1)':>11}")
+    for case, scope in cases.items():
+        for app in modes.values():
+            status, size = await call(app, scope)
+            assert status == 200, f"{case}: HTTP {status}"
+        best = {name: (float("inf"), float("inf")) for name in modes}
+        for _ in range(rounds):
+            for name, app in modes.items():
+                best[name] = min(best[name], await measure(app, scope, requests))
+        (plain_cpu, _), (fast_cpu, fast_wall) = best.values()
+        print(f"{case:<34} {size:>7}" + "".join(f"{cpu * 1e6:>20.0f}" for cpu, _ in best.values())
+              + f"{(fast_cpu / plain_cpu - 1):>+10.1%}{1 / fast_wall:>11.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1000, help="розмір набору даних (див. asgi_load.py)")
+    parser.add_argument("--requests", type=int, default=300, help="запитів на маршрут у кожному раунді")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=100, help="книг у сторінці (не більше 100)")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.simplefilter("ignore")
+    workdir = tempfile.mkdtemp(prefix="json_serialization-")
+    # DATABASE_URL має бути встановлений до першого імпорту base
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    prepare_database(args.books, workdir)
+
+    serializer_section(args.limit, args.requests, args.rounds)
+    asyncio.run(app_section(args.limit, args.requests, args.rounds))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+L1 у пам'яті воркера перед Redis: швидкість гарячих ключів і затримка інвалідації між воркерами.
+
+    python benchmarks/l1_cache.py [--books 1000] [--requests 2000] [--workers 4] [--writes 200]
+    python benchmarks/l1_cache.py --redis-url redis://localhost:6379/0
+
+Три розділи:
+  1. Читання одного гарячого ключа через ResilientRedis: лише Redis (CACHE_L1_SIZE=0) проти L1.
+  2. GET /books/1 і умовний GET /uploads/{file} (304 з метаданих) через ASGI з L1 і без нього.
+  3. --workers клієнтів з окремими L1 і підписками (як окремі воркери, але в одному
+     процесі): перший видаляє ключ, решта читають його, доки не перестануть бачити
+     старе значення. Друкує p50/p99/max цієї затримки; код виходу 1, якщо старе
+     значення видно довше за --stale-budget-ms.
+
+Без --redis-url Redis — fakeredis: обмін з ним дешевший за мережевий, тож виграш L1
+у розділах 1–2 з реальним Redis більший.
+
+Потрібні додатково: fakeredis (pip install -r requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from asgi_load import attach_redis, prepare_database  # noqa: E402 — той самий кешований набір даних
+from json_serialization import call, make_scope  # noqa: E402
+
+
+def redis_clients(args):
+    """Фабрики (sync, async) сирих клієнтів: один сервер на весь бенчмарк."""
+    if args.redis_url:
+        from resilient_redis import async_pooled_client, pooled_client
+
+        return lambda: pooled_client(args.redis_url), lambda: async_pooled_client(args.redis_url)
+    import fakeredis
+
+    server = fakeredis.FakeServer()
+    return lambda: fakeredis.FakeRedis(server=server), lambda: fakeredis.FakeAsyncRedis(server=server)
+
+
+async def subscribed(clients, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not all(client.subscribed for client in clients):
+        if time.monotonic() > deadline:
+            raise SystemExit("Не вдалося підписатися на канал інвалідацій")
+        await asyncio.sleep(0.01)
+
+
+# =========================
+#  1. ГАРЯЧИЙ КЛЮЧ
+# =========================
+async def hot_key_section(args, sync_factory, async_factory):
+    from resilient_redis import ResilientRedis, listen_invalidations
+
+    cases = {"лише Redis": ResilientRedis(sync_factory(), l1_size=0), "L1 + Redis": ResilientRedis(sync_factory())}
+    listener = asyncio.create_task(listen_invalidations(async_factory(), list(cases.values())))
+    await subscribed(cases.values())
+    cases["лише Redis"].set("bench:hot", b"x" * 1024, ex=300)
+
+    print(f"Читання гарячого ключа (1 КБ), {args.requests} разів")
+    for name, client in cases.items():
+        client.get("bench:hot")
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            client.get("bench:hot")
+        print(f"  {name:<12} {(time.perf_counter() - started) / args.requests * 1e6:>9.1f} мкс")
+    listener.cancel()
+
+
+# =========================
+#  2. ЗАСТОСУНОК ЧЕРЕЗ ASGI
+# =========================
+async def app_section(args, sync_factory, async_factory):
+    import app as app_module
+    import file_storage
+    from resilient_redis import AsyncResilientRedis, ResilientRedis, listen_invalidations
+
+    # uploads/ відносно робочого каталогу — main() переходить у тимчасовий
+    sha256 = "0" * 64
+    os.makedirs(os.path.dirname(file_storage.blob_path(sha256)), exist_ok=True)
+    with open(file_storage.blob_path(sha256), "wb") as blob:
+        blob.write(b"%PDF-1.4\n" + b"0" * 4096)
+    # Умовний запит: 304 лише з метаданих, без звернення до диска
+    uploads = make_scope(f"/uploads/{sha256}.pdf")
+    uploads["headers"] = [*uploads["headers"], (b"if-none-match", f'"{sha256}"'.encode())]
+
+    app = app_module.app
+    cases = {"GET /books/1": (make_scope("/books/1"), 200), "GET /uploads/{file} 304": (uploads, 304)}
+    print(f"\n{'route':<26} {'лише Redis мкс':>16} {'L1 мкс':>10} {'зміна':>8}")
+    results = {}
+    for name, l1_size in (("лише Redis", 0), ("L1", None)):
+        options = {} if l1_size is None else {"l1_size": l1_size}
+        attach_redis(app, ResilientRedis(sync_factory(), **options), AsyncResilientRedis(async_factory(), **options))
+        clients = [app.state.redis_client, app.state.async_redis_client]
+        listener = asyncio.create_task(listen_invalidations(app.state.async_redis_client.redis, clients))
+        await subscribed(clients)
+        for case, (scope, expected) in cases.items():
+            status, _ = await call(app, scope)
+            assert status == expected, f"{case}: HTTP {status}"
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                await call(app, scope)
+            results[case, name] = (time.perf_counter() - started) / args.requests
+        listener.cancel()
+    for case in cases:
+        plain, l1 = results[case, "лише Redis"], results[case, "L1"]
+        print(f"{case:<26} {plain * 1e6:>16.0f} {l1 * 1e6:>10.0f} {l1 / plain - 1:>+8.1%}")
+
+
+# =========================
+#  3. ІНВАЛІДАЦІЯ МІЖ ВОРКЕРАМИ
+# =========================
+async def invalidation_section(args, async_factory) -> bool:
+    from resilient_redis import AsyncResilientRedis, listen_invalidations
+
+    workers = [AsyncResilientRedis(async_factory()) for _ in range(args.workers)]
+    listeners = [asyncio.create_task(listen_invalidations(worker.redis, [worker])) for worker in workers]
+    await subscribed(workers)
+    writer, readers = workers[0], workers[1:]
+
+    delays = []
+    for version in range(args.writes):
+        old, new = f"v{version}".encode(), f"v{version + 1}".encode()
+        await writer.set("bench:book", old, ex=300)
+        for reader in readers:
+            assert await reader.get("bench:book") == old
+        # Оновлення: cache-aside — спершу інвалідація, далі нове значення в Redis
+        await writer.delete("bench:book")
+        written = time.perf_counter()
+        await writer.redis.set("bench:book", new, ex=300)
+        for reader in readers:
+            while await reader.get("bench:book") == old:
+                await asyncio.sleep(0)
+            delays.append(time.perf_counter() - written)
+
+    for listener in listeners:
+        listener.cancel()
+    delays.sort()
+    p99 = delays[int(len(delays) * 0.99) - 1] * 1000
+    print(f"\nІнвалідація: {args.workers} воркерів, {args.writes} оновлень; старе значення видно ще "
+          f"p50 {statistics.median(delays) * 1000:.3f} / p99 {p99:.3f} / max {delays[-1] * 1000:.3f} мс")
+    hits = sum(worker.l1_hits for worker in readers)
+    print(f"Влучань L1 у читачів: {hits}")
+    return delays[-1] * 1000 <= args.stale_budget_ms
+
+
+async def run(args) -> bool:
+    sync_factory, async_factory = redis_clients(args)
+    await hot_key_section(args, sync_factory, async_factory)
+    await app_section(args, sync_factory, async_factory)
+    return await invalidation_section(args, async_factory)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1000, help="розмір набору даних (див. asgi_load.py)")
+    parser.add_argument("--requests", type=int, default=2000, help="читань на випадок у розділах 1–2")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--stale-budget-ms", type=float, default=50)
+    parser.add_argument("--redis-url", help="справжній Redis; без нього — fakeredis")
+    args = parser.parse_args()
+
+    import warnings
+    warnings.simplefilter("ignore")
+    workdir = tempfile.mkdtemp(prefix="l1_cache-")
+    # DATABASE_URL має бути встановлений до першого імпорту base
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    prepare_database(args.books, workdir)
+    os.chdir(workdir)
+
+    ok = asyncio.run(run(args))
+    shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Пропускна здатність /auth/token і затримка паралельних GET-запитів.
+
+    python benchmarks/login_throughput.py --seconds 5 --concurrency 16
+
+Порівнює перевірку bcrypt на event loop (PASSWORD_WORKERS=0, як було раніше)
+з обмеженим пулом потоків password_hashing. Кожен варіант запускається в окремому
+процесі на тимчасовій базі; запити йдуть через ASGI без мережі.
+Потрібні додатково: httpx (pip install -r requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def run_worker(args):
+    sys.path.insert(0, ROOT)
+    import warnings
+    warnings.simplefilter("ignore")
+
+    import httpx
+
+    import base
+    from app import app
+    from models.models import Author, Book, User
+    from password_hashing import get_password_hash
+
+    # CSRF-перевірка не є предметом вимірювання
+    app.user_middleware.clear()
+    app.middleware_stack = None
+
+    base.Base.metadata.create_all(bind=base.engine)
+    with base.SessionLocal() as db:
+        db.add(User(username="bench", password=get_password_hash("secret")))
+        db.add(Author(full_name="Bench Author"))
+        db.commit()
+        db.add(Book(title="Book", publication_year=2000, genre="g", description="d", author_id=1, user_id=1))
+        db.commit()
+
+    stop = time.perf_counter() + args.seconds
+    logins = {"ok": 0, "overloaded": 0}
+    get_latencies = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        async def login_loop():
+            while time.perf_counter() < stop:
+                response = await client.post("/auth/token", data={"username": "bench", "password": "secret"})
+                logins["ok" if response.status_code == 200 else "overloaded"] += 1
+
+        async def get_loop():
+            while time.perf_counter() < stop:
+                started = time.perf_counter()
+                await client.get("/books/1")
+                get_latencies.append((time.perf_counter() - started) * 1000)
+                await asyncio.sleep(0.005)
+
+        await asyncio.gather(*[login_loop() for _ in range(args.concurrency)], get_loop())
+
+    get_latencies.sort()
+    print(json.dumps({
+        "workers": os.environ.get("PASSWORD_WORKERS"),
+        "logins_per_sec": round(logins["ok"] / args.seconds, 1),
+        "rejected_503": logins["overloaded"],
+        "get_p50_ms": round(statistics.median(get_latencies), 2),
+        "get_p99_ms": round(get_latencies[min(len(get_latencies) - 1, int(len(get_latencies) * 0.99))], 2),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--workers", nargs="+", default=["0", "4"], help="значення PASSWORD_WORKERS")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        asyncio.run(run_worker(args))
+        return
+
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "PASSWORD_WORKERS": workers,
+                "BCRYPT_ROUNDS": str(args.rounds),
+                "DATABASE_URL": f"sqlite:///{tmp}/bench.db",
+            }
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--worker",
+                 "--seconds", str(args.seconds), "--concurrency", str(args.concurrency)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"PASSWORD_WORKERS={result['workers']:<3} logins/s={result['logins_per_sec']:<7} "
+              f"503={result['rejected_503']:<5} GET p50={result['get_p50_ms']}ms p99={result['get_p99_ms']}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Накладні витрати InstrumentedRoute: той самий FastAPI-застосунок з метриками і без.
+
+    python benchmarks/metrics_overhead.py [--requests 6000] [--rounds 9] [--max-share 0.02]
+
+Запити подаються напряму через ASGI-інтерфейс парами: один у застосунок без метрик, одразу
+другий — з метриками (порядок у парі чергується), тож дрейф частоти, GIL і сусіди у VM
+однаково впливають на обидва. Блок — metrics.SQL_SAMPLE_EVERY пар, і запит з обліком SQL
+у ньому завжди останній; додатковий час — медіана різниць для решти запитів блоку, до якої
+в її частці додано медіану різниць для останнього (стійке до викидів і не ховає вартість
+вибірки). Кожен раунд будує нову пару застосунків, бо окремі екземпляри відрізняються на
+кілька мікросекунд; підсумок — медіана раундів. Показує додатковий час на запит і його частку
+від бюджету запиту; ціль — менше 2%. Бюджет — 200 мкс (5000 req/s на один процес), а для
+маршруту, якому самому потрібно більше, — його власний час: такий маршрут і без метрик не
+дає 5000 req/s на процес, тож частку рахуємо від того, що він реально витрачає. Маршрут
+/books/db/{id} виконує два SQL-оператори через engine з хуками metrics.instrument_engine,
+як маршрути застосунку.
+Код виходу 1, якщо хоч один випадок перевищує --max-share.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fastapi import APIRouter, FastAPI
+from fastapi.routing import APIRoute
+from sqlalchemy import create_engine, text
+from sqlalchemy.pool import StaticPool
+
+import metrics
+from metrics import InstrumentedRoute
+
+BUDGET_SECONDS = 1 / 5000
+
+
+def build_engine(instrumented: bool):
+    """SQLite у пам'яті з двома таблицями; хуки SQL — лише для застосунку з метриками, як у create_app."""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE authors (id INTEGER PRIMARY KEY, full_name TEXT)"))
+        conn.execute(text("CREATE TABLE books (id INTEGER PRIMARY KEY, title TEXT, author_id INTEGER)"))
+        conn.execute(text("INSERT INTO authors VALUES (1, 'Тарас Шевченко')"))
+        conn.execute(text("INSERT INTO books VALUES (7, 'Кобзар', 1)"))
+    if instrumented:
+        metrics.instrument_engine(engine)
+    return engine
+
+
+def build_app(route_class) -> FastAPI:
+    app = FastAPI()
+    router = APIRouter(prefix="/books", route_class=route_class)
+    engine = build_engine(route_class is InstrumentedRoute)
+
+    @router.get("/{book_id}")
+    async def get_book(book_id: int):
+        return {"id": book_id, "title": "Кобзар"}
+
+    @router.get("/sync/{book_id}")
+    def get_book_sync(book_id: int):
+        return {"id": book_id, "title": "Кобзар"}
+
+    # Два оператори на запит, як у маршрутів з книгою й автором
+    @router.get("/db/{book_id}")
+    def get_book_db(book_id: int):
+        with engine.connect() as conn:
+            book = conn.execute(text("SELECT id, title, author_id FROM books WHERE id = :id"), {"id": book_id}).one()
+            author = conn.execute(text("SELECT full_name FROM authors WHERE id = :id"), {"id": book.author_id}).scalar_one()
+        return {"id": book.id, "title": book.title, "author": author}
+
+    app.include_router(router)
+    return app
+
+
+def make_scope(path: str):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+
+
+async def call(app, scope):
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(plain, instrumented, scope, requests: int):
+    """(секунд на запит без метрик, додаткових секунд на запит з метриками)."""
+    block = metrics.SQL_SAMPLE_EVERY
+    # Лічильник запитів маршруту кратний блоку (як і прогрів), тож вибірка SQL припадає
+    # на останню позицію блоку
+    for app in (plain, instrumented):
+        for _ in range(25 * block):
+            assert await call(app, scope) == 200
+    times, extra = [], [[] for _ in range(block)]
+    for i in range(max(requests // block, 1)):
+        # Порядок у парі чергується: жоден застосунок не йде постійно першим
+        first, second = (plain, instrumented) if i % 2 else (instrumented, plain)
+        for position in extra:
+            started = time.perf_counter()
+            await call(first, scope)
+            middle = time.perf_counter()
+            await call(second, scope)
+            finished = time.perf_counter()
+            base, other = (middle - started, finished - middle) if i % 2 else (finished - middle, middle - started)
+            times.append(base)
+            position.append(other - base)
+    sampled = statistics.median(extra.pop())
+    rest = statistics.median(difference for position in extra for difference in position)
+    return statistics.median(times), (sampled + (block - 1) * rest) / block
+
+
+async def main(requests: int, rounds: int, max_share: float) -> bool:
+    cases = {"async /books/{id}": make_scope("/books/7"), "sync /books/sync/{id}": make_scope("/books/sync/7"),
+             "sync+SQL /books/db/{id}": make_scope("/books/db/7")}
+
+    ok = True
+    print(f"{'case':<24}{'без метрик':>20}{'InstrumentedRoute':>20}{'+мкс/запит':>12}{'бюджету':>10}")
+    for case, scope in cases.items():
+        results = []
+        for i in range(rounds):
+            # Застосунки будуються по черзі в різному порядку: розміщення в пам'яті теж дає зсув
+            route_classes = (InstrumentedRoute, APIRoute) if i % 2 else (APIRoute, InstrumentedRoute)
+            apps = {route_class: build_app(route_class) for route_class in route_classes}
+            results.append(await measure(apps[APIRoute], apps[InstrumentedRoute], scope, requests))
+        plain = statistics.median(seconds for seconds, _ in results)
+        extra = statistics.median(extra for _, extra in results)
+        instrumented = plain + extra
+        share = extra / max(plain, BUDGET_SECONDS)
+        ok &= share < max_share
+        print(f"{case:<24}" + "".join(f"{1 / seconds:>14.0f} req/s" for seconds in (plain, instrumented))
+              + f"{extra * 1e6:>12.1f}{share:>9.1%}")
+
+    series = sum(1 for line in metrics.registry.render().splitlines() if line.startswith("app_request_duration_seconds_count"))
+    print(f"\nрядів app_request_duration_seconds: {series}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=6000, help="запитів на застосунок у кожному раунді")
+    parser.add_argument("--rounds", type=int, default=9, help="раундів з новою парою застосунків на випадок")
+    parser.add_argument("--max-share", type=float, default=0.02, help="допустима частка бюджету запиту")
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(main(args.requests, args.rounds, args.max_share)) else 1)
@@ -0,0 +1,205 @@
+"""
+Збій Redis під навантаженням: статуси й затримка до, під час і після недоступності Redis.
+
+    python benchmarks/redis_outage.py [--books 1000] [--requests 300] [--reset-seconds 0.5]
+    python benchmarks/redis_outage.py --redis-server redis-server
+
+За замовчуванням Redis — fakeredis: збій імітує FakeServer.connected = False (відмова
+з'єднання). З --redis-server запускається справжній redis-server на вільному порту й
+клієнти йдуть через пул resilient_redis; збій — SIGSTOP (сервер «висить», спрацьовують
+таймаути сокетів), відновлення — SIGCONT.
+
+Фази: redis up -> redis down -> recovery (після REDIS_BREAKER_RESET_SECONDS). Під час
+збою інвалідується книга 1; після відновлення перевіряється, що інвалідація дійшла до
+Redis. Код виходу 1, якщо хоч одна відповідь не 200 або запобіжник не закрився.
+
+Потрібні додатково: fakeredis (pip install -r requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from asgi_load import attach_redis, prepare_database  # noqa: E402 — той самий кешований набір даних
+from json_serialization import call, make_scope  # noqa: E402
+
+
+# =========================
+#  ЗАМІННИКИ REDIS
+# =========================
+class FakeRedisServer:
+    def __init__(self):
+        import fakeredis
+
+        self.server = fakeredis.FakeServer()
+
+    def clients(self):
+        import fakeredis
+
+        return fakeredis.FakeRedis(server=self.server), fakeredis.FakeAsyncRedis(server=self.server)
+
+    def down(self):
+        self.server.connected = False
+
+    def up(self):
+        self.server.connected = True
+
+    def stop(self):
+        pass
+
+
+class SpawnedRedisServer:
+    def __init__(self, binary: str):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.process = subprocess.Popen(
+            [binary, "--port", str(self.port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise SystemExit("redis-server не запустився")
+                time.sleep(0.05)
+
+    def clients(self):
+        from resilient_redis import async_pooled_client, pooled_client
+
+        url = f"redis://127.0.0.1:{self.port}/0"
+        return pooled_client(url), async_pooled_client(url)
+
+    def down(self):
+        self.process.send_signal(signal.SIGSTOP)
+
+    def up(self):
+        self.process.send_signal(signal.SIGCONT)
+
+    def stop(self):
+        self.process.send_signal(signal.SIGCONT)
+        self.process.terminate()
+        self.process.wait()
+
+
+# =========================
+#  ФАЗИ
+# =========================
+async def run_phase(app, scope, requests: int) -> dict:
+    latencies, statuses = [], {}
+    for _ in range(requests):
+        started = time.perf_counter()
+        status, _ = await call(app, scope)
+        latencies.append(time.perf_counter() - started)
+        statuses[status] = statuses.get(status, 0) + 1
+    latencies.sort()
+    return {
+        "statuses": statuses,
+        "p50": statistics.median(latencies) * 1000,
+        "p99": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "max": latencies[-1] * 1000,
+    }
+
+
+async def run(args, redis_server) -> bool:
+    import app as app_module
+    from resilient_redis import AsyncResilientRedis, CircuitBreaker, ResilientRedis
+
+    app = app_module.app
+    state = app.state
+    sync_redis, async_redis = redis_server.clients()
+    attach_redis(app, ResilientRedis(sync_redis, CircuitBreaker(reset_seconds=args.reset_seconds)),
+                 AsyncResilientRedis(async_redis, CircuitBreaker(reset_seconds=args.reset_seconds)))
+    async_mode = state.settings.db_mode == "async"
+    clients = {"sync": state.redis_client, "async": state.async_redis_client}
+    client = clients["async" if async_mode else "sync"]
+
+    def breakers() -> str:
+        return ", ".join(f"{name}: {c.breaker.state}/{len(c.fallback)}" for name, c in clients.items())
+
+    async def invalidate_book():
+        if async_mode:
+            await state.async_entity_cache.invalidate("book", 1)
+        else:
+            state.entity_cache.invalidate("book", 1)
+
+    async def book_cached() -> bool:
+        raw = await async_redis.get("book:1") if async_mode else sync_redis.get("book:1")
+        return raw is not None
+
+    cases = {"GET /books/1": make_scope("/books/1"), "GET /books?ids=1..50":
+             make_scope("/books", {"ids": ",".join(str(book_id) for book_id in range(1, 51))})}
+
+    ok = True
+    print(f"DB_MODE={state.settings.db_mode}, Redis: {type(redis_server).__name__}")
+    print(f"{'phase':<10} {'route':<22} {'statuses':<14} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  запобіжник/локальних ключів")
+
+    async def report(phase):
+        nonlocal ok
+        for case, scope in cases.items():
+            result = await run_phase(app, scope, args.requests)
+            ok &= set(result["statuses"]) == {200}
+            print(f"{phase:<10} {case:<22} {str(result['statuses']):<14} {result['p50']:>8.2f} "
+                  f"{result['p99']:>8.2f} {result['max']:>8.2f}  {breakers()}")
+
+    await report("up")
+
+    redis_server.down()
+    await invalidate_book()
+    await report("down")
+    pending = client.pending_invalidations
+
+    redis_server.up()
+    await asyncio.sleep(args.reset_seconds)
+    # Перший запит після паузи — пробна команда: спершу доходять відкладені інвалідації
+    await call(app, make_scope("/authors/1"))
+    stale = await book_cached()
+    await report("recovery")
+
+    closed = all(c.breaker.state == "closed" for c in clients.values())
+    print(f"\nінвалідацій під час збою: {pending}; після відновлення book:1 у Redis до перезавантаження: "
+          f"{'так (ЗАСТАРІЛЕ)' if stale else 'ні'}; {breakers()}")
+    return ok and closed and not stale and pending == 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--books", type=int, default=1000, help="розмір набору даних (див. asgi_load.py)")
+    parser.add_argument("--requests", type=int, default=300, help="запитів на маршрут у кожній фазі")
+    parser.add_argument("--reset-seconds", type=float, default=0.5, help="пауза запобіжника перед пробною командою")
+    parser.add_argument("--redis-server", help="шлях до redis-server; без нього — fakeredis")
+    args = parser.parse_args()
+
+    import logging
+    import warnings
+    warnings.simplefilter("ignore")
+    logging.basicConfig(level=logging.WARNING, format="  [%(levelname)s] %(message)s")
+    workdir = tempfile.mkdtemp(prefix="redis_outage-")
+    # DATABASE_URL має бути встановлений до першого імпорту base
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    prepare_database(args.books, workdir)
+
+    redis_server = SpawnedRedisServer(args.redis_server) if args.redis_server else FakeRedisServer()
+    try:
+        ok = asyncio.run(run(args, redis_server))
+    finally:
+        redis_server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Порівняння SecurityHeadersMiddleware: стара версія на BaseHTTPMiddleware проти чистого ASGI.
+
+    python benchmarks/security_middleware.py [--requests 20000]
+
+Обидві версії обгортають той самий мінімальний Starlette-застосунок; запити подаються
+напряму через ASGI-інтерфейс (без мережі), тож різниця — це саме накладні витрати middleware.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from middleware.headers import SecurityHeadersMiddleware
+from middleware.security import CSRF_SESSION_COOKIE, csrf_protection
+
+SESSION_ID = "benchmark-session"
+
+
+class LegacySecurityHeadersMiddleware(BaseHTTPMiddleware):
+    """Попередня реалізація з middleware/headers.py — лише для порівняння."""
+
+    async def dispatch(self, request, call_next):
+        if request.method in ['GET', 'HEAD', 'OPTIONS']:
+            response = await call_next(request)
+            response.headers['GET-SECURE'] = 'true'
+            return response
+
+        csrf_token = request.headers.get("X-CSRF-Token")
+        if not csrf_protection.verify_token(csrf_token, request.cookies.get(CSRF_SESSION_COOKIE)):
+            return Response("CSRF token missing or invalid", status_code=403)
+
+        response = await call_next(request)
+        response.headers['POST-SECURE'] = 'true'
+        return response
+
+
+async def plain(request):
+    return PlainTextResponse("ok")
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(16):
+            yield b"x" * 1024
+    return StreamingResponse(chunks())
+
+
+def build_app(middleware_class):
+    app = Starlette(routes=[Route("/", plain, methods=["GET", "POST"]), Route("/stream", stream)])
+    app.add_middleware(middleware_class)
+    return app
+
+
+def make_scope(method: str, path: str, headers: list):
+    return {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": headers, "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+    }
+
+
+async def call(app, scope):
+    status = None
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if request_sent:
+            # Клієнт не відключається: StreamingResponse скасує це очікування сам
+            await asyncio.Event().wait()
+        request_sent = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, scope, requests: int) -> float:
+    assert await call(app, scope) == 200
+    started = time.perf_counter()
+    for _ in range(requests):
+        await call(app, scope)
+    return requests / (time.perf_counter() - started)
+
+
+async def main(requests: int):
+    token_header = [
+        (b"x-csrf-token", csrf_protection.generate_token(SESSION_ID).encode()),
+        (b"cookie", f"{CSRF_SESSION_COOKIE}={SESSION_ID}".encode()),
+    ]
+    cases = {
+        "GET /": make_scope("GET", "/", []),
+        "GET /stream": make_scope("GET", "/stream", []),
+        "POST / (CSRF)": make_scope("POST", "/", token_header),
+    }
+    apps = {"BaseHTTPMiddleware": build_app(LegacySecurityHeadersMiddleware),
+            "pure ASGI": build_app(SecurityHeadersMiddleware)}
+
+    print(f"{'case':<16}" + "".join(f"{name:>22}" for name in apps) + f"{'speedup':>10}")
+    for case, scope in cases.items():
+        results = [await measure(app, scope, requests) for app in apps.values()]
+        print(f"{case:<16}" + "".join(f"{rps:>16.0f} req/s" for rps in results)
+              + f"{results[1] / results[0]:>9.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20000)
+    asyncio.run(main(parser.parse_args().requests))
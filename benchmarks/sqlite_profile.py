@@ -0,0 +1,114 @@
+"""
+Змішане навантаження читання/запису для порівняння профілів SQLite (DB_PROFILE).
+
+    python benchmarks/sqlite_profile.py --seconds 10 --readers 8 --writers 2
+
+Кожен профіль запускається в окремому процесі (base.py читає налаштування з env
+під час імпорту) на власній тимчасовій базі, заповненій --books книгами.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_worker(args):
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import insert, select, update
+
+    import base
+    from models.models import Author, Book, User
+
+    base.Base.metadata.create_all(bind=base.engine)
+    with base.SessionLocal() as db:
+        db.add(User(username="bench", password="bench"))
+        db.add(Author(full_name="Bench Author"))
+        db.commit()
+        db.execute(insert(Book), [
+            {"title": f"Book {i}", "publication_year": 1900 + i % 120, "genre": "bench",
+             "description": "x" * 200, "author_id": 1, "user_id": 1}
+            for i in range(args.books)
+        ])
+        db.commit()
+
+    stop = time.perf_counter() + args.seconds
+    counts = {"reads": 0, "writes": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def reader():
+        done = 0
+        while time.perf_counter() < stop:
+            with base.ReadSessionLocal() as db:
+                db.execute(select(Book).where(Book.id == random.randint(1, args.books))).first()
+            done += 1
+        with lock:
+            counts["reads"] += done
+
+    def writer():
+        done = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                with base.SessionLocal() as db:
+                    db.execute(update(Book).where(Book.id == random.randint(1, args.books)).values(title="updated"))
+                    db.commit()
+                done += 1
+            except Exception:
+                errors += 1
+        with lock:
+            counts["writes"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    print(json.dumps({
+        "profile": base.DB_PROFILE,
+        "reads_per_sec": round(counts["reads"] / args.seconds),
+        "writes_per_sec": round(counts["writes"] / args.seconds),
+        "write_errors": counts["errors"],
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--books", type=int, default=10_000)
+    parser.add_argument("--profiles", nargs="+", default=["default", "production"])
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    worker_args = [
+        "--worker", "--seconds", str(args.seconds), "--readers", str(args.readers),
+        "--writers", str(args.writers), "--books", str(args.books),
+    ]
+    for profile in args.profiles:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "DB_PROFILE": profile, "DATABASE_URL": f"sqlite:///{tmp}/bench.db"}
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), *worker_args],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['profile']:<12} reads/s={result['reads_per_sec']:<8} "
+              f"writes/s={result['writes_per_sec']:<8} write errors={result['write_errors']}")
+
+
+if __name__ == "__main__":
+    main()
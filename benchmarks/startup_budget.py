@@ -0,0 +1,137 @@
+"""
+Бюджет холодного старту воркера: імпорт app, lifespan startup і перший запит.
+
+    python benchmarks/startup_budget.py [--runs 7] [--import-ms 1000] [--startup-ms 50] [--first-request-ms 250]
+
+Кожен замір — окремий процес Python (холодні імпорти, нові engine), база — тимчасова
+з кількома рядками, Redis вимкнений (REDIS_URL=""), щоб міряти саме застосунок.
+Друкує медіану й максимум по фазах; код виходу 1, якщо медіана перевищує бюджет.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Виконується в дочірньому процесі; друкує JSON з мілісекундами по фазах
+CHILD = r"""
+import time
+started = time.perf_counter()
+import asyncio, json, sys, warnings
+sys.path.insert(0, sys.argv[1])
+warnings.simplefilter("ignore")
+import app as app_module
+imported = time.perf_counter()
+
+
+async def call(app, path):
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app({
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }, receive, send)
+    return status
+
+
+async def main():
+    app = app_module.app
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        status = await call(app, "/books/1")
+        first = time.perf_counter()
+        await call(app, "/books/1")
+        second = time.perf_counter()
+    print(json.dumps({
+        "import_ms": (imported - started) * 1000,
+        "startup_ms": (ready - imported) * 1000,
+        "first_request_ms": (first - ready) * 1000,
+        "second_request_ms": (second - first) * 1000,
+        "status": status,
+    }))
+
+
+asyncio.run(main())
+"""
+
+PHASES = ("import_ms", "startup_ms", "first_request_ms", "second_request_ms", "process_ms")
+
+
+def prepare_database(path: str):
+    from sqlalchemy import create_engine, insert
+
+    import models.models  # noqa: F401 — реєструє таблиці в Base.metadata
+    from base import Base
+    from models.models import Author, Book, User
+
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "username": "admin", "password": "x"}])
+        conn.execute(insert(Author), [{"id": 1, "full_name": "Ліна Костенко", "country": "Україна"}])
+        conn.execute(insert(Book), [{"id": 1, "title": "Маруся Чурай", "publication_year": 1979, "genre": "Роман",
+                                     "description": "Історичний роман у віршах", "author_id": 1, "user_id": 1}])
+    engine.dispose()
+
+
+def measure(env: dict) -> dict:
+    started = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", CHILD, ROOT], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    result["process_ms"] = (time.perf_counter() - started) * 1000
+    if result["status"] != 200:
+        raise SystemExit(f"Перший запит повернув HTTP {result['status']}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--import-ms", type=float, default=1000, help="бюджет імпорту app (разом з create_app)")
+    parser.add_argument("--startup-ms", type=float, default=50, help="бюджет lifespan startup")
+    parser.add_argument("--first-request-ms", type=float, default=250, help="бюджет першого запиту")
+    args = parser.parse_args()
+    budgets = {"import_ms": args.import_ms, "startup_ms": args.startup_ms, "first_request_ms": args.first_request_ms}
+
+    workdir = tempfile.mkdtemp(prefix="startup_budget-")
+    path = os.path.join(workdir, "startup.db")
+    prepare_database(path)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{path}", "REDIS_URL": ""}
+    env.pop("ASYNC_DATABASE_URL", None)
+
+    measure(env)  # прогрів файлового кешу ОС і .pyc
+    runs = [measure(env) for _ in range(args.runs)]
+
+    failed = False
+    print(f"{'phase':<20} {'median ms':>10} {'max ms':>10} {'budget ms':>10}")
+    for phase in PHASES:
+        values = [run[phase] for run in runs]
+        median = statistics.median(values)
+        budget = budgets.get(phase)
+        over = budget is not None and median > budget
+        failed |= over
+        print(f"{phase:<20} {median:>10.1f} {max(values):>10.1f} {budget if budget is not None else '':>10}"
+              + ("  ПЕРЕВИЩЕНО" if over else ""))
+
+    os.remove(path)
+    os.rmdir(workdir)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Перевірка кількості SQL-запитів на ендпоінт (захист від N+1).
+
+    python benchmarks/statement_budget.py
+
+Запускає застосунок на тимчасовій базі, виконує кожен запит з STATEMENT_BUDGETS
+і завершується з кодом 1, якщо ендпоінт виконав більше SQL-операторів, ніж дозволено.
+Кеш Redis не підключається, тож кожен запит доходить до БД. Запити йдуть напряму через
+ASGI-інтерфейс, як в інших бенчмарках, тож httpx (потрібен fastapi.testclient) не потрібен.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (метод, шлях) -> максимальна кількість SQL-операторів
+STATEMENT_BUDGETS = {
+    ("GET", "/books/1"): 1,
+    ("GET", "/books?limit=50"): 2,
+    ("GET", "/books?genre=genre-1&sort=-publication_year&limit=50"): 2,
+    ("GET", "/authors/1/books?limit=50"): 1,
+    ("GET", "/authors/1"): 1,
+    ("GET", "/users/1"): 1,
+}
+
+
+def seed(db, authors: int = 10, books: int = 200):
+    from sqlalchemy import insert
+
+    from models.models import Author, Book, User
+
+    db.add(User(username="budget", password="budget"))
+    db.add_all([Author(full_name=f"Author {i}") for i in range(authors)])
+    db.commit()
+    db.execute(insert(Book), [
+        {"title": f"Book {i}", "publication_year": 1900 + i % 100, "genre": f"genre-{i % 5}",
+         "description": "description", "author_id": i % authors + 1, "user_id": 1}
+        for i in range(books)
+    ])
+    db.commit()
+
+
+async def call(app, method: str, path: str) -> int:
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": query.encode(),
+        "root_path": "", "headers": [(b"host", b"budget")], "client": ("127.0.0.1", 1), "server": ("budget", 80),
+    }
+    status = None
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def main() -> int:
+    tmp = tempfile.mkdtemp()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/budget.db"
+    sys.path.insert(0, ROOT)
+
+    import warnings
+    warnings.simplefilter("ignore")
+
+    import base
+    from app import app
+    from query_counter import StatementCounter
+
+    base.Base.metadata.create_all(bind=base.engine)
+    with base.SessionLocal() as db:
+        seed(db)
+
+    failed = False
+    database = app.state.database
+    engines = (database.engine, database.read_engine,
+               database.async_engine.sync_engine, database.async_read_engine.sync_engine)
+    for (method, path), budget in STATEMENT_BUDGETS.items():
+        with StatementCounter(*engines) as counter:
+            http_status = asyncio.run(call(app, method, path))
+        status = "ok" if counter.count <= budget and http_status < 400 else "FAIL"
+        failed |= status == "FAIL"
+        print(f"{status:<5} {method} {path:<60} statements={counter.count} budget={budget} "
+              f"http={http_status}")
+        if status == "FAIL":
+            for statement in counter.statements:
+                print("      ", " ".join(statement.split())[:160])
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,240 @@
+import os
+import logging
+from collections import defaultdict
+from typing import Callable, Iterable, Optional, Type, TypeVar
+
+from pydantic import BaseModel
+from redis import RedisError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import Book
+from resilient_redis import AsyncResilientRedis, ResilientRedis
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", 300))
+INVALIDATE_BATCH_SIZE = 1000
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+
+class BaseEntityCache:
+    """Спільні для sync та async кешу ключі, TTL і лічильники влучань."""
+
+    def __init__(self, client=None, ttl: int = CACHE_TTL_SECONDS):
+        self.client = client
+        self.ttl = ttl
+        self.stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+
+    def generation(self) -> Optional[int]:
+        """
+        Читається до loader(): set/set_many з ним не запишуть у Redis і L1 рядок, завантажений
+        до інвалідації, що сталася, поки працював loader (інакше застаріле значення жило б увесь TTL).
+        """
+        return None if self.client is None else self.client.generation
+
+    @staticmethod
+    def key(kind: str, entity_id: int) -> str:
+        return f"{kind}:{entity_id}"
+
+    def _decode(self, kind: str, raw, model: Type[ModelT]) -> Optional[ModelT]:
+        if raw is None:
+            self.stats[kind]["misses"] += 1
+            return None
+        self.stats[kind]["hits"] += 1
+        return model.model_validate_json(raw)
+
+    def _decode_many(self, kind: str, entity_ids: list[int], raws: list, model: Type[ModelT]) -> dict[int, ModelT]:
+        found = {}
+        for entity_id, raw in zip(entity_ids, raws):
+            value = self._decode(kind, raw, model)
+            if value is not None:
+                found[entity_id] = value
+        return found
+
+    @staticmethod
+    def _validate_many(objects: Iterable, model: Type[ModelT]) -> dict[int, ModelT]:
+        return {obj.id: model.model_validate(obj, from_attributes=True) for obj in objects}
+
+
+class EntityCache(BaseEntityCache):
+    """
+    Read-through кеш серіалізованих response-моделей (BookResponse, AuthorResponse,
+    UserResponse) у Redis. Поки client не заданий, кеш вимкнений і все йде в БД.
+    """
+    client: Optional[ResilientRedis]
+
+    def get(self, kind: str, entity_id: int, model: Type[ModelT]) -> Optional[ModelT]:
+        if self.client is None:
+            return None
+        try:
+            raw = self.client.get(self.key(kind, entity_id))
+        except RedisError:
+            logger.warning("Redis недоступний, читаємо %s:%s з БД", kind, entity_id)
+            raw = None
+        return self._decode(kind, raw, model)
+
+    def set(self, kind: str, entity_id: int, value: BaseModel, generation: Optional[int] = None):
+        if self.client is None:
+            return
+        try:
+            self.client.set(self.key(kind, entity_id), value.model_dump_json(), ex=self.ttl, generation=generation)
+        except RedisError:
+            logger.warning("Не вдалося закешувати %s:%s", kind, entity_id)
+
+    def get_or_load(self, kind: str, entity_id: int, model: Type[ModelT], loader: Callable) -> Optional[ModelT]:
+        """Повертає модель з кешу, а при промаху — з loader() (ORM-об'єкт або None) і кешує її."""
+        cached = self.get(kind, entity_id, model)
+        if cached is not None:
+            return cached
+
+        generation = self.generation()
+        obj = loader()
+        if obj is None:
+            return None
+        value = model.model_validate(obj, from_attributes=True)
+        self.set(kind, entity_id, value, generation)
+        return value
+
+    def get_many(self, kind: str, entity_ids: list[int], model: Type[ModelT]) -> dict[int, ModelT]:
+        """Один MGET на всі ключі; повертає лише знайдені."""
+        if self.client is None or not entity_ids:
+            return {}
+        try:
+            raws = self.client.mget([self.key(kind, entity_id) for entity_id in entity_ids])
+        except RedisError:
+            logger.warning("Redis недоступний, читаємо %s:%s з БД", kind, entity_ids)
+            raws = [None] * len(entity_ids)
+        return self._decode_many(kind, entity_ids, raws, model)
+
+    def set_many(self, kind: str, values: dict[int, BaseModel], generation: Optional[int] = None):
+        """Усі SET з TTL одним конвеєром (без MULTI) — один обмін з Redis."""
+        if self.client is None or not values:
+            return
+        try:
+            with self.client.pipeline(transaction=False, generation=generation) as pipe:
+                for entity_id, value in values.items():
+                    pipe.set(self.key(kind, entity_id), value.model_dump_json(), ex=self.ttl)
+                pipe.execute()
+        except RedisError:
+            logger.warning("Не вдалося закешувати %s:%s", kind, list(values))
+
+    def get_or_load_many(self, kind: str, entity_ids: list[int], model: Type[ModelT],
+                         loader: Callable[[list[int]], Iterable]) -> dict[int, ModelT]:
+        """
+        Пакетний get_or_load: loader(ids) отримує лише промахи кешу й повертає ORM-об'єкти.
+        Результат — {id: модель} без відсутніх у БД id.
+        """
+        found = self.get_many(kind, entity_ids, model)
+        missing = [entity_id for entity_id in entity_ids if entity_id not in found]
+        if missing:
+            generation = self.generation()
+            loaded = self._validate_many(loader(missing), model)
+            self.set_many(kind, loaded, generation)
+            found.update(loaded)
+        return found
+
+    def invalidate(self, kind: str, *entity_ids: int):
+        if self.client is None or not entity_ids:
+            return
+        try:
+            self.client.delete(*[self.key(kind, entity_id) for entity_id in entity_ids])
+        except RedisError:
+            logger.error("Не вдалося інвалідувати %s:%s", kind, entity_ids)
+
+    def invalidate_author(self, db: Session, author_id: int):
+        """Скидає автора та всі закешовані BookResponse, у які він вбудований."""
+        self.invalidate("author", author_id)
+        if self.client is None:
+            return
+        for partition in db.scalars(select(Book.id).where(Book.author_id == author_id)).partitions(INVALIDATE_BATCH_SIZE):
+            self.invalidate("book", *partition)
+
+
+class AsyncEntityCache(BaseEntityCache):
+    """Те саме, що EntityCache, але через redis.asyncio для async-ендпоінтів."""
+    client: Optional[AsyncResilientRedis]
+
+    async def get(self, kind: str, entity_id: int, model: Type[ModelT]) -> Optional[ModelT]:
+        if self.client is None:
+            return None
+        try:
+            raw = await self.client.get(self.key(kind, entity_id))
+        except RedisError:
+            logger.warning("Redis недоступний, читаємо %s:%s з БД", kind, entity_id)
+            raw = None
+        return self._decode(kind, raw, model)
+
+    async def set(self, kind: str, entity_id: int, value: BaseModel, generation: Optional[int] = None):
+        if self.client is None:
+            return
+        try:
+            await self.client.set(self.key(kind, entity_id), value.model_dump_json(), ex=self.ttl, generation=generation)
+        except RedisError:
+            logger.warning("Не вдалося закешувати %s:%s", kind, entity_id)
+
+    async def get_or_load(self, kind: str, entity_id: int, model: Type[ModelT], loader: Callable) -> Optional[ModelT]:
+        """loader — корутинна функція, що повертає ORM-об'єкт або None."""
+        cached = await self.get(kind, entity_id, model)
+        if cached is not None:
+            return cached
+
+        generation = self.generation()
+        obj = await loader()
+        if obj is None:
+            return None
+        value = model.model_validate(obj, from_attributes=True)
+        await self.set(kind, entity_id, value, generation)
+        return value
+
+    async def get_many(self, kind: str, entity_ids: list[int], model: Type[ModelT]) -> dict[int, ModelT]:
+        if self.client is None or not entity_ids:
+            return {}
+        try:
+            raws = await self.client.mget([self.key(kind, entity_id) for entity_id in entity_ids])
+        except RedisError:
+            logger.warning("Redis недоступний, читаємо %s:%s з БД", kind, entity_ids)
+            raws = [None] * len(entity_ids)
+        return self._decode_many(kind, entity_ids, raws, model)
+
+    async def set_many(self, kind: str, values: dict[int, BaseModel], generation: Optional[int] = None):
+        if self.client is None or not values:
+            return
+        try:
+            async with self.client.pipeline(transaction=False, generation=generation) as pipe:
+                for entity_id, value in values.items():
+                    pipe.set(self.key(kind, entity_id), value.model_dump_json(), ex=self.ttl)
+                await pipe.execute()
+        except RedisError:
+            logger.warning("Не вдалося закешувати %s:%s", kind, list(values))
+
+    async def get_or_load_many(self, kind: str, entity_ids: list[int], model: Type[ModelT],
+                               loader: Callable) -> dict[int, ModelT]:
+        """loader — корутинна функція, що отримує список промахів і повертає ORM-об'єкти."""
+        found = await self.get_many(kind, entity_ids, model)
+        missing = [entity_id for entity_id in entity_ids if entity_id not in found]
+        if missing:
+            generation = self.generation()
+            loaded = self._validate_many(await loader(missing), model)
+            await self.set_many(kind, loaded, generation)
+            found.update(loaded)
+        return found
+
+    async def invalidate(self, kind: str, *entity_ids: int):
+        if self.client is None or not entity_ids:
+            return
+        try:
+            await self.client.delete(*[self.key(kind, entity_id) for entity_id in entity_ids])
+        except RedisError:
+            logger.error("Не вдалося інвалідувати %s:%s", kind, entity_ids)
+
+    async def invalidate_author(self, db: AsyncSession, author_id: int):
+        await self.invalidate("author", author_id)
+        if self.client is None:
+            return
+        result = await db.stream_scalars(select(Book.id).where(Book.author_id == author_id))
+        async for partition in result.partitions(INVALIDATE_BATCH_SIZE):
+            await self.invalidate("book", *partition)
+
@@ -0,0 +1,64 @@
+"""
+Звірка й перебудова лічильників каталогу (author_book_counts, genre_book_counts, decade_book_counts).
+
+    python catalog_stats.py [--check] [--url sqlite:///library.db]
+
+Лічильники підтримуються тригерами; перебудова потрібна після змін в обхід тригерів
+(масове завантаження seed_data.py, ручні правки БД) або щоб перевірити, що розбіжностей немає.
+"""
+import argparse
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+from base import SQLALCHEMY_DATABASE_URL
+from models.models import BOOK_COUNTERS, book_counter_ddl, book_counter_rebuild_sql
+
+
+def drift(conn) -> dict[str, int]:
+    """Кількість ключів, у яких збережений лічильник не збігається з GROUP BY по books."""
+    result = {}
+    for table, key, column, expression in BOOK_COUNTERS:
+        expression = expression.format(row="books")
+        expected = dict(conn.execute(text(
+            f"SELECT {expression}, COUNT(*) FROM books WHERE {expression} IS NOT NULL GROUP BY {expression}"
+        )).all())
+        stored = dict(conn.execute(text(f"SELECT {key}, book_count FROM {table.name}")).all())
+        result[table.name] = sum(1 for k in expected.keys() | stored.keys() if expected.get(k) != stored.get(k))
+    return result
+
+
+def rebuild(conn):
+    """
+    Перераховує всі лічильники одним INSERT ... SELECT на таблицю і (пере)створює тригери.
+    Виконується в транзакції conn — читачі бачать або старі, або нові значення.
+    """
+    for table, *counter in BOOK_COUNTERS:
+        conn.execute(table.delete())
+        conn.exec_driver_sql(book_counter_rebuild_sql(table.name, *counter))
+        for ddl in book_counter_ddl(table.name, *counter):
+            conn.exec_driver_sql(ddl)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--check", action="store_true", help="лише показати розбіжності; код виходу 1, якщо вони є")
+    parser.add_argument("--url", default=SQLALCHEMY_DATABASE_URL, help="за замовчуванням DATABASE_URL з base.py")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    with engine.begin() as conn:
+        mismatched = drift(conn)
+        for table, count in mismatched.items():
+            print(f"{table}: {count} розбіжностей")
+        if args.check:
+            sys.exit(1 if any(mismatched.values()) else 0)
+        started = time.perf_counter()
+        rebuild(conn)
+    engine.dispose()
+    print(f"Лічильники перебудовано за {time.perf_counter() - started:.1f} с")
+
+
+if __name__ == "__main__":
+    main()
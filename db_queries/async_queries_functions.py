@@ -0,0 +1,174 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from models.models import Book, Author, User
+from pydantic_models import AuthorCreate, BookCreateUpdate, UserCreate
+
+
+# ==========================
+#      ASYNC BOOK CRUD
+# ==========================
+
+async def get_book(db: AsyncSession, book_id: int) -> Book | None:
+    """
+    Повертає книгу за ID разом з автором (BookResponse вбудовує автора,
+    а ліниве завантаження в AsyncSession неможливе).
+    """
+    result = await db.execute(select(Book).options(joinedload(Book.author)).where(Book.id == book_id))
+    return result.scalar_one_or_none()
+
+
+async def get_books(db: AsyncSession, book_ids: list[int]) -> list[Book]:
+    """Книги за id разом з авторами — для пакетного GET /books?ids=."""
+    return list(await db.scalars(select(Book).options(joinedload(Book.author)).where(Book.id.in_(book_ids))))
+
+
+async def get_book_versions(db: AsyncSession, book_id: int):
+    """Версії книги й автора для умовних запитів (див. versioning.book_version_meta)."""
+    result = await db.execute(
+        select(Book.id, Book.version, Book.updated_at,
+               Author.version.label("author_version"), Author.updated_at.label("author_updated_at"))
+        .join(Author, Author.id == Book.author_id)
+        .where(Book.id == book_id)
+    )
+    return result.first()
+
+
+async def create_book(db: AsyncSession, data: BookCreateUpdate) -> Book:
+    """
+    Створення нової книги. Автор і користувач мають бути перевірені заздалегідь.
+    """
+    book = Book(**data.dict())
+    db.add(book)
+    await db.commit()
+    return await get_book(db, book.id)
+
+
+async def update_book(db: AsyncSession, book: Book, data: BookCreateUpdate) -> Book:
+    """
+    Оновлює книгу.
+    """
+    book_id = book.id
+    for key, value in data.dict().items():
+        setattr(book, key, value)
+    await db.commit()
+    # Після expire звернення до book.id було б лінивим SQL-запитом, неможливим в AsyncSession
+    db.expire(book)
+    return await get_book(db, book_id)
+
+
+async def delete_book(db: AsyncSession, book_id: int) -> bool:
+    """
+    Видаляє книгу за ID.
+    """
+    book = await db.get(Book, book_id)
+    if not book:
+        return False
+    await db.delete(book)
+    await db.commit()
+    return True
+
+
+# ==========================
+#     ASYNC AUTHOR CRUD
+# ==========================
+
+async def get_author(db: AsyncSession, author_id: int) -> Author | None:
+    return await db.get(Author, author_id)
+
+
+async def get_author_versions(db: AsyncSession, author_id: int):
+    result = await db.execute(select(Author.id, Author.version, Author.updated_at).where(Author.id == author_id))
+    return result.first()
+
+
+async def get_authors(db: AsyncSession, author_ids: list[int]) -> list[Author]:
+    return list(await db.scalars(select(Author).where(Author.id.in_(author_ids))))
+
+
+async def create_author(db: AsyncSession, data: AuthorCreate) -> Author:
+    """
+    Створює нового автора.
+    """
+    author = Author(**data.dict())
+    db.add(author)
+    await db.commit()
+    return author
+
+
+async def update_author(db: AsyncSession, author_id: int, data: AuthorCreate) -> Author | None:
+    """
+    Оновлює автора за ID.
+    """
+    author = await db.get(Author, author_id)
+    if not author:
+        return None
+    for key, value in data.dict().items():
+        setattr(author, key, value)
+    await db.commit()
+    return author
+
+
+async def delete_author(db: AsyncSession, author_id: int) -> bool:
+    """
+    Видаляє автора за ID.
+    """
+    author = await db.get(Author, author_id)
+    if not author:
+        return False
+    await db.delete(author)
+    await db.commit()
+    return True
+
+
+# ==========================
+#      ASYNC USER CRUD
+# ==========================
+
+async def get_user(db: AsyncSession, user_id: int) -> User | None:
+    return await db.get(User, user_id)
+
+
+async def get_users(db: AsyncSession, user_ids: list[int]) -> list[User]:
+    return list(await db.scalars(select(User).where(User.id.in_(user_ids))))
+
+
+async def get_user_by_username(db: AsyncSession, username: str) -> User | None:
+    result = await db.execute(select(User).where(User.username == username))
+    return result.scalars().first()
+
+
+async def create_user(db: AsyncSession, data: UserCreate) -> User:
+    """
+    Створює нового користувача. data.password має бути вже захешований.
+    """
+    user = User(**data.dict())
+    db.add(user)
+    await db.commit()
+    return user
+
+
+async def update_user(db: AsyncSession, user_id: int, data: UserCreate) -> User | None:
+    """
+    Оновлює користувача за ID.
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        return None
+    for key, value in data.dict().items():
+        setattr(user, key, value)
+    await db.commit()
+    return user
+
+
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
+    """
+    Видаляє користувача за ID.
+    """
+    user = await db.get(User, user_id)
+    if not user:
+        return False
+    await db.delete(user)
+    await db.commit()
+    return True
@@ -1,7 +1,14 @@
-from sqlalchemy.orm import Session
-from base import SessionLocal
-from models.models import Book, Author
-from pydantic_models import AuthorCreate, BookCreateUpdate
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload
+import base
+from cache import EntityCache
+from models.models import Book, Author, User
+from pydantic_models import AuthorCreate, BookCreateUpdate, BookBulkResult
+
+BULK_CHUNK_SIZE = 1000
+# SQLite до 3.32 має ліміт у 999 параметрів на запит
+MAX_IN_PARAMS = 900
 
 
 # ==========================
@@ -12,33 +19,38 @@ def create_book(data: BookCreateUpdate) -> Book:
     """
     Створення нової книги.
     """
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         new_book = Book(
             title=data.title,
             publication_year=data.publication_year,
             genre=data.genre,
             description=data.description,
-            author_id=data.author_id
+            author_id=data.author_id,
+            user_id=data.user_id
         )
         session.add(new_book)
         session.commit()
-        session.refresh(new_book)
-        return new_book
+        return _get_book(session, new_book.id)
+
+
+def _get_book(session: Session, book_id: int) -> Book | None:
+    # Автор підвантажується тим самим запитом: після закриття сесії ліниве завантаження вже неможливе
+    return session.query(Book).options(joinedload(Book.author)).filter(Book.id == book_id).first()
 
 
 def get_book(book_id: int) -> Book | None:
     """
     Повертає книгу за ID.
     """
-    with SessionLocal() as session:
-        return session.query(Book).filter(Book.id == book_id).first()
+    with base.database.SessionLocal() as session:
+        return _get_book(session, book_id)
 
 
-def update_book(book_id: int, data: BookCreateUpdate) -> Book | None:
+def update_book(cache: EntityCache, book_id: int, data: BookCreateUpdate) -> Book | None:
     """
     Оновлює книгу за ID.
     """
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         book = session.query(Book).filter(Book.id == book_id).first()
 
         if not book:
@@ -48,15 +60,15 @@ def update_book(book_id: int, data: BookCreateUpdate) -> Book | None:
             setattr(book, key, value)
 
         session.commit()
-        session.refresh(book)
-        return book
+        cache.invalidate("book", book_id)
+        return _get_book(session, book_id)
 
 
-def delete_book(book_id: int) -> bool:
+def delete_book(cache: EntityCache, book_id: int) -> bool:
     """
     Видаляє книгу за ID.
     """
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         book = session.query(Book).filter(Book.id == book_id).first()
 
         if not book:
@@ -64,9 +76,72 @@ def delete_book(book_id: int) -> bool:
 
         session.delete(book)
         session.commit()
+        cache.invalidate("book", book_id)
         return True
 
 
+def _existing_ids(session: Session, column, ids: set[int]) -> set[int]:
+    """
+    Повертає ті з ids, що є в таблиці, одним IN-запитом (або кількома для дуже великих наборів).
+    """
+    ids = sorted(ids)
+    found = set()
+    for start in range(0, len(ids), MAX_IN_PARAMS):
+        found.update(session.scalars(select(column).where(column.in_(ids[start:start + MAX_IN_PARAMS]))))
+    return found
+
+
+def bulk_insert_books(session: Session, books: list[BookCreateUpdate], chunk_size: int = BULK_CHUNK_SIZE) -> BookBulkResult:
+    """
+    Масовий імпорт книг у переданій сесії.
+    Автори та користувачі перевіряються одним IN-запитом на весь пакет, вставка йде
+    через executemany частинами по chunk_size рядків, кожна частина — окрема транзакція.
+    Помилковий рядок потрапляє в errors і не зупиняє імпорт решти.
+    """
+    known_authors = _existing_ids(session, Author.id, {book.author_id for book in books})
+    known_users = _existing_ids(session, User.id, {book.user_id for book in books})
+
+    errors = []
+    valid = []
+    for index, book in enumerate(books):
+        if book.author_id not in known_authors:
+            errors.append({"index": index, "detail": f"Автор {book.author_id} не знайдений"})
+        elif book.user_id not in known_users:
+            errors.append({"index": index, "detail": f"Користувач {book.user_id} не знайдений"})
+        else:
+            valid.append((index, book.dict()))
+
+    inserted = 0
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        try:
+            session.execute(insert(Book), [row for _, row in chunk])
+            session.commit()
+            inserted += len(chunk)
+        except IntegrityError:
+            session.rollback()
+            # Частина впала — повторюємо її по рядку, щоб знайти винні рядки
+            for index, row in chunk:
+                try:
+                    with session.begin_nested():
+                        session.execute(insert(Book), [row])
+                    inserted += 1
+                except IntegrityError as exc:
+                    errors.append({"index": index, "detail": str(exc.orig)})
+            session.commit()
+
+    errors.sort(key=lambda error: error["index"])
+    return BookBulkResult(inserted=inserted, errors=errors)
+
+
+def create_books_bulk(data: list[BookCreateUpdate], chunk_size: int = BULK_CHUNK_SIZE) -> BookBulkResult:
+    """
+    Масове створення книг.
+    """
+    with base.database.SessionLocal() as session:
+        return bulk_insert_books(session, data, chunk_size)
+
+
 # ==========================
 #        AUTHOR CRUD
 # ==========================
@@ -75,7 +150,7 @@ def create_author(data: AuthorCreate) -> Author:
     """
     Створює нового автора.
     """
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         author = Author(**data.dict())
         session.add(author)
         session.commit()
@@ -84,15 +159,15 @@ def create_author(data: AuthorCreate) -> Author:
 
 
 def get_author(author_id: int) -> Author | None:
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         return session.query(Author).filter(Author.id == author_id).first()
 
 
-def update_author(author_id: int, data: AuthorCreate) -> Author | None:
+def update_author(cache: EntityCache, author_id: int, data: AuthorCreate) -> Author | None:
     """
     Оновлює автора за ID.
     """
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         author = session.query(Author).filter(Author.id == author_id).first()
 
         if not author:
@@ -103,14 +178,15 @@ def update_author(author_id: int, data: AuthorCreate) -> Author | None:
 
         session.commit()
         session.refresh(author)
+        cache.invalidate_author(session, author_id)
         return author
 
 
-def delete_author(author_id: int) -> bool:
+def delete_author(cache: EntityCache, author_id: int) -> bool:
     """
     Видаляє автора за ID.
     """
-    with SessionLocal() as session:
+    with base.database.SessionLocal() as session:
         author = session.query(Author).filter(Author.id == author_id).first()
 
         if not author:
@@ -118,4 +194,5 @@ def delete_author(author_id: int) -> bool:
 
         session.delete(author)
         session.commit()
+        cache.invalidate_author(session, author_id)
         return True
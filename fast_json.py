@@ -0,0 +1,39 @@
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# =========================
+#  ШВИДКА СЕРІАЛІЗАЦІЯ JSON (Settings.fast_json, FAST_JSON=1)
+# =========================
+# Без FAST_JSON ендпоінти повертають ORM-об'єкти/словники, а FastAPI валідує їх як
+# response_model (для sync-ендпоінтів — ще й окремим переходом у пул потоків) і лише
+# потім кодує. З FAST_JSON модель відповіді будується один раз з атрибутів і
+# віддається готовою відповіддю — FastAPI не валідує її вдруге.
+# ModelJSONResponse не ставиться як default_response_class застосунку: він приймає лише
+# моделі, а маршрути з response_model і так серіалізуються FastAPI напряму в байти (dump_json).
+
+
+class ModelJSONResponse(JSONResponse):
+    """Відповідь з pydantic-моделі: серіалізується напряму в байти (pydantic-core), без dict."""
+
+    def render(self, content: BaseModel) -> bytes:
+        return content.__pydantic_serializer__.to_json(content)
+
+
+def fast_response(request: Request, model: type[BaseModel], content: Any, response: Response | None = None,
+                  status_code: int = 200):
+    """
+    Якщо застосунок запиту створено з Settings.fast_json, будує model з content (ORM-об'єкти,
+    словники або вже готові моделі) і повертає ModelJSONResponse із заголовками response;
+    інакше повертає content без змін.
+    """
+    if not request.app.state.settings.fast_json:
+        return content
+    if not isinstance(content, model):
+        content = model.model_validate(content, from_attributes=True)
+    result = ModelJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.raw_headers.extend(response.headers.raw)
+    return result
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import re
+import uuid
+from dataclasses import dataclass
+
+from anyio import CancelScope, to_thread
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import HTTPException, Request
+from python_multipart import MultipartParser
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import parse_options_header
+
+# =========================
+#  CONTENT-ADDRESSED СХОВИЩЕ ФАЙЛІВ
+# =========================
+# Файл зберігається як uploads/blobs/<перші 2 символи sha256>/<sha256>.pdf,
+# тому однакові PDF займають місце на диску один раз, а однакові імена не перезаписують одне одного.
+UPLOAD_DIR = "uploads"
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+TMP_DIR = os.path.join(UPLOAD_DIR, "tmp")
+
+BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})\.pdf$")
+# Запас на заголовки multipart поверх самого файлу, коли перевіряємо Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+
+@dataclass
+class StoredFile:
+    filename: str
+    sha256: str
+    size: int
+    duplicate: bool
+
+    @property
+    def name(self) -> str:
+        return f"{self.sha256}.pdf"
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], f"{sha256}.pdf")
+
+
+def resolve_upload_path(filename: str) -> str | None:
+    """
+    Шлях на диску для /uploads/{filename}: <sha256>.pdf веде до blob-а,
+    інші імена — до файлів, завантажених до появи content-addressed сховища.
+    """
+    match = BLOB_NAME_RE.match(filename)
+    if match:
+        path = blob_path(match.group(1))
+    elif filename in (".", "..") or os.sep in filename:
+        return None
+    else:
+        path = os.path.join(UPLOAD_DIR, filename)
+    return path if os.path.isfile(path) else None
+
+
+def _too_large(max_size: int):
+    return HTTPException(413, f"Файл занадто великий. Максимальний розмір: {max_size // 1024 // 1024} MB")
+
+
+def _store_blob(tmp_path: str, sha256: str) -> bool:
+    """Переносить тимчасовий файл у сховище. Повертає True, якщо такий вміст уже був."""
+    final_path = blob_path(sha256)
+    if os.path.exists(final_path):
+        os.remove(tmp_path)
+        return True
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    os.replace(tmp_path, final_path)
+    return False
+
+
+def _open_tmp(tmp_path: str):
+    os.makedirs(TMP_DIR, exist_ok=True)
+    return open(tmp_path, "wb")
+
+
+def _discard_tmp(tmp_file, tmp_path: str):
+    """Прибирає тимчасовий файл обірваного завантаження; після _store_blob його вже немає."""
+    tmp_file.close()
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+class _PdfPartReader:
+    """Колбеки MultipartParser: збирають заголовки частин і дані поля field_name."""
+
+    def __init__(self, field_name: str):
+        self.field_name = field_name
+        self.header_field = b""
+        self.header_value = b""
+        self.headers = {}
+        self.in_file = False
+        self.filename = None
+        self.content_type = None
+        self.pending = []  # шматки файлу, отримані за останній parser.write()
+
+    def callbacks(self):
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self):
+        self.headers = {}
+        self.in_file = False
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers[self.header_field.lower()] = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.headers.get(b"content-disposition", b""))
+        if options.get(b"name") != self.field_name.encode() or b"filename" not in options or self.filename:
+            return
+        self.in_file = True
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self.content_type = self.headers.get(b"content-type", b"").decode("latin-1").split(";")[0].strip()
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.in_file:
+            self.pending.append(data[start:end])
+
+
+async def receive_pdf(request: Request, max_size: int, allowed_content_types: list[str],
+                      field_name: str = "file", expected_sha256: str | None = None) -> StoredFile:
+    """
+    Потоково приймає multipart-завантаження: рахує SHA-256 і розмір по ходу читання,
+    пише на диск у пулі потоків і обриває прийом, щойно файл перевищив max_size, а все тіло
+    запиту (разом з іншими полями форми) — max_size + MULTIPART_OVERHEAD, навіть без Content-Length.
+    Якщо задано expected_sha256, файл з іншим хешем не зберігається (400).
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in options:
+        raise HTTPException(400, "Очікується multipart/form-data")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_size + MULTIPART_OVERHEAD:
+        raise _too_large(max_size)
+
+    reader = _PdfPartReader(field_name)
+    parser = MultipartParser(options[b"boundary"], reader.callbacks())
+    hasher = hashlib.sha256()
+    size = received = 0
+
+    tmp_path = os.path.join(TMP_DIR, uuid.uuid4().hex)
+    tmp_file = await to_thread.run_sync(_open_tmp, tmp_path)
+    try:
+        async for chunk in request.stream():
+            # Рахуємо все тіло, а не лише частину з файлом: chunked-запит чи велике інше поле форми
+            # інакше читалися б до кінця
+            received += len(chunk)
+            if received > max_size + MULTIPART_OVERHEAD:
+                raise _too_large(max_size)
+            parser.write(chunk)
+            if reader.filename and reader.content_type not in allowed_content_types:
+                raise HTTPException(
+                    400, f"Неприпустимий тип файлу. Дозволені: {', '.join(allowed_content_types)}"
+                )
+            if not reader.pending:
+                continue
+
+            data = b"".join(reader.pending)
+            reader.pending.clear()
+            size += len(data)
+            if size > max_size:
+                raise _too_large(max_size)
+            hasher.update(data)
+            await to_thread.run_sync(tmp_file.write, data)
+        parser.finalize()
+        await to_thread.run_sync(tmp_file.close)
+
+        if not reader.filename:
+            raise HTTPException(400, f"Поле '{field_name}' з файлом відсутнє")
+
+        sha256 = hasher.hexdigest()
+        if expected_sha256 and expected_sha256 != sha256:
+            raise HTTPException(400, "X-Content-SHA256 не збігається з вмістом файлу")
+        duplicate = await to_thread.run_sync(_store_blob, tmp_path, sha256)
+        return StoredFile(filename=reader.filename, sha256=sha256, size=size, duplicate=duplicate)
+    except FormParserError:
+        raise HTTPException(400, "Некоректні multipart-дані")
+    finally:
+        # Прибирання файлової системи теж у пулі потоків; shield — щоб скасування запиту не лишило файл
+        with CancelScope(shield=True):
+            await to_thread.run_sync(_discard_tmp, tmp_file, tmp_path)
+
+
+def find_blob(sha256: str) -> int | None:
+    """Розмір уже збереженого blob-а або None — для дедуплікації до читання тіла запиту."""
+    if not re.fullmatch(r"[0-9a-f]{64}", sha256):
+        return None
+    try:
+        return os.path.getsize(blob_path(sha256))
+    except OSError:
+        return None
+
+
+# =========================
+#  ВІДДАЧА ФАЙЛІВ
+# =========================
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+
+def upload_metadata(filename: str) -> str | None:
+    """
+    Метадані для /uploads/{filename} у вигляді JSON (кешуються в Redis цілком).
+    Для blob-ів ETag — це sha256 вмісту, тобто сильний валідатор, що ніколи не змінюється.
+    """
+    path = resolve_upload_path(filename)
+    if path is None:
+        return None
+    stat_result = os.stat(path)
+    match = BLOB_NAME_RE.match(filename)
+    etag = match.group(1) if match else f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+    return json.dumps({
+        "path": path,
+        "size": stat_result.st_size,
+        "mtime": int(stat_result.st_mtime),
+        "etag": f'"{etag}"',
+        "cache_control": IMMUTABLE_CACHE_CONTROL if match else REVALIDATE_CACHE_CONTROL,
+    })
+
+
+def validator_headers(meta: dict) -> dict:
+    return {
+        "ETag": meta["etag"],
+        "Last-Modified": formatdate(meta["mtime"], usegmt=True),
+        "Cache-Control": meta["cache_control"],
+    }
+
+
+def is_not_modified(headers, meta: dict) -> bool:
+    """Умовний GET (RFC 9110): If-None-Match має пріоритет над If-Modified-Since."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return meta["etag"] in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return meta["mtime"] <= int(parsedate_to_datetime(if_modified_since).timestamp())
+        except (TypeError, ValueError):
+            return False
+    return False
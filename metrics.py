@@ -0,0 +1,489 @@
+import asyncio
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from contextvars import ContextVar
+from operator import itemgetter
+from threading import get_ident
+from time import perf_counter
+
+from fastapi import Request
+from fastapi.routing import APIRoute
+from starlette.exceptions import HTTPException
+
+# =========================
+#  МЕТРИКИ (Prometheus text format)
+# =========================
+# Кожен потік пише у власний шард (threading.local), тож на гарячому шляху немає локів:
+# ендпоінти працюють і на event loop, і в пулі потоків. Шарди сумуються лише при /metrics.
+# Лок реєстру береться один раз на потік — коли він уперше щось записує.
+# Гістограми запитів оновлюються пачками: запит лише дописує сирі значення у списки свого
+# маршруту (_RouteCells), а по кошиках їх розносить flush — кожні FLUSH_EVERY запитів
+# маршруту і перед /metrics; сортування й пошук меж кошиків при цьому виконуються в C.
+FLUSH_EVERY = 256
+# SQL (кількість і час операторів) прив'язується до кожного SQL_SAMPLE_EVERY-го запиту маршруту:
+# ContextVar на запит і таймер на кожен оператор — найдорожча частина обліку. Оператори
+# решти запитів рахуються лише в app_sql_statements_total; latency і in-flight — для всіх запитів.
+SQL_SAMPLE_EVERY = int(os.getenv("METRICS_SQL_SAMPLE_EVERY", 16))
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REDIS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class _Shard:
+    __slots__ = ("values", "routes", "lock")
+
+    def __init__(self):
+        # (ім'я метрики, значення міток) -> список: [значення] для counter/gauge,
+        # лічильники кошиків + сума + кількість для histogram
+        self.values = {}
+        # (метод, маршрут) -> _RouteCells маршрутів, які обробляв цей потік
+        self.routes = {}
+        # flush викликають і потік-власник, і /metrics; дописування сирих значень — без нього
+        self.lock = threading.Lock()
+
+    def flush(self):
+        for cells in list(self.routes.values()):
+            cells.flush()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+        self._shards = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+            return shard
+
+    def merged(self, name: str):
+        """Сума значень метрики name з усіх шардів: {мітки: список}."""
+        with self._lock:
+            shards = list(self._shards)
+        result = {}
+        for shard in shards:
+            shard.flush()
+            for (metric, labels), value in list(shard.values.items()):
+                if metric != name:
+                    continue
+                total = result.setdefault(labels, [0] * len(value))
+                for i, item in enumerate(value):
+                    total[i] += item
+        return result
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+    size = 1
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        registry.metrics.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+
+    def cell(self, labels: tuple = (), values: dict | None = None) -> list:
+        """Список значень для міток у шарді поточного потоку (створюється за потреби)."""
+        if values is None:
+            values = registry.shard().values
+        key = (self.name, labels)
+        cell = values.get(key)
+        if cell is None:
+            cell = values[key] = [0] * self.size
+        return cell
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.cell(labels)[0] += amount
+
+    def render(self):
+        lines = self.header()
+        for labels, (value,) in sorted(registry.merged(self.name).items()):
+            lines.append(f"{self.name}{format_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = buckets
+        # Лічильники по кошиках (не кумулятивні) + +Inf, далі сума й кількість
+        self.size = len(buckets) + 3
+
+    def observe(self, value: float, labels: tuple = ()):
+        self.record(self.cell(labels), value)
+
+    def record(self, counts: list, value: float):
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def record_many(self, counts: list, values: list):
+        """Як record для кожного значення: значення сортуються, а кошик — це різниця позицій його меж."""
+        values = sorted(values)
+        below = 0
+        for index, bound in enumerate(self.buckets):
+            upto = bisect_right(values, bound)
+            counts[index] += upto - below
+            below = upto
+        counts[-3] += len(values) - below
+        counts[-2] += sum(values)
+        counts[-1] += len(values)
+
+    def render(self):
+        lines = self.header()
+        for labels, counts in sorted(registry.merged(self.name).items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_text = format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {counts[-2]}")
+            lines.append(f"{self.name}_count{label_text} {counts[-1]}")
+        return lines
+
+
+class StatementsTotal(Counter):
+    """
+    Оператори поза вибіркою запитів (і поза запитами) хук рахує у власній комірці, а оператори
+    запитів вибірки вже є сумою гістограми request_sql_statements — їх додає render.
+    """
+
+    def __init__(self, name: str, documentation: str, per_request: Histogram):
+        super().__init__(name, documentation)
+        self.per_request = per_request
+
+    def render(self):
+        outside = sum(value for value, in registry.merged(self.name).values())
+        in_requests = sum(counts[-2] for counts in registry.merged(self.per_request.name).values())
+        return self.header() + [f"{self.name} {outside + in_requests}"]
+
+
+# =========================
+#  МЕТРИКИ ЗАСТОСУНКУ
+# =========================
+request_duration = Histogram(
+    "app_request_duration_seconds", "Час обробки запиту маршрутом", ("method", "route", "status"),
+)
+requests_in_flight = Gauge("app_requests_in_flight", "Запити, що зараз обробляються", ("method", "route"))
+# HELP прямо каже, що гістограми SQL на запит — вибірка, а не всі запити
+SQL_SAMPLE_HELP = "вибірка — кожен METRICS_SQL_SAMPLE_EVERY-й запит маршруту (типово 16-й, за SQL_DIAGNOSTICS=1 — кожен)"
+request_sql_statements = Histogram(
+    "app_request_sql_statements", f"Кількість SQL-операторів на запит; {SQL_SAMPLE_HELP}", ("method", "route"),
+    STATEMENT_BUCKETS,
+)
+request_sql_duration = Histogram(
+    "app_request_sql_duration_seconds", f"Сумарний час SQL-операторів на запит; {SQL_SAMPLE_HELP}", ("method", "route"),
+)
+sql_statements_total = StatementsTotal(
+    "app_sql_statements_total", "Усі SQL-оператори: зокрема поза запитами і поза вибіркою app_request_sql_*",
+    request_sql_statements,
+)
+redis_command_duration = Histogram(
+    "app_redis_command_duration_seconds", "Час виконання команди Redis", ("command",), REDIS_BUCKETS,
+)
+redis_errors_total = Counter("app_redis_errors_total", "Команди Redis, що завершилися помилкою", ("command",))
+upload_bytes_total = Counter("app_upload_bytes_total", "Байти, прийняті через /uploadfile/")
+uploads_total = Counter("app_uploads_total", "Завантаження файлів за результатом", ("result",))
+
+
+# Облік SQL запиту вибірки — список, а не екземпляр класу: літерал списку в кілька разів
+# дешевший за виклик __init__. Індекси: кількість SQL-операторів і їхній сумарний час
+# (пише хук діалекту), _RouteCells запиту, форми операторів (query_diagnostics, якщо ввімкнено).
+STATEMENTS, SQL_DURATION, CELLS, SHAPES = range(4)
+
+# None поза запитом (старт застосунку, фонові задачі, скрипти) і в запитах поза вибіркою SQL
+current_request: ContextVar[list | None] = ContextVar("current_request", default=None)
+
+
+# =========================
+#  МАРШРУТИ
+# =========================
+class _RouteCells:
+    """
+    Метрики одного маршруту й методу в шарді потоку. Обгортка маршруту лише дописує сирі
+    значення: тривалості — у ok (статус 200) або durations[статус], облік SQL запитів
+    вибірки — у sampled; flush (під локом шарду) забирає їх і розносить по гістограмах.
+    in-flight = started - finished: started пише лише потік-власник, finished — flush.
+    """
+    __slots__ = ("labels", "shard", "thread", "started", "finished", "ok", "durations", "sampled",
+                 "in_flight", "sql_statements", "sql_duration")
+
+    def __init__(self, shard: _Shard, method: str, path: str):
+        self.labels = (method, path)
+        self.shard = shard
+        self.thread = get_ident()
+        self.started = 0
+        self.finished = 0
+        self.ok = []
+        # статус -> тривалості запитів; 200 теж тут, щоб flush обходив усі однаково
+        self.durations = {200: self.ok}
+        self.sampled = []
+        self.in_flight = requests_in_flight.cell(self.labels, shard.values)
+        self.sql_statements = request_sql_statements.cell(self.labels, shard.values)
+        self.sql_duration = request_sql_duration.cell(self.labels, shard.values)
+
+    def duration(self, status_code: int) -> list:
+        samples = self.durations.get(status_code)
+        if samples is None:
+            samples = self.durations[status_code] = []
+        return samples
+
+    def flush(self):
+        with self.shard.lock:
+            values = self.shard.values
+            # Лише забрані записи: потік-власник міг тим часом дописати нові в кінець
+            for status_code, samples in list(self.durations.items()):
+                batch = samples[:]
+                del samples[:len(batch)]
+                if batch:
+                    self.finished += len(batch)
+                    counts = request_duration.cell((*self.labels, str(status_code)), values)
+                    request_duration.record_many(counts, batch)
+            self.in_flight[0] = self.started - self.finished
+            batch = self.sampled[:]
+            del self.sampled[:len(batch)]
+            if batch:
+                request_sql_statements.record_many(self.sql_statements, list(map(itemgetter(STATEMENTS), batch)))
+                request_sql_duration.record_many(self.sql_duration, list(map(itemgetter(SQL_DURATION), batch)))
+
+
+def _route_cells(method: str, path: str) -> _RouteCells:
+    shard = registry.shard()
+    cells = shard.routes.get((method, path))
+    if cells is None:
+        cells = _RouteCells(shard, method, path)
+        with shard.lock:
+            shard.routes[(method, path)] = cells
+    return cells
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    route_class для FastAPI і APIRouter: обгортає обробник маршруту, тож мітка route —
+    шаблон шляху (/books/{book_id}) і кількість рядів метрик не залежить від id у запитах.
+    Вимірюється обробник (залежності, ендпоінт, серіалізація), але не передача тіла
+    StreamingResponse.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        path = self.path_format
+        # метод -> _RouteCells потоку, що останнім обробляв маршрут (зазвичай це єдиний
+        # потік event loop); інший потік бере власні з шарду й підміняє їх тут
+        cells_by_method = {}
+
+        async def instrumented_handler(request: Request):
+            method = request.scope["method"]
+            cells = cells_by_method.get(method)
+            if cells is None or cells.thread != get_ident():
+                cells = cells_by_method[method] = _route_cells(method, path)
+            cells.started += 1
+            stats = None
+            if not cells.started % SQL_SAMPLE_EVERY:
+                stats = [0, 0.0, cells, None]
+                token = current_request.set(stats)
+            status_code = 500
+            started = perf_counter()
+            try:
+                response = await handler(request)
+                status_code = response.status_code
+                return response
+            except HTTPException as exc:
+                status_code = exc.status_code
+                raise
+            finally:
+                elapsed = perf_counter() - started
+                if stats is not None:
+                    current_request.reset(token)
+                    cells.sampled.append(stats)
+                samples = cells.ok if status_code == 200 else cells.duration(status_code)
+                samples.append(elapsed)
+                if len(samples) >= FLUSH_EVERY:
+                    cells.flush()
+        return instrumented_handler
+
+
+# =========================
+#  SQL
+# =========================
+# Без подій engine: будь-який слухач before/after_cursor_execute переводить SQLAlchemy
+# на загальний шлях диспетчеризації подій (≈25 мкс на оператор). Натомість обгортаються
+# методи діалекту, якими SQLAlchemy виконує курсор. Поза запитом вибірки оператор лише
+# рахується — у комірці потоку, закешованій у _outside, без вимірювання часу.
+_outside = threading.local()
+
+
+def _timed(execute):
+    def timed_execute(*args):
+        stats = current_request.get()
+        if stats is None:
+            result = execute(*args)
+            try:
+                _outside.statements[0] += 1
+            except AttributeError:
+                _outside.statements = sql_statements_total.cell()
+                _outside.statements[0] += 1
+            return result
+        started = perf_counter()
+        result = execute(*args)
+        stats[SQL_DURATION] += perf_counter() - started
+        stats[STATEMENTS] += 1
+        return result
+    return timed_execute
+
+
+def instrument_engine(engine):
+    """Для AsyncEngine передавати engine.sync_engine."""
+    dialect = engine.dialect
+    if getattr(dialect, "metrics_instrumented", False):
+        return
+    dialect.metrics_instrumented = True
+    for name in ("do_execute", "do_execute_no_params", "do_executemany"):
+        setattr(dialect, name, _timed(getattr(dialect, name)))
+
+
+# =========================
+#  REDIS
+# =========================
+def instrument_redis(client):
+    """
+    Підміняє execute_command екземпляра клієнта (sync або asyncio): через нього
+    проходять усі команди redis-py, тож окремо обгортати get/set/delete не треба.
+    """
+    execute_command = client.execute_command
+
+    def observe(args, started, failed):
+        command = str(args[0]) if args else "?"
+        redis_command_duration.observe(perf_counter() - started, (command,))
+        if failed:
+            redis_errors_total.inc((command,))
+
+    if asyncio.iscoroutinefunction(execute_command):
+        async def timed_execute_command(*args, **options):
+            started = perf_counter()
+            failed = True
+            try:
+                result = await execute_command(*args, **options)
+                failed = False
+                return result
+            finally:
+                observe(args, started, failed)
+    else:
+        def timed_execute_command(*args, **options):
+            started = perf_counter()
+            failed = True
+            try:
+                result = execute_command(*args, **options)
+                failed = False
+                return result
+            finally:
+                observe(args, started, failed)
+
+    client.execute_command = timed_execute_command
+    return client
+
+
+def cache_stats_collector(get_caches):
+    """
+    Влучання/промахи кешів з їхніх власних лічильників (BaseEntityCache.stats) — без окремого обліку.
+    get_caches() повертає кеші на момент збору; лічильники одного виду сумуються.
+    """
+    def collect():
+        totals = {}
+        for cache in get_caches():
+            for kind, counters in cache.stats.items():
+                total = totals.setdefault(kind, {"hits": 0, "misses": 0})
+                total["hits"] += counters["hits"]
+                total["misses"] += counters["misses"]
+        lines = ["# HELP app_cache_requests_total Звернення до кешу за результатом",
+                 "# TYPE app_cache_requests_total counter"]
+        for kind, counters in sorted(totals.items()):
+            for result, counter in (("hit", "hits"), ("miss", "misses")):
+                labels = format_labels(("kind", "result"), (kind, result))
+                lines.append(f"app_cache_requests_total{labels} {counters[counter]}")
+        return lines
+    return collect
+
+
+REDIS_BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def redis_client_collector(get_clients):
+    """
+    Стан запобіжника Redis, L1 і локального кешу (resilient_redis) на момент збору.
+    get_clients() повертає {мітка: клієнт} — клієнти створюються в lifespan.
+    """
+    metrics = (
+        ("app_redis_circuit_state", "gauge", "Запобіжник Redis: 0 closed, 1 half_open, 2 open",
+         lambda stats: REDIS_BREAKER_STATES[stats["state"]]),
+        ("app_redis_circuit_opened_total", "counter", "Скільки разів запобіжник розмикався",
+         lambda stats: stats["opened_total"]),
+        ("app_redis_fallback_keys", "gauge", "Записів у локальному кеші на час недоступності Redis",
+         lambda stats: stats["fallback_keys"]),
+        ("app_redis_pending_invalidations", "gauge", "Інвалідації, що чекають відновлення Redis",
+         lambda stats: stats["pending_invalidations"]),
+        ("app_cache_l1_keys", "gauge", "Записів у L1 воркера", lambda stats: stats["l1_keys"]),
+        ("app_cache_l1_hits_total", "counter", "Читань, обслужених L1 без звернення до Redis",
+         lambda stats: stats["l1_hits"]),
+        ("app_cache_l1_subscribed", "gauge", "1, якщо воркер підписаний на інвалідації L1",
+         lambda stats: int(stats["subscribed"])),
+    )
+
+    def collect():
+        clients = {name: client.stats() for name, client in get_clients().items()}
+        if not clients:
+            return []
+        lines = []
+        for name, metric_type, documentation, value in metrics:
+            lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+            for client, stats in clients.items():
+                lines.append(f"{name}{format_labels(('client',), (client,))} {value(stats)}")
+        return lines
+    return collect
@@ -1,22 +1,48 @@
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import cookie_parser
 from starlette.responses import Response
 
-from middleware.security import CSRFProtectionMiddleware
-
-csrf_protection = CSRFProtectionMiddleware()
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-	async def dispatch(self, request, call_next):
-		if request.method in ['GET', 'HEAD', 'OPTIONS']:
-			response = await call_next(request)
-			response.headers['GET-SECURE'] = 'true'
-			return response
-		
-		csrf_token = request.headers.get("X-CSRF-Token")
-		session_id = "session-id"
-
-		if not csrf_protection.validate_csrf_token(csrf_token, session_id):
-			return Response("CSRF token missing or invalid", status_code=403)
-		
-		response = await call_next(request)
-		response.headers['POST-SECURE'] = 'true'
-		return response
\ No newline at end of file
+from middleware.security import CSRF_SESSION_COOKIE, csrf_protection
+
+# =========================
+#  ЗАГОЛОВКИ БЕЗПЕКИ + CSRF (чистий ASGI)
+# =========================
+# На відміну від BaseHTTPMiddleware, не створює окремих задач і потоків пам'яті:
+# тіло запиту й відповіді (зокрема StreamingResponse) проходить без буферизації,
+# а заголовки додаються готовими байтами в повідомлення http.response.start.
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+SAFE_HEADERS = ((b"get-secure", b"true"),)
+UNSAFE_HEADERS = ((b"post-secure", b"true"),)
+CSRF_HEADER = b"x-csrf-token"
+
+csrf_failed_response = Response("CSRF token missing or invalid", status_code=403)
+
+
+class SecurityHeadersMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] in SAFE_METHODS:
+            extra_headers = SAFE_HEADERS
+        else:
+            csrf_token = session_id = None
+            for name, value in scope["headers"]:
+                if name == CSRF_HEADER:
+                    csrf_token = value.decode("latin-1")
+                elif name == b"cookie":
+                    session_id = cookie_parser(value.decode("latin-1")).get(CSRF_SESSION_COOKIE, session_id)
+            if not csrf_protection.verify_token(csrf_token, session_id):
+                await csrf_failed_response(scope, receive, send)
+                return
+            extra_headers = UNSAFE_HEADERS
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *extra_headers]
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
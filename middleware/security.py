@@ -1,35 +1,109 @@
-import time
-import hmac
 import base64
+import hashlib
+import hmac
+import os
+import secrets
+import struct
+import time
+
+from ttl_cache import TTLCache
+
+# =========================
+#  CSRF-ТОКЕНИ
+# =========================
+# Бінарний формат (30 байт, 40 символів base64url):
+#   версія (1) | kid (1) | час видачі (4) | nonce (8) | HMAC-SHA256, обрізаний до 16 байт
+# HMAC рахується від перших 14 байт і сесії, тож токен чужої сесії недійсний.
+#
+# Кільце ключів: CSRF_KEYS="2:новий-секрет,1:старий-секрет". Нові токени підписуються
+# CSRF_ACTIVE_KID (за замовчуванням — перший у списку), а перевіряються будь-яким ключем
+# з кільця, тому ротація не інвалідовує вже видані токени, поки старий ключ не прибрали.
+TOKEN_VERSION = 1
+HEADER = struct.Struct(">BBI8s")
+MAC_SIZE = 16
+TOKEN_SIZE = HEADER.size + MAC_SIZE
 
 SECRET_KEY = b"12345678"
+CSRF_MAX_AGE_SECONDS = int(os.getenv("CSRF_MAX_AGE_SECONDS", 3600))
+# Скільки нещодавно перевірених токенів пам'ятати: повторний запит з тим самим токеном
+# обходиться без base64 і HMAC
+CSRF_CACHE_SIZE = int(os.getenv("CSRF_CACHE_SIZE", 4096))
+CSRF_SESSION_COOKIE = os.getenv("CSRF_SESSION_COOKIE", "csrf_session")
+
+
+def parse_key_ring(value: str) -> dict[int, bytes]:
+    """'2:secret2,1:secret1' -> {2: b'secret2', 1: b'secret1'} (порядок зберігається)."""
+    keys = {}
+    for item in value.split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if not sep or not kid.isdigit() or not 0 <= int(kid) <= 255 or not secret:
+            raise ValueError("CSRF_KEYS має формат 'kid:secret,...', де kid — число 0..255")
+        keys[int(kid)] = secret.encode()
+    return keys
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
 
 class CSRFProtectionMiddleware:
-   
-    @staticmethod
-    def generate_token(session_id):
-        timestemp = str(int(time.time()))
-        msg = f"{session_id}:{timestemp}".encode()
-        sign = hmac.new(SECRET_KEY, msg, 'sha256').digest()
-        return base64.b64encode(msg +b":" + sign).decode()
-       
-
-    @staticmethod
-    def verify_token(token, session_id, max_age=3600):
-        try:
-            decode = base64.b64decode(token.encode())
-            msg, sign = decode.rsplit(b":", 1)
-            
-            expected_sign = hmac.new(SECRET_KEY, msg, 'sha256').digest()
-            if sign != expected_sign:
-                return False
-            
-            timestamp = int(msg.split(b":")[1])
-            if time.time() - timestamp > max_age:
-                return False
-            
-            if msg.split(b":")[0].decode() != session_id:
-                return False
+    """Видача й перевірка CSRF-токенів, прив'язаних до сесії."""
+
+    def __init__(self, keys: dict[int, bytes], active_kid: int | None = None,
+                 max_age: int = CSRF_MAX_AGE_SECONDS, cache_size: int = CSRF_CACHE_SIZE):
+        if not keys:
+            raise ValueError("Кільце ключів CSRF порожнє")
+        self.keys = keys
+        self.active_kid = next(iter(keys)) if active_kid is None else active_kid
+        if self.active_kid not in keys:
+            raise ValueError(f"Ключ CSRF з kid={self.active_kid} відсутній у CSRF_KEYS")
+        self.max_age = max_age
+        self.verified = TTLCache(cache_size)
+
+    @classmethod
+    def from_env(cls):
+        keys = parse_key_ring(os.getenv("CSRF_KEYS", "")) if os.getenv("CSRF_KEYS") else {0: SECRET_KEY}
+        active_kid = os.getenv("CSRF_ACTIVE_KID")
+        return cls(keys, int(active_kid) if active_kid else None)
+
+    def _sign(self, key: bytes, header: bytes, session_id: str) -> bytes:
+        return hmac.new(key, header + session_id.encode(), hashlib.sha256).digest()[:MAC_SIZE]
+
+    def generate_token(self, session_id: str) -> str:
+        header = HEADER.pack(TOKEN_VERSION, self.active_kid, int(time.time()), secrets.token_bytes(8))
+        return _b64encode(header + self._sign(self.keys[self.active_kid], header, session_id))
+
+    def verify_token(self, token: str, session_id: str) -> bool:
+        if not token or not session_id:
+            return False
+        cache_key = (token, session_id)
+        if self.verified.get(cache_key):
             return True
-        except:
-            return False
\ No newline at end of file
+
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        except ValueError:
+            return False
+        if len(raw) != TOKEN_SIZE:
+            return False
+
+        header, mac = raw[:HEADER.size], raw[HEADER.size:]
+        version, kid, issued_at, _ = HEADER.unpack(header)
+        key = self.keys.get(kid)
+        if version != TOKEN_VERSION or key is None:
+            return False
+        expires_at = issued_at + self.max_age
+        if expires_at <= time.time():
+            return False
+        if not hmac.compare_digest(mac, self._sign(key, header, session_id)):
+            return False
+
+        self.verified.set(cache_key, True, expires_at=expires_at)
+        return True
+
+
+def new_session_id() -> str:
+    return secrets.token_urlsafe(16)
+
+
+csrf_protection = CSRFProtectionMiddleware.from_env()
@@ -1,6 +1,14 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, String, ForeignKey, Index, event
 from sqlalchemy.orm import relationship
-from base import Base  
+from base import Base
+
+
+def utcnow() -> datetime:
+    # SQLite зберігає дату без часової зони; усі updated_at — UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
 
 class Author(Base):
     __tablename__ = "authors"
@@ -9,17 +17,28 @@ class Author(Base):
     full_name = Column(String, nullable=False)
     country = Column(String, nullable=True)
 
+    # version — для ETag і оптимістичного блокування: UPDATE ... WHERE version = очікувана
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
     books = relationship("Book", back_populates="author")
 
+    __mapper_args__ = {"version_id_col": version}
+
 class User(Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
-    username = Column(String, nullable=False)
+    username = Column(String, nullable=False, unique=True, index=True)
     password = Column(String, nullable=False)
 
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
     books = relationship("Book", back_populates="user")
 
+    __mapper_args__ = {"version_id_col": version}
+
 
 class Book(Base):
     __tablename__ = "books"
@@ -34,5 +53,98 @@ class Book(Base):
     author_id = Column(Integer, ForeignKey("authors.id"), nullable=False)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
 
+    version = Column(Integer, nullable=False, server_default="1")
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+
     author = relationship("Author", back_populates="books")
     user = relationship("User", back_populates="books")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    # Складені індекси під keyset-пагінацію GET /books: фільтр + порядок сортування.
+    # Для пар фільтрів — окремі індекси з обома стовпцями: без них SQLite (без ANALYZE) бере
+    # індекс жанру, найменш вибірковий, і перебирає всі книги жанру
+    __table_args__ = (
+        Index("ix_books_genre_id", "genre", "id"),
+        Index("ix_books_genre_year_id", "genre", "publication_year", "id"),
+        Index("ix_books_author_id_id", "author_id", "id"),
+        Index("ix_books_author_id_year_id", "author_id", "publication_year", "id"),
+        Index("ix_books_author_id_genre_id", "author_id", "genre", "id"),
+        Index("ix_books_author_id_genre_year_id", "author_id", "genre", "publication_year", "id"),
+        Index("ix_books_user_id_id", "user_id", "id"),
+        Index("ix_books_user_id_year_id", "user_id", "publication_year", "id"),
+        Index("ix_books_user_id_genre_id", "user_id", "genre", "id"),
+        Index("ix_books_user_id_genre_year_id", "user_id", "genre", "publication_year", "id"),
+        Index("ix_books_year_id", "publication_year", "id"),
+    )
+
+
+# =========================
+#  ЛІЧИЛЬНИКИ КАТАЛОГУ
+# =========================
+# Кількість книг на автора, жанр і десятиліття для GET /stats без GROUP BY по books.
+# Підтримуються тригерами SQLite, тож змінюються в тій самій транзакції, що й books —
+# незалежно від того, хто пише (ORM, AsyncSession, bulk insert). Перебудова — catalog_stats.py.
+class AuthorBookCount(Base):
+    __tablename__ = "author_book_counts"
+
+    author_id = Column(Integer, primary_key=True)
+    book_count = Column(Integer, nullable=False, default=0)
+
+    # Топ авторів: ORDER BY book_count DESC LIMIT n читає лише n рядків індексу
+    __table_args__ = (Index("ix_author_book_counts_count", "book_count", "author_id"),)
+
+
+class GenreBookCount(Base):
+    __tablename__ = "genre_book_counts"
+
+    genre = Column(String, primary_key=True)
+    book_count = Column(Integer, nullable=False, default=0)
+
+
+class DecadeBookCount(Base):
+    __tablename__ = "decade_book_counts"
+
+    decade = Column(Integer, primary_key=True)
+    book_count = Column(Integer, nullable=False, default=0)
+
+
+# (таблиця, ключ, стовпець books, вираз ключа через {row} = new/old)
+BOOK_COUNTERS = (
+    (AuthorBookCount.__table__, "author_id", "author_id", "{row}.author_id"),
+    (GenreBookCount.__table__, "genre", "genre", "{row}.genre"),
+    (DecadeBookCount.__table__, "decade", "publication_year", "{row}.publication_year / 10 * 10"),
+)
+
+
+def book_counter_ddl(table: str, key: str, column: str, expression: str) -> list[str]:
+    """Тригери лічильника: книги з NULL у стовпці не рахуються, рядки з нулем видаляються."""
+    new, old = expression.format(row="new"), expression.format(row="old")
+    increment = (f"INSERT INTO {table}({key}, book_count) SELECT {new}, 1 WHERE {new} IS NOT NULL "
+                 f"ON CONFLICT({key}) DO UPDATE SET book_count = book_count + 1;")
+    decrement = (f"UPDATE {table} SET book_count = book_count - 1 WHERE {key} = {old}; "
+                 f"DELETE FROM {table} WHERE {key} = {old} AND book_count <= 0;")
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ai AFTER INSERT ON books BEGIN {increment} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_ad AFTER DELETE ON books BEGIN {decrement} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_au AFTER UPDATE OF {column} ON books "
+        f"WHEN {old} IS NOT {new} BEGIN {decrement} {increment} END",
+    ]
+
+
+def book_counter_rebuild_sql(table: str, key: str, column: str, expression: str) -> str:
+    expression = expression.format(row="books")
+    return (f"INSERT INTO {table}({key}, book_count) SELECT {expression}, COUNT(*) FROM books "
+            f"WHERE {expression} IS NOT NULL GROUP BY {expression}")
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_book_counters(metadata, connection, tables=(), **kw):
+    """create_all: щойно створена таблиця лічильника заповнюється з books і отримує тригери."""
+    if connection.dialect.name != "sqlite":
+        return
+    for counter_table, *counter in BOOK_COUNTERS:
+        if counter_table in tables:
+            connection.exec_driver_sql(book_counter_rebuild_sql(counter_table.name, *counter))
+            for ddl in book_counter_ddl(counter_table.name, *counter):
+                connection.exec_driver_sql(ddl)
@@ -0,0 +1,101 @@
+import asyncio
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# =========================
+#  ХЕШУВАННЯ ПАРОЛІВ
+# =========================
+# bcrypt навмисно повільний (~250 мс при 12 раундах), тому хешування й перевірка
+# виконуються в окремому обмеженому пулі потоків, а не на event loop.
+# Бібліотека bcrypt відпускає GIL на час обчислення, тож потоки працюють паралельно.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# 0 — виконувати на місці, без пулу (для порівняння в бенчмарку)
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+# Скільки операцій може одночасно виконуватись або чекати в черзі; решта отримує 503
+PASSWORD_QUEUE_SIZE = int(os.getenv("PASSWORD_QUEUE_SIZE", 64))
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """CryptContext (і імпорт passlib) — при першому хешуванні, а не під час старту воркера."""
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix="bcrypt") if PASSWORD_WORKERS else None
+_slots = threading.BoundedSemaphore(PASSWORD_QUEUE_SIZE)
+
+
+class PasswordPoolOverloaded(Exception):
+    """Черга пулу хешування заповнена — запит треба відхилити з 503."""
+
+
+def get_password_hash(password: str):
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str):
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, stored_password: str):
+    """
+    Повертає (пароль вірний, новий хеш або None).
+    Новий хеш з'являється, коли змінився BCRYPT_ROUNDS або в БД ще лежить
+    пароль у відкритому вигляді (записи, створені до хешування).
+    """
+    pwd_context = get_pwd_context()
+    if pwd_context.identify(stored_password) is None:
+        if hmac.compare_digest(plain_password.encode(), stored_password.encode()):
+            return True, get_password_hash(plain_password)
+        return False, None
+    return pwd_context.verify_and_update(plain_password, stored_password)
+
+
+def _acquire_slot():
+    if not _slots.acquire(blocking=False):
+        raise PasswordPoolOverloaded()
+
+
+def run_in_password_pool(func, *args):
+    """Синхронний варіант для ендпоінтів, що вже працюють у пулі потоків FastAPI."""
+    _acquire_slot()
+    try:
+        if _executor is None:
+            return func(*args)
+        return _executor.submit(func, *args).result()
+    finally:
+        _slots.release()
+
+
+def _release_slot(future):
+    _slots.release()
+
+
+async def run_in_password_pool_async(func, *args):
+    _acquire_slot()
+    if _executor is None:
+        try:
+            return func(*args)
+        finally:
+            _slots.release()
+    try:
+        future = _executor.submit(func, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    # Слот звільняє сама задача пулу, коли завершиться (або буде скасована ще в черзі), а не
+    # корутина: після відключення клієнта bcrypt ще працює, і черга не може вийти за PASSWORD_QUEUE_SIZE
+    future.add_done_callback(_release_slot)
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_in_password_pool_async(get_password_hash, password)
+
+
+async def verify_and_update_async(plain_password: str, stored_password: str):
+    return await run_in_password_pool_async(verify_and_update, plain_password, stored_password)
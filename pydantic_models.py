@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from pydantic import BaseModel
 
 
@@ -13,11 +15,19 @@ class AuthorResponse(BaseModel):
     id: int
     full_name: str
     country: str | None = None
+    # Значення за замовчуванням — для записів у Redis, закешованих до появи версій
+    version: int = 1
+    updated_at: datetime | None = None
 
     class Config:
         orm_mode = True
 
 
+class AuthorBatch(BaseModel):
+    items: list[AuthorResponse]  # у порядку ?ids=
+    missing: list[int] = []
+
+
 # ==========================
 #    КНИГИ (Pydantic)
 # ==========================
@@ -27,6 +37,7 @@ class BookCreateUpdate(BaseModel):
     genre: str
     description: str
     author_id: int  # Важливо!
+    user_id: int
 
 
 class BookResponse(BaseModel):
@@ -36,11 +47,41 @@ class BookResponse(BaseModel):
     genre: str
     description: str
     author: AuthorResponse
+    version: int = 1
+    updated_at: datetime | None = None
 
     class Config:
         orm_mode = True
 
 
+class BookPage(BaseModel):
+    items: list[BookResponse]
+    next_cursor: str | None = None  # None — це остання сторінка
+    missing: list[int] | None = None  # лише для ?ids=: запитані id, яких немає
+
+
+class BookSearchHit(BaseModel):
+    book: BookResponse
+    rank: float  # bm25: чим менше, тим релевантніше
+    title_highlight: str
+    snippet: str
+
+
+class BookSearchPage(BaseModel):
+    items: list[BookSearchHit]
+    next_offset: int | None = None
+
+
+class BookBulkError(BaseModel):
+    index: int  # позиція рядка у вхідному списку
+    detail: str
+
+
+class BookBulkResult(BaseModel):
+    inserted: int
+    errors: list[BookBulkError] = []
+
+
 # ==========================
 #    КОРИСТУВАЧІ (Pydantic)
 # ==========================
@@ -55,3 +96,27 @@ class UserResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class UserBatch(BaseModel):
+    items: list[UserResponse]  # у порядку ?ids=
+    missing: list[int] = []
+
+
+# ==========================
+#    СТАТИСТИКА (Pydantic)
+# ==========================
+class AuthorBookCountResponse(BaseModel):
+    author_id: int
+    full_name: str | None = None
+    book_count: int
+
+
+class GenreBookCountResponse(BaseModel):
+    genre: str
+    book_count: int
+
+
+class DecadeBookCountResponse(BaseModel):
+    decade: int  # 1990 — книги 1990–1999 років
+    book_count: int
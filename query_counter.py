@@ -0,0 +1,30 @@
+from sqlalchemy import event
+
+
+class StatementCounter:
+    """
+    Контекстний менеджер, що записує всі SQL-оператори, виконані через задані engine-и.
+    Використовується для перевірки кількості запитів на ендпоінт (захист від N+1).
+    """
+
+    def __init__(self, *engines):
+        # read_engine може бути тим самим об'єктом, що й engine — слухаємо кожен лише раз
+        self.engines = list({id(engine): engine for engine in engines}.values())
+        self.statements: list[str] = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        for engine in self.engines:
+            event.listen(engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        for engine in self.engines:
+            event.remove(engine, "before_cursor_execute", self._record)
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+
+from sqlalchemy import event
+
+from metrics import CELLS, SHAPES, current_request
+
+# =========================
+#  ДІАГНОСТИКА SQL (опційно)
+# =========================
+# Settings.sql_diagnostics (SQL_DIAGNOSTICS=1) вмикає: журнал повільних запитів з EXPLAIN QUERY PLAN
+# і пошук N+1 — однакових за формою операторів, повторених у межах одного запиту до маршруту.
+# Записи — JSON по рядку на подію, у Settings.sql_diagnostics_log або stderr.
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 5))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Кадри цих модулів — сама інфраструктура, а не місце виклику
+SKIPPED_SOURCES = {os.path.join(ROOT, name) for name in ("query_diagnostics.py", "metrics.py", "base.py", "cache.py")}
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+MAX_PARAMETER_LENGTH = 200
+
+logger = logging.getLogger("sql.diagnostics")
+
+# "?, ?, ?" зі списків IN і багаторядкових VALUES — одна форма незалежно від довжини
+PLACEHOLDER_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+WHITESPACE = re.compile(r"\s+")
+# "SCAN books" (SQLite >= 3.36) або "SCAN TABLE books"; віртуальні (FTS) таблиці не рахуємо
+FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?!.*VIRTUAL TABLE)")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(path: str | None = None):
+    if logger.handlers:  # повторний create_app не дублює записи
+        return
+    handler = logging.FileHandler(path, encoding="utf-8") if path else logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def log_event(name: str, level: int = logging.WARNING, **fields):
+    logger.log(level, name, extra={"fields": fields})
+
+
+def statement_shape(statement: str) -> str:
+    return PLACEHOLDER_LIST.sub("?", WHITESPACE.sub(" ", statement).strip())
+
+
+def short_parameters(parameters):
+    if isinstance(parameters, dict):
+        return {key: short_parameters(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [short_parameters(value) for value in parameters]
+    if isinstance(parameters, (bytes, str)) and len(parameters) > MAX_PARAMETER_LENGTH:
+        return f"{parameters[:MAX_PARAMETER_LENGTH]!r}... ({len(parameters)})"
+    return parameters
+
+
+def call_site() -> str | None:
+    """Перший кадр коду застосунку (app.py, db_queries/...), що призвів до оператора."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(ROOT) and filename not in SKIPPED_SOURCES:
+            return f"{os.path.relpath(filename, ROOT)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    # AsyncSession виконує SQL у greenlet, звідки кадрів корутини не видно
+    return None
+
+
+def explain_query_plan(conn, statement: str, parameters) -> list[str] | None:
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(EXPLAINABLE):
+        return None
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        # (id, parent, notused, detail)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("diagnostics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info["diagnostics_started"].pop()) * 1000
+    stats = current_request.get()
+    route = stats and dict(zip(("method", "route"), stats[CELLS].labels))
+
+    shape = statement_shape(statement)
+    if stats is not None:
+        shapes = stats[SHAPES]
+        if shapes is None:
+            shapes = stats[SHAPES] = {}
+        count = shapes[shape] = shapes.get(shape, 0) + 1
+        # Один запис на форму за запит — у момент досягнення порогу
+        if count == N_PLUS_ONE_THRESHOLD:
+            log_event("n_plus_one", **route, statement=shape, repeated=count,
+                      parameters=short_parameters(parameters), source=call_site())
+
+    if elapsed_ms >= SLOW_QUERY_MS:
+        fields = {"duration_ms": round(elapsed_ms, 3), "statement": shape,
+                  "parameters": short_parameters(parameters), "source": call_site(), **(route or {})}
+        if not executemany:
+            try:
+                plan = explain_query_plan(conn, statement, parameters)
+            except Exception as exc:
+                fields["plan_error"] = repr(exc)
+            else:
+                if plan is not None:
+                    fields["plan"] = plan
+                    fields["full_scans"] = [match.group(1) for match in map(FULL_SCAN.match, plan) if match]
+        log_event("slow_query", **fields)
+
+
+def instrument_engine(engine):
+    """Для AsyncEngine передавати engine.sync_engine."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
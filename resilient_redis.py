@@ -0,0 +1,545 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+from redis import BlockingConnectionPool, Redis, RedisError
+from redis import asyncio as aioredis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# =========================
+#  ПУЛ З'ЄДНАНЬ І ТАЙМАУТИ
+# =========================
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+# Скільки чекати вільне з'єднання з пулу, перш ніж вважати команду невдалою
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", 0.1))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 0.25))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 0.25))
+
+# =========================
+#  ЗАПОБІЖНИК І ЛОКАЛЬНИЙ КЕШ
+# =========================
+REDIS_BREAKER_FAILURES = int(os.getenv("REDIS_BREAKER_FAILURES", 3))
+REDIS_BREAKER_RESET_SECONDS = float(os.getenv("REDIS_BREAKER_RESET_SECONDS", 5))
+REDIS_FALLBACK_SIZE = int(os.getenv("REDIS_FALLBACK_SIZE", 10000))
+# Локальні записи не бачать інвалідацій з інших воркерів, тому живуть недовго
+REDIS_FALLBACK_TTL_SECONDS = int(os.getenv("REDIS_FALLBACK_TTL_SECONDS", 30))
+INVALIDATION_BATCH_SIZE = 1000
+
+# =========================
+#  L1: КЕШ У ПАМ'ЯТІ ВОРКЕРА
+# =========================
+# 0 вимикає L1. TTL — запасна межа: зазвичай записи викидає інвалідація через pub/sub
+CACHE_L1_SIZE = int(os.getenv("CACHE_L1_SIZE", 5000))
+CACHE_L1_TTL_SECONDS = int(os.getenv("CACHE_L1_TTL_SECONDS", 60))
+INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache:invalidate")
+
+
+def _pool_options() -> dict:
+    return {
+        "max_connections": REDIS_MAX_CONNECTIONS,
+        "timeout": REDIS_POOL_TIMEOUT,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_CONNECT_TIMEOUT,
+        "health_check_interval": 30,
+    }
+
+
+def pooled_client(url: str) -> Redis:
+    """Sync-клієнт на обмеженому пулі з таймаутами; клієнт володіє пулом і закриває його."""
+    return Redis.from_pool(BlockingConnectionPool.from_url(url, **_pool_options()))
+
+
+def async_pooled_client(url: str) -> aioredis.Redis:
+    return aioredis.Redis.from_pool(aioredis.BlockingConnectionPool.from_url(url, **_pool_options()))
+
+
+class CircuitBreaker:
+    """
+    closed — команди йдуть у Redis; після failure_threshold збоїв поспіль — open:
+    reset_seconds команди в Redis не надсилаються зовсім. Потім half_open — рівно одна
+    пробна команда: успіх закриває запобіжник, збій знову розмикає.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = REDIS_BREAKER_FAILURES,
+                 reset_seconds: float = REDIS_BREAKER_RESET_SECONDS, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened_total = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """True, якщо цей успіх закрив розімкнений запобіжник (Redis відновився)."""
+        with self._lock:
+            recovered = self.state != self.CLOSED
+            self.state = self.CLOSED
+            self.failures = 0
+            return recovered
+
+    def record_failure(self) -> bool:
+        """True, якщо цей збій розімкнув запобіжник."""
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                tripped = self.state == self.CLOSED
+                self.opened_total += tripped
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+                return tripped
+            return False
+
+
+class BaseResilientRedis:
+    """
+    Спільне для sync та async обгорток: L1, запобіжник, обмежений локальний LRU і черга
+    інвалідацій, які не дійшли до Redis. Обгортка не кидає RedisError — при збої
+    команда виконується над локальним кешем, тож недоступний Redis коштує затримки,
+    а не помилок.
+
+    L1 — LRU цього процесу перед Redis. Він працює, лише поки listen_invalidations
+    підписаний на канал інвалідацій: delete у будь-якому воркері публікує ключі, і всі
+    воркери викидають їх з L1. Без підписки L1 порожній і не використовується.
+    SET нічого не розсилає: кеш заповнюється лише при промаху, а оновлення сутностей
+    спершу інвалідують ключ (EntityCache.invalidate).
+    """
+
+    def __init__(self, redis, breaker: CircuitBreaker | None = None,
+                 fallback_size: int = REDIS_FALLBACK_SIZE, fallback_ttl: int = REDIS_FALLBACK_TTL_SECONDS,
+                 l1_size: int = CACHE_L1_SIZE, l1_ttl: int = CACHE_L1_TTL_SECONDS,
+                 channel: str = INVALIDATION_CHANNEL):
+        self.redis = redis
+        self.breaker = breaker or CircuitBreaker()
+        self.fallback = TTLCache(fallback_size)
+        self.fallback_ttl = fallback_ttl
+        self.fallback_size = fallback_size
+        self.l1 = TTLCache(l1_size) if l1_size > 0 else None
+        self.l1_ttl = l1_ttl
+        self.l1_hits = 0
+        self.channel = channel
+        self.subscribed = False
+        # Лічильник інвалідацій: значення, прочитане з Redis до інвалідації, не потрапить у L1
+        self._generation = 0
+        self._l1_lock = threading.Lock()
+        # Ключі, видалені під час збою: їх треба видалити й у Redis до першого читання з нього
+        self._pending: dict[str, None] = {}
+        self._pending_lock = threading.Lock()
+
+    # --- L1 ---
+    def _l1_get_many(self, keys) -> list:
+        if self.l1 is None or not self.subscribed:
+            return [None] * len(keys)
+        values = [self.l1.get(key) for key in keys]
+        self.l1_hits += len(keys) - values.count(None)
+        return values
+
+    def _l1_store(self, values: dict, generation: int, ex=None):
+        """Кладе в L1 значення, отримані з Redis, якщо після generation не було інвалідацій."""
+        if self.l1 is None:
+            return
+        expires_at = time.time() + (min(ex, self.l1_ttl) if ex else self.l1_ttl)
+        with self._l1_lock:
+            if not self.subscribed or generation != self._generation:
+                return
+            for key, value in values.items():
+                if value is not None:
+                    self.l1.set(key, value.encode() if isinstance(value, str) else value, expires_at)
+
+    def invalidate_local(self, *keys):
+        """Викидає ключі з L1 цього процесу (власні delete і повідомлення з каналу)."""
+        with self._l1_lock:
+            self._generation += 1
+            if self.l1 is not None:
+                self.l1.discard(*keys)
+
+    def clear_l1(self):
+        with self._l1_lock:
+            self._generation += 1
+            if self.l1 is not None:
+                self.l1.clear()
+
+    @property
+    def generation(self) -> int:
+        """
+        Прочитаний до звернення до БД, передається в set/set_many: якщо відтоді була інвалідація
+        (власний delete або повідомлення з каналу), значення вже могло застаріти й не записується.
+        """
+        return self._generation
+
+    def _stale(self, generation: int | None) -> bool:
+        return generation is not None and generation != self._generation
+
+    def set_subscribed(self, subscribed: bool):
+        """Поки підписки немає, повідомлення губляться — L1 очищується й вимикається."""
+        self.subscribed = subscribed
+        self.clear_l1()
+
+    def _invalidation_message(self, keys) -> str:
+        return json.dumps(list(keys))
+
+    # --- локальний кеш на час збою ---
+    def _fallback_get(self, key):
+        return self.fallback.get(key)
+
+    def _fallback_mget(self, keys):
+        return [self.fallback.get(key) for key in keys]
+
+    def _fallback_set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode()
+        ttl = min(ex, self.fallback_ttl) if ex else self.fallback_ttl
+        self.fallback.set(key, value, time.time() + ttl)
+        return True
+
+    def _fallback_set_many(self, commands):
+        for key, value, ex in commands:
+            self._fallback_set(key, value, ex)
+        return [True] * len(commands)
+
+    def _fallback_delete(self, *keys):
+        self.fallback.discard(*keys)
+        with self._pending_lock:
+            for key in keys:
+                self._pending[key] = None
+            overflow = len(self._pending) - self.fallback_size
+            if overflow > 0:
+                # Найстаріші інвалідації губляться: ці ключі в Redis доживуть до свого TTL
+                logger.error("Черга інвалідацій Redis переповнена, відкинуто %s ключів", overflow)
+                for key in list(self._pending)[:overflow]:
+                    del self._pending[key]
+        return 0
+
+    def _take_pending(self) -> list[str]:
+        with self._pending_lock:
+            return list(self._pending)
+
+    def _forget_pending(self, keys):
+        with self._pending_lock:
+            for key in keys:
+                self._pending.pop(key, None)
+
+    # --- запобіжник ---
+    def _succeeded(self):
+        if self.breaker.record_success():
+            # Redis знову джерело правди; локальні записи могли застаріти
+            self.fallback.clear()
+            logger.warning("Redis відновився, локальний кеш очищено")
+
+    def _failed(self, exc: Exception):
+        if self.breaker.record_failure():
+            self.clear_l1()
+            logger.error("Redis недоступний (%s), перемикаємось на локальний кеш на %s с",
+                         exc, self.breaker.reset_seconds)
+
+    @property
+    def pending_invalidations(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "state": self.breaker.state,
+            "opened_total": self.breaker.opened_total,
+            "fallback_keys": len(self.fallback),
+            "pending_invalidations": self.pending_invalidations,
+            "l1_keys": len(self.l1) if self.l1 is not None else 0,
+            "l1_hits": self.l1_hits,
+            "subscribed": self.subscribed,
+        }
+
+
+class ResilientRedis(BaseResilientRedis):
+    """Обгортка sync-клієнта з тією підмножиною команд, що потрібна EntityCache і /uploads."""
+    redis: Redis
+
+    def _execute(self, command, fallback):
+        if not self.breaker.allow():
+            return fallback()
+        try:
+            self._flush_pending()
+            result = command()
+        except (RedisConnectionError, RedisTimeoutError) as exc:
+            self._failed(exc)
+            return fallback()
+        except RedisError:
+            # Redis відповів, але команда помилкова — з'єднання живе, запобіжник не чіпаємо
+            self._succeeded()
+            logger.exception("Помилка команди Redis")
+            return fallback()
+        self._succeeded()
+        return result
+
+    def _delete_and_publish(self, keys):
+        """DEL і PUBLISH одним обміном з Redis."""
+        with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            pipe.publish(self.channel, self._invalidation_message(keys))
+            return pipe.execute()[0]
+
+    def _flush_pending(self):
+        pending = self._take_pending()
+        for start in range(0, len(pending), INVALIDATION_BATCH_SIZE):
+            batch = pending[start:start + INVALIDATION_BATCH_SIZE]
+            self._delete_and_publish(batch)
+            self._forget_pending(batch)
+
+    def get(self, key):
+        cached, = self._l1_get_many([key])
+        if cached is not None:
+            return cached
+        generation = self._generation
+
+        def command():
+            value = self.redis.get(key)
+            self._l1_store({key: value}, generation)
+            return value
+        return self._execute(command, lambda: self._fallback_get(key))
+
+    def mget(self, keys):
+        values = self._l1_get_many(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+        generation = self._generation
+
+        def command():
+            found = self.redis.mget(missing)
+            self._l1_store(dict(zip(missing, found)), generation)
+            return found
+        loaded = dict(zip(missing, self._execute(command, lambda: self._fallback_mget(missing))))
+        return [value if value is not None else loaded[key] for key, value in zip(keys, values)]
+
+    def set(self, key, value, ex=None, generation: int | None = None):
+        if self._stale(generation):
+            return None
+        generation = self._generation if generation is None else generation
+
+        def command():
+            result = self.redis.set(key, value, ex=ex)
+            # Інвалідація, що прийшла під час SET, могла виконати DEL раніше за нього
+            if self._stale(generation):
+                self.redis.delete(key)
+                return None
+            self._l1_store({key: value}, generation, ex)
+            return result
+        return self._execute(command, lambda: self._fallback_set(key, value, ex))
+
+    def delete(self, *keys):
+        self.invalidate_local(*keys)
+        return self._execute(lambda: self._delete_and_publish(keys), lambda: self._fallback_delete(*keys))
+
+    def set_many(self, commands: list[tuple], generation: int | None = None):
+        if self._stale(generation):
+            return None
+        generation = self._generation if generation is None else generation
+
+        def command():
+            with self.redis.pipeline(transaction=False) as pipe:
+                for key, value, ex in commands:
+                    pipe.set(key, value, ex=ex)
+                result = pipe.execute()
+            if self._stale(generation):
+                self.redis.delete(*[key for key, _, _ in commands])
+                return None
+            for key, value, ex in commands:
+                self._l1_store({key: value}, generation, ex)
+            return result
+        return self._execute(command, lambda: self._fallback_set_many(commands))
+
+    def pipeline(self, transaction: bool = False, generation: int | None = None) -> "SetPipeline":
+        return SetPipeline(self, generation)
+
+    def close(self):
+        self.redis.close()
+
+
+class AsyncResilientRedis(BaseResilientRedis):
+    """Те саме, що ResilientRedis, для redis.asyncio."""
+    redis: aioredis.Redis
+
+    async def _execute(self, command, fallback):
+        if not self.breaker.allow():
+            return fallback()
+        try:
+            await self._flush_pending()
+            result = await command()
+        except (RedisConnectionError, RedisTimeoutError) as exc:
+            self._failed(exc)
+            return fallback()
+        except RedisError:
+            self._succeeded()
+            logger.exception("Помилка команди Redis")
+            return fallback()
+        self._succeeded()
+        return result
+
+    async def _delete_and_publish(self, keys):
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.delete(*keys)
+            pipe.publish(self.channel, self._invalidation_message(keys))
+            return (await pipe.execute())[0]
+
+    async def _flush_pending(self):
+        pending = self._take_pending()
+        for start in range(0, len(pending), INVALIDATION_BATCH_SIZE):
+            batch = pending[start:start + INVALIDATION_BATCH_SIZE]
+            await self._delete_and_publish(batch)
+            self._forget_pending(batch)
+
+    async def get(self, key):
+        cached, = self._l1_get_many([key])
+        if cached is not None:
+            return cached
+        generation = self._generation
+
+        async def command():
+            value = await self.redis.get(key)
+            self._l1_store({key: value}, generation)
+            return value
+        return await self._execute(command, lambda: self._fallback_get(key))
+
+    async def mget(self, keys):
+        values = self._l1_get_many(keys)
+        missing = [key for key, value in zip(keys, values) if value is None]
+        if not missing:
+            return values
+        generation = self._generation
+
+        async def command():
+            found = await self.redis.mget(missing)
+            self._l1_store(dict(zip(missing, found)), generation)
+            return found
+        loaded = dict(zip(missing, await self._execute(command, lambda: self._fallback_mget(missing))))
+        return [value if value is not None else loaded[key] for key, value in zip(keys, values)]
+
+    async def set(self, key, value, ex=None, generation: int | None = None):
+        if self._stale(generation):
+            return None
+        generation = self._generation if generation is None else generation
+
+        async def command():
+            result = await self.redis.set(key, value, ex=ex)
+            if self._stale(generation):
+                await self.redis.delete(key)
+                return None
+            self._l1_store({key: value}, generation, ex)
+            return result
+        return await self._execute(command, lambda: self._fallback_set(key, value, ex))
+
+    async def delete(self, *keys):
+        self.invalidate_local(*keys)
+        return await self._execute(lambda: self._delete_and_publish(keys), lambda: self._fallback_delete(*keys))
+
+    async def set_many(self, commands: list[tuple], generation: int | None = None):
+        if self._stale(generation):
+            return None
+        generation = self._generation if generation is None else generation
+
+        async def command():
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value, ex in commands:
+                    pipe.set(key, value, ex=ex)
+                result = await pipe.execute()
+            if self._stale(generation):
+                await self.redis.delete(*[key for key, _, _ in commands])
+                return None
+            for key, value, ex in commands:
+                self._l1_store({key: value}, generation, ex)
+            return result
+        return await self._execute(command, lambda: self._fallback_set_many(commands))
+
+    def pipeline(self, transaction: bool = False, generation: int | None = None) -> "SetPipeline":
+        return SetPipeline(self, generation)
+
+    async def aclose(self):
+        await self.redis.aclose()
+
+
+class SetPipeline:
+    """
+    Конвеєр лише з SET для EntityCache.set_many: збирає команди й виконує їх через
+    set_many обгортки — одним обміном з Redis або над локальним кешем.
+    Підтримує with (sync) і async with.
+    """
+
+    def __init__(self, client: BaseResilientRedis, generation: int | None = None):
+        self.client = client
+        self.generation = generation
+        self.commands: list[tuple] = []
+
+    def set(self, key, value, ex=None):
+        self.commands.append((key, value, ex))
+        return self
+
+    def execute(self):
+        commands, self.commands = self.commands, []
+        return self.client.set_many(commands, self.generation)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.commands = []
+
+
+# =========================
+#  ІНВАЛІДАЦІЯ L1 ЧЕРЕЗ PUB/SUB
+# =========================
+async def listen_invalidations(redis: aioredis.Redis, clients: list[BaseResilientRedis],
+                               channel: str = INVALIDATION_CHANNEL,
+                               retry_seconds: float = REDIS_BREAKER_RESET_SECONDS,
+                               listeners: tuple = ()):
+    """
+    Фонове завдання lifespan: підписується на канал інвалідацій і викидає отримані ключі
+    з L1 усіх клієнтів процесу. L1 увімкнений лише між підтвердженням підписки й
+    обривом з'єднання; після обриву — нова спроба через retry_seconds.
+    listeners — інші кеші процесу поза Redis: listener(keys) викликається з ключами кожного повідомлення.
+    """
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+                while True:
+                    # Явний timeout: інакше читання обмежене REDIS_SOCKET_TIMEOUT пулу
+                    message = await pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        continue
+                    if message["type"] == "subscribe":
+                        for client in clients:
+                            client.set_subscribed(True)
+                    elif message["type"] == "message":
+                        keys = json.loads(message["data"])
+                        for client in clients:
+                            client.invalidate_local(*keys)
+                        for listener in listeners:
+                            listener(keys)
+        except (RedisError, OSError) as exc:
+            logger.warning("Підписку на інвалідації L1 втрачено (%s), L1 вимкнено", exc)
+        finally:
+            for client in clients:
+                client.set_subscribed(False)
+        await asyncio.sleep(retry_seconds)
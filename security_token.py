@@ -12,6 +12,7 @@ from dotenv import load_dotenv
 from sqlalchemy.orm import Session
 from base import get_db
 from models.models import User
+from ttl_cache import TTLCache
 
 # --- КОНФІГУРАЦІЯ ---
 # load_dotenv()
@@ -30,6 +31,15 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 15
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
 
+# Кеш перевірених токенів: підпис перевіряється один раз, далі claims беруться з пам'яті до exp
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 10_000))
+# Кеш користувачів за username. Зміна чи видалення користувача в одному воркері доходить до інших
+# через канал інвалідацій L1 (ключ user:<id>, див. invalidate_cached_user_keys). TTL — межа
+# застарілості, коли Redis не налаштований або підписка обірвана: тоді інші воркери ще до
+# USER_CACHE_TTL_SECONDS автентифікують видаленого чи перейменованого користувача
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+
 
 # --- МОДЕЛІ ---
 
@@ -79,6 +89,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return generate_jwt(to_encode, secret=SECRET_KEY, algorithm=ALGORITHM[0])
 
 
+# --- КЕШІ ---
+
+token_claims_cache = TTLCache(TOKEN_CACHE_SIZE)
+user_cache = TTLCache(USER_CACHE_SIZE)
+
+
+def verify_token_cached(token: str) -> dict:
+    """Повертає claims токена; HMAC перевіряється лише при першій появі токена."""
+    claims = token_claims_cache.get(token)
+    if claims is not None:
+        return claims
+
+    claims = decode_jwt(token=token, secret=SECRET_KEY, algorithms=ALGORITHM)
+    # Без exp токен безстроковий — такий не кешуємо, щоб не тримати його вічно
+    if "exp" in claims:
+        token_claims_cache.set(token, claims, expires_at=claims["exp"])
+    return claims
+
+
+def get_user_by_username(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
+
+
+def get_user_by_username_cached(db: Session, username: str) -> Optional[User]:
+    """
+    Користувач з короткоживучого кешу (приєднується до сесії запиту без SQL через merge)
+    або з БД за унікальним індексом ix_users_username.
+    """
+    cached = user_cache.get(username)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    user = get_user_by_username(db, username)
+    if user is None:
+        return None
+    db.expunge(user)
+    user_cache.set(username, user, expires_at=time.time() + USER_CACHE_TTL_SECONDS)
+    return db.merge(user, load=False)
+
+
+def invalidate_cached_user(user_id: int):
+    """Викликається з update_user/delete_user: прибирає користувача з кешу за id."""
+    user_cache.discard_where(lambda user: user.id == user_id)
+
+
+def invalidate_cached_user_keys(keys: list[str]):
+    """
+    Слухач listen_invalidations: EntityCache.invalidate("user", id) в будь-якому воркері
+    публікує ключ user:<id>, і кожен процес прибирає цього користувача зі свого кешу.
+    """
+    user_ids = {int(key[5:]) for key in keys if key.startswith("user:") and key[5:].isdigit()}
+    if user_ids:
+        user_cache.discard_where(lambda user: user.id in user_ids)
+
+
 # --- ЗАЛЕЖНІСТЬ ---
 
 def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
@@ -91,18 +156,18 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(oauth2_
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    from app import get_user_by_username
-
-    payload = decode_jwt(token=token)
-
-    if payload is None:
+    try:
+        payload = verify_token_cached(token)
+    except jwt.PyJWTError:
         raise credentials_exception
 
     username: str = payload.get("sub")
     if username is None:
         raise credentials_exception
 
-    user = get_user_by_username(db, username)
+    user = get_user_by_username_cached(db, username)
 
     if user is None:
         raise credentials_exception
+
+    return user
@@ -1,49 +1,317 @@
-import sqlite3
+"""
+Генератор синтетичних даних для навантажувального тестування.
 
-# Підключення до бази
-conn = sqlite3.connect("library.db")
-cursor = conn.cursor()
+    python seed_data.py --users 10000 --authors 100000 --books 1000000
+    python seed_data.py --books 10000000 --seed 7 --reset
+
+Дані детерміновані: ті самі параметри й --seed дають ті самі рядки. Розподіли:
+автори книг — Zipf (кілька дуже плідних авторів і довгий хвіст), жанри — зважені,
+роки зміщені до сучасності, описи — по 2–8 речень.
+Пише в базу, налаштовану в base.py (DATABASE_URL), або в --url.
+"""
+import argparse
+import random
+import time
+from itertools import accumulate
+
+from sqlalchemy import bindparam, create_engine, func, insert, select, text
+
+from base import SQLALCHEMY_DATABASE_URL
+from catalog_stats import rebuild as rebuild_counters
+from models.models import BOOK_COUNTERS, Author, Book, User, utcnow
+from password_hashing import get_password_hash
+
+BATCH_SIZE = 50_000
+# Комітимо кожні COMMIT_EVERY рядків: великі транзакції, але журнал не росте безмежно
+COMMIT_EVERY = 1_000_000
+
+# PRAGMA для швидкого завантаження; після генерації journal_mode повертається до попереднього
+FAST_LOAD_PRAGMAS = {
+    "synchronous": "OFF",
+    "journal_mode": "MEMORY",
+    "temp_store": "MEMORY",
+    "cache_size": -256 * 1024,
+}
 
 # =========================
-#  ДОДАЄМО КОРИСТУВАЧА
+#  СЛОВНИКИ
 # =========================
-cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", ("admin", "1234"))
-admin_id = cursor.lastrowid
+FIRST_NAMES = [
+    "Ліна", "Іван", "Леся", "Тарас", "Ольга", "Василь", "Марко", "Оксана", "Григорій", "Софія",
+    "Михайло", "Наталія", "Юрій", "Ірина", "Андрій", "Катерина", "Богдан", "Олена", "Павло", "Дарина",
+]
+LAST_NAMES = [
+    "Костенко", "Франко", "Українка", "Шевченко", "Кобилянська", "Стефаник", "Вовчок", "Коцюбинський",
+    "Сковорода", "Стус", "Жадан", "Андрухович", "Забужко", "Тичина", "Рильський", "Хвильовий",
+    "Підмогильний", "Загребельний", "Гончар", "Довженко", "Бабель", "Семенко", "Антонич", "Малик",
+]
+COUNTRIES = ["Україна", "Польща", "Німеччина", "Франція", "США", "Велика Британія", None]
+COUNTRY_WEIGHTS = [50, 10, 8, 7, 10, 10, 5]
+
+GENRES = ["Роман", "Історичний", "Драма", "Поезія", "Детектив", "Фантастика", "Біографія", "Наукова"]
+GENRE_WEIGHTS = [35, 18, 12, 10, 10, 8, 4, 3]
+
+WORDS = [
+    "місто", "ніч", "сад", "вітер", "море", "дорога", "пісня", "тінь", "зима", "світло", "ліс", "камінь",
+    "лист", "вогонь", "острів", "сон", "ріка", "дім", "степ", "небо", "хліб", "пам'ять", "війна", "мир",
+    "кохання", "правда", "голос", "зоря", "поле", "серце", "час", "доля", "місяць", "хвиля", "гора",
+]
+# Назви й описи вибираються з пулів заздалегідь згенерованих значень: окремий
+# виклик random на кожне слово кожної з мільйонів книг коштував би більше за саму вставку
+TEXT_POOL_SIZE = 1 << 16
+YEARS = list(range(1800, 2026))
+# Трикутний розподіл із модою 2015: більшість книг сучасні, але хвіст до 1800 року
+YEAR_WEIGHTS = [(year - 1799) / (2015 - 1799) if year <= 2015 else (2026 - year) / (2026 - 2015) for year in YEARS]
+
+# Класика з попередньої версії seed_data.py — перші рядки будь-якого набору
+CLASSIC_AUTHORS = [("Ліна Костенко", "Україна"), ("Іван Франко", "Україна"), ("Леся Українка", "Україна")]
+CLASSIC_BOOKS = [
+    ("Маруся Чурай", 1979, "Роман", "Історичний роман про українську героїню", 1),
+    ("Захар Беркут", 1883, "Історичний", "Розповідь про боротьбу карпатських людей", 2),
+    ("Лісова пісня", 1911, "Драма", "Міфологічна драма про кохання та природу", 3),
+]
+
+
+def zipf_cum_weights(n: int, s: float) -> list[float]:
+    """Кумулятивні ваги Zipf для рангів 1..n: автор з id=1 найплідніший."""
+    return list(accumulate(1 / rank ** s for rank in range(1, n + 1)))
+
+
+def text_pools(rng: random.Random) -> tuple[list[str], list[str]]:
+    """Пули назв (1–4 слова) і довгих описів (2–8 речень по 6–16 слів)."""
+    sentences = [" ".join(rng.choices(WORDS, k=rng.randint(6, 16))).capitalize() + "."
+                 for _ in range(TEXT_POOL_SIZE // 16)]
+    titles = [" ".join(rng.choices(WORDS, k=rng.randint(1, 4))).capitalize() for _ in range(TEXT_POOL_SIZE)]
+    descriptions = [" ".join(rng.choices(sentences, k=rng.randint(2, 8))) for _ in range(TEXT_POOL_SIZE)]
+    return titles, descriptions
+
 
 # =========================
-#  ДОДАЄМО АВТОРІВ
+#  ГЕНЕРАЦІЯ РЯДКІВ
 # =========================
-authors = [
-    ("Ліна Костенко", "Україна"),
-    ("Іван Франко", "Україна"),
-    ("Леся Українка", "Україна"),
-]
+# Рядки — кортежі в порядку стовпців таблиці без version/updated_at (їх додає load)
+def user_rows(start_id: int, count: int, password_hash: str):
+    return [(i, f"user{i}", password_hash) for i in range(start_id, start_id + count)]
+
+
+def author_rows(rng: random.Random, start_id: int, count: int):
+    return list(zip(
+        range(start_id, start_id + count),
+        [f"{first} {last} {author_id}" for first, last, author_id in zip(
+            rng.choices(FIRST_NAMES, k=count), rng.choices(LAST_NAMES, k=count),
+            range(start_id, start_id + count))],
+        rng.choices(COUNTRIES, weights=COUNTRY_WEIGHTS, k=count),
+    ))
+
+
+def book_rows(rng: random.Random, start_id: int, count: int, author_weights: list[float],
+              users: int, pools: tuple[list[str], list[str]]):
+    titles, descriptions = pools
+    return list(zip(
+        range(start_id, start_id + count),
+        rng.choices(titles, k=count),
+        rng.choices(YEARS, weights=YEAR_WEIGHTS, k=count),
+        rng.choices(GENRES, weights=GENRE_WEIGHTS, k=count),
+        rng.choices(descriptions, k=count),
+        rng.choices(range(1, len(author_weights) + 1), cum_weights=author_weights, k=count),
+        rng.choices(range(1, users + 1), k=count),
+    ))
 
-author_ids = {}
-for full_name, country in authors:
-    cursor.execute(
-        "INSERT INTO authors (full_name, country) VALUES (?, ?)", (full_name, country)
-    )
-    author_ids[full_name] = cursor.lastrowid
 
 # =========================
-#  ДОДАЄМО КНИГИ
+#  ЗАВАНТАЖЕННЯ
 # =========================
-books = [
-    ("Маруся Чурай", 1979, "Роман", "Історичний роман про українську героїню", "Ліна Костенко"),
-    ("Захар Беркут", 1883, "Історичний", "Розповідь про боротьбу карпатських людей", "Іван Франко"),
-    ("Лісова пісня", 1911, "Драма", "Міфологічна драма про кохання та природу", "Леся Українка"),
-    ("Захар Беркут", 1883, "Історичний", "Розповідь про боротьбу карпатських людей", "Іван Франко"),
-]
+def set_pragmas(conn, pragmas: dict):
+    for name, value in pragmas.items():
+        conn.exec_driver_sql(f"PRAGMA {name} = {value}")
+
+
+def load(conn, table, total: int, make_rows, log, batch_size: int = BATCH_SIZE):
+    """
+    executemany пачками по batch_size з комітом кожні COMMIT_EVERY рядків.
+    Для драйверів з позиційними параметрами (sqlite3) кортежі йдуть прямо в cursor.executemany —
+    це приблизно вдвічі швидше, ніж insert() зі словником на кожен рядок.
+    """
+    statement = insert(table)
+    sql = str(statement.compile(dialect=conn.dialect))
+    columns = [column.name for column in table.columns]
+    # Однаковий хвіст (version, updated_at) для всіх рядків; sqlite3 отримує рядок у форматі SQLAlchemy
+    loaded_at = utcnow()
+    tail = (1, loaded_at.isoformat(" ", "microseconds") if conn.dialect.positional else loaded_at)
+    started = time.perf_counter()
+    inserted = 0
+    while inserted < total:
+        count = min(batch_size, total - inserted)
+        rows = [row + tail for row in make_rows(inserted, count)]
+        if conn.dialect.positional:
+            conn.exec_driver_sql(sql, rows)
+        else:
+            conn.execute(statement, [dict(zip(columns, row)) for row in rows])
+        inserted += count
+        if inserted % COMMIT_EVERY < count or inserted == total:
+            conn.commit()
+            elapsed = time.perf_counter() - started
+            log(f"  {table.name}: {inserted:,} / {total:,} ({inserted / elapsed:,.0f} рядків/с)")
+
+
+def without_secondary_indexes(conn, table):
+    """Знімає неунікальні індекси таблиці на час завантаження; повертає функцію їх відновлення."""
+    indexes = [index for index in table.indexes if not index.unique]
+    for index in indexes:
+        index.drop(conn, checkfirst=True)
+    conn.commit()
+
+    def restore():
+        for index in indexes:
+            index.create(conn, checkfirst=True)
+        conn.commit()
+    return restore
+
+
+def without_fts_insert_trigger(conn):
+    """
+    Тригер books_fts_ai (міграція FTS5) індексує кожну книгу окремо. На час завантаження
+    він знімається, а нові книги додаються в books_fts одним INSERT ... SELECT.
+    """
+    trigger_sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'books_fts_ai'")
+    ).scalar()
+    if trigger_sql is None:
+        return lambda first_id: None
+    conn.exec_driver_sql("DROP TRIGGER books_fts_ai")
+    conn.commit()
+
+    def restore(first_id: int):
+        conn.execute(text("""
+            INSERT INTO books_fts(rowid, title, description, author_name)
+            SELECT books.id, books.title, books.description, authors.full_name
+            FROM books LEFT JOIN authors ON authors.id = books.author_id
+            WHERE books.id >= :first_id
+        """), {"first_id": first_id})
+        conn.exec_driver_sql(trigger_sql)
+        conn.commit()
+    return restore
+
+
+def without_counter_triggers(conn):
+    """
+    Тригери лічильників каталогу (models.BOOK_COUNTERS) оновлюють три таблиці на кожну книгу.
+    На час завантаження вони знімаються, а лічильники потім перераховуються одним GROUP BY.
+    """
+    names = [f"{table.name}_{suffix}" for table, *_ in BOOK_COUNTERS for suffix in ("ai", "ad", "au")]
+    existing = conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name IN :names").bindparams(
+            bindparam("names", expanding=True)),
+        {"names": names},
+    ).scalars().all()
+    if not existing:
+        return lambda: None
+    for name in existing:
+        conn.exec_driver_sql(f"DROP TRIGGER {name}")
+    conn.commit()
+
+    def restore():
+        rebuild_counters(conn)
+        conn.commit()
+    return restore
+
+
+def generate(engine, users: int, authors: int, books: int, seed: int = 42, password: str = "password",
+             zipf_s: float = 1.1, reset: bool = False, log=print):
+    """
+    Додає users/authors/books рядків після вже наявних (або замість них при reset).
+    Класичні автори й книги з CLASSIC_* потрапляють у набір, якщо таблиці були порожні.
+    """
+    rng = random.Random(seed)
+    # bcrypt на кожного з мільйонів користувачів зайняв би години: хеш один на всіх
+    password_hash = get_password_hash(password)
+    is_sqlite = engine.dialect.name == "sqlite"
+
+    with engine.connect() as conn:
+        # Перебудова індексів, FTS і лічильників окупається, лише коли додаємо не менше, ніж уже є
+        bulk_load = reset or books >= (conn.execute(select(func.max(Book.id))).scalar() or 0)
+        restore_counters = without_counter_triggers(conn) if bulk_load and is_sqlite else lambda: None
+        restore_indexes, restore_fts, first_book_id = (lambda: None), (lambda first_id: None), None
+        try:
+            if reset:
+                for table in (Book, Author, User):
+                    conn.execute(table.__table__.delete())
+                conn.commit()
+
+            if is_sqlite:
+                journal_mode = conn.exec_driver_sql("PRAGMA journal_mode").scalar()
+                set_pragmas(conn, FAST_LOAD_PRAGMAS)
+
+            next_id = {model: (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+                       for model in (User, Author, Book)}
+            # Якщо база порожня, першим іде admin і класичні книги
+            if next_id[User] == 1 and users:
+                conn.execute(insert(User), [{"id": 1, "username": "admin", "password": password_hash}])
+                users, next_id[User] = users - 1, 2
+            if next_id[Author] == 1 and authors >= len(CLASSIC_AUTHORS):
+                conn.execute(insert(Author), [{"id": i, "full_name": name, "country": country}
+                                              for i, (name, country) in enumerate(CLASSIC_AUTHORS, 1)])
+                authors, next_id[Author] = authors - len(CLASSIC_AUTHORS), len(CLASSIC_AUTHORS) + 1
+            conn.commit()
+
+            load(conn, User.__table__, users,
+                 lambda done, count: user_rows(next_id[User] + done, count, password_hash), log)
+            load(conn, Author.__table__, authors,
+                 lambda done, count: author_rows(rng, next_id[Author] + done, count), log)
+
+            total_users = next_id[User] - 1 + users
+            total_authors = next_id[Author] - 1 + authors
+            if books and (not total_users or not total_authors):
+                raise ValueError("Для книг потрібен хоча б один користувач і один автор")
+
+            restore_indexes = without_secondary_indexes(conn, Book.__table__) if bulk_load else lambda: None
+            restore_fts = without_fts_insert_trigger(conn) if bulk_load and is_sqlite else lambda first_id: None
+            first_book_id = next_id[Book]
+            if first_book_id == 1 and books >= len(CLASSIC_BOOKS) and total_authors >= len(CLASSIC_AUTHORS):
+                conn.execute(insert(Book), [
+                    {"id": i, "title": title, "publication_year": year, "genre": genre,
+                     "description": description, "author_id": author_id, "user_id": 1}
+                    for i, (title, year, genre, description, author_id) in enumerate(CLASSIC_BOOKS, 1)
+                ])
+                books, next_id[Book] = books - len(CLASSIC_BOOKS), len(CLASSIC_BOOKS) + 1
+
+            author_weights = zipf_cum_weights(total_authors, zipf_s)
+            pools = text_pools(rng)
+            load(conn, Book.__table__, books,
+                 lambda done, count: book_rows(rng, next_id[Book] + done, count, author_weights,
+                                               total_users, pools), log)
+        finally:
+            log("  відновлення індексів...")
+            restore_indexes()
+            restore_fts(first_book_id)
+            # Тригери лічильників зняті ще до reset: повертаються за будь-якого результату
+            restore_counters()
+
+        if is_sqlite:
+            conn.exec_driver_sql(f"PRAGMA journal_mode = {journal_mode}")
+            conn.exec_driver_sql("ANALYZE")
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетичних даних для library.db")
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--authors", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--password", default="password", help="пароль усіх згенерованих користувачів")
+    parser.add_argument("--zipf", type=float, default=1.1, help="показник Zipf для розподілу книг між авторами")
+    parser.add_argument("--reset", action="store_true", help="спершу видалити всіх користувачів, авторів і книги")
+    parser.add_argument("--url", default=SQLALCHEMY_DATABASE_URL, help="за замовчуванням DATABASE_URL з base.py")
+    args = parser.parse_args()
 
-for title, year, genre, description, author_name in books:
-    author_id = author_ids[author_name]
-    cursor.execute(
-        "INSERT INTO books (title, publication_year, genre, description, author_id, user_id) VALUES (?, ?, ?, ?, ?, ?)",
-        (title, year, genre, description, author_id, admin_id)
-    )
+    started = time.perf_counter()
+    engine = create_engine(args.url)
+    generate(engine, args.users, args.authors, args.books, seed=args.seed, password=args.password,
+             zipf_s=args.zipf, reset=args.reset)
+    engine.dispose()
+    print(f"Дані успішно додані до {args.url} за {time.perf_counter() - started:.1f} с")
 
-conn.commit()
-conn.close()
 
-print("Дані успішно додані до бази library.db!")
+if __name__ == "__main__":
+    main()
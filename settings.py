@@ -0,0 +1,49 @@
+import os
+from dataclasses import dataclass
+
+from base import ASYNC_DATABASE_URL, DB_MODE, DB_PROFILE, SQLALCHEMY_DATABASE_URL, SQLITE_PROFILES
+
+
+# =========================
+#  НАЛАШТУВАННЯ ЗАСТОСУНКУ
+# =========================
+@dataclass(frozen=True)
+class Settings:
+    """
+    Параметри create_app. Значення за замовчуванням — з тих самих змінних оточення,
+    що й раніше (DATABASE_URL, DB_MODE, DB_PROFILE, REDIS_URL, SQL_DIAGNOSTICS, FAST_JSON).
+    """
+    database_url: str = SQLALCHEMY_DATABASE_URL
+    async_database_url: str = ASYNC_DATABASE_URL
+    db_mode: str = DB_MODE
+    db_profile: str = DB_PROFILE
+    # Порожній рядок — без Redis: entity-кеш вимкнений, усе читається з БД
+    redis_url: str = "redis://localhost:6379/0"
+    # Схему веде Alembic; upgrade head при старті (base.upgrade_schema) — лише для локальних і тестових баз
+    create_schema: bool = False
+    sql_diagnostics: bool = False
+    sql_diagnostics_log: str | None = None
+    # Відповіді через fast_json.fast_response без повторної валідації як response_model
+    fast_json: bool = False
+
+    def __post_init__(self):
+        if self.db_mode not in ("sync", "async"):
+            raise ValueError("DB_MODE має бути 'sync' або 'async'")
+        if self.db_profile not in SQLITE_PROFILES:
+            raise ValueError(f"DB_PROFILE має бути одним з: {', '.join(SQLITE_PROFILES)}")
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        async_database_url = os.getenv("ASYNC_DATABASE_URL")
+        database_url = os.getenv("DATABASE_URL", SQLALCHEMY_DATABASE_URL)
+        return cls(
+            database_url=database_url,
+            async_database_url=async_database_url or database_url.replace("sqlite://", "sqlite+aiosqlite://", 1),
+            db_mode=os.getenv("DB_MODE", DB_MODE),
+            db_profile=os.getenv("DB_PROFILE", DB_PROFILE),
+            redis_url=os.getenv("REDIS_URL", cls.redis_url),
+            create_schema=os.getenv("DB_CREATE_SCHEMA", "0") == "1",
+            sql_diagnostics=os.getenv("SQL_DIAGNOSTICS", "0") == "1",
+            sql_diagnostics_log=os.getenv("SQL_DIAGNOSTICS_LOG"),
+            fast_json=os.getenv("FAST_JSON", "0") == "1",
+        )
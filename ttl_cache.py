@@ -0,0 +1,58 @@
+import threading
+import time
+from collections import OrderedDict
+
+# =========================
+#  LRU З TTL У ПАМ'ЯТІ ПРОЦЕСУ
+# =========================
+# Кеші токенів і користувачів (security_token), перевірених CSRF-токенів
+# (middleware.security), L1 і локальний кеш на час збою Redis (resilient_redis).
+
+
+class TTLCache:
+    """
+    Потокобезпечний LRU з часом життя кожного запису.
+    Залежності FastAPI виконуються в пулі потоків, тому доступ під локом.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at: float):
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+    def discard_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (_, value) in self._data.items() if predicate(value)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
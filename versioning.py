@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+from fastapi import HTTPException, Response
+
+from file_storage import validator_headers
+
+# =========================
+#  ВЕРСІЇ СУТНОСТЕЙ (ETag / If-Match)
+# =========================
+# ETag будується з version рядка, тож його можна перевірити вузьким запитом лише
+# по стовпцях version/updated_at — без завантаження й серіалізації сутності.
+# Клієнт може тримати копію, але має перевіряти її кожного разу (If-None-Match).
+ENTITY_CACHE_CONTROL = "private, no-cache"
+
+
+def _timestamp(value: datetime | None) -> int:
+    if value is None:
+        return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def entity_meta(kind: str, entity_id: int, versions: tuple, timestamps: tuple) -> dict:
+    """
+    Валідатори у форматі file_storage (etag, mtime, cache_control).
+    BookResponse вбудовує автора, тож для книги versions і timestamps — книги й автора.
+    """
+    return {
+        "etag": f'"{kind}-{entity_id}-{".".join(str(version) for version in versions)}"',
+        "mtime": max(_timestamp(value) for value in timestamps),
+        "cache_control": ENTITY_CACHE_CONTROL,
+    }
+
+
+def book_meta(book) -> dict:
+    """book — BookResponse або ORM-об'єкт з підвантаженим автором."""
+    return entity_meta("book", book.id, (book.version, book.author.version), (book.updated_at, book.author.updated_at))
+
+
+def author_meta(author) -> dict:
+    """author — AuthorResponse, ORM-об'єкт або рядок (id, version, updated_at)."""
+    return entity_meta("author", author.id, (author.version,), (author.updated_at,))
+
+
+def book_version_meta(row) -> dict:
+    """row — (id, version, updated_at, author_version, author_updated_at) з вузького запиту версій."""
+    return entity_meta("book", row.id, (row.version, row.author_version), (row.updated_at, row.author_updated_at))
+
+
+def has_validators(headers) -> bool:
+    return "if-none-match" in headers or "if-modified-since" in headers
+
+
+def not_modified_response(meta: dict) -> Response:
+    return Response(status_code=304, headers=validator_headers(meta))
+
+
+def version_conflict(headers) -> HTTPException:
+    """Рядок змінився між читанням і UPDATE ... WHERE version (StaleDataError)."""
+    if "if-match" in headers:
+        return HTTPException(412, "Сутність змінена іншим запитом")
+    return HTTPException(409, "Сутність змінена іншим запитом, повторіть запит")
+
+
+def precondition_failed(headers, meta: dict) -> bool:
+    """
+    If-Match (RFC 9110): сильне порівняння, тож W/-теги ніколи не збігаються.
+    Без заголовка умова вважається виконаною.
+    """
+    if_match = headers.get("if-match")
+    if if_match is None or if_match.strip() == "*":
+        return False
+    return meta["etag"] not in {tag.strip() for tag in if_match.split(",")}